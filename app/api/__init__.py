@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from . import contacts, leads, operators, sources
+from . import contacts, diagnostics, leads, metrics, operators, sources, stats
 
 api_router = APIRouter()
 
@@ -8,5 +8,8 @@ api_router.include_router(operators.router, prefix="/operators", tags=["operator
 api_router.include_router(sources.router, prefix="/sources", tags=["sources"])
 api_router.include_router(contacts.router, prefix="/contacts", tags=["contacts"])
 api_router.include_router(leads.router, prefix="/leads", tags=["leads"])
+api_router.include_router(stats.router, prefix="/stats", tags=["stats"])
+api_router.include_router(diagnostics.router, prefix="/diagnostics", tags=["diagnostics"])
+api_router.include_router(metrics.router, tags=["metrics"])
 
 
@@ -1,113 +1,335 @@
 from __future__ import annotations
 
-from typing import List
+import math
+import time
+from collections import Counter
+from datetime import datetime
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session, joinedload
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
 
-from .. import models, schemas
-from ..database import get_session
-from ..services.allocation import AllocationResult, choose_operator_for_source
+from .. import metrics, models, schemas
+from .deps import DatabaseRunner, get_db
+from .export import ExportFormat, stream_export
+from .pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    NEXT_CURSOR_HEADER,
+    encode_cursor,
+    keyset_before,
+    to_naive_utc,
+)
+from .responses import FastJSONResponse, rows_response
+from ..services.admission import admission_controller
+from ..services.allocation import AllocationResult, choose_operator_for_source, record_allocation
+from ..services.idempotency import find_contacts, idempotency_cache, idempotency_key
+from ..services.ingestion import CapacityConflict, bulk_create_contacts
+from ..services.leads import lead_cache, resolve_lead
+from ..services.rollups import record_contacts
+from ..services.routing import SourceRouting, routing_cache
+from ..services.transitions import (
+    ContactChangedConcurrently,
+    ContactNotFound,
+    OperatorUnavailable,
+    close_contacts,
+    transition_contact,
+)
+
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+# Set on responses that return a contact created by an earlier request with the same key.
+REPLAYED_HEADER = "Idempotent-Replayed"
+RETRY_AFTER_HEADER = "Retry-After"
 
 router = APIRouter()
 
 
-def _get_source_with_assignments(db: Session, source_id: int) -> models.Source:
-    source = (
-        db.query(models.Source)
-        .options(joinedload(models.Source.assignments).joinedload(models.SourceOperatorAssignment.operator))
-        .filter(models.Source.id == source_id)
-        .one_or_none()
-    )
-    if source is None:
+def _get_source_routing(db: Session, source_id: int) -> SourceRouting:
+    routing = routing_cache.get(db, source_id)
+    if routing is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Source not found")
-    return source
-
+    return routing
 
-def _get_or_create_lead(db: Session, external_id: str, name: str | None) -> models.Lead:
-    lead = db.query(models.Lead).filter(models.Lead.external_id == external_id).one_or_none()
-    if lead:
-        if name and not lead.name:
-            lead.name = name
-            db.add(lead)
-        return lead
 
-    lead = models.Lead(external_id=external_id, name=name)
-    db.add(lead)
-    db.flush()
-    return lead
+def _admit(demands: dict[int, int]) -> None:
+    # Runs on the event loop before any database work, against routing snapshots this worker has
+    # already cached. A source seen for the first time is admitted while its snapshot loads.
+    cached = [(routing_cache.peek(source_id), cost) for source_id, cost in demands.items()]
+    wait = admission_controller.admit([(routing, cost) for routing, cost in cached if routing is not None])
+    if wait > 0:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Source exceeded its admission rate, retry later",
+            headers={RETRY_AFTER_HEADER: str(max(1, math.ceil(wait)))},
+        )
 
 
-def _to_contact_read(contact: models.Contact) -> schemas.ContactRead:
+def _to_contact_read(contact: models.Contact, operator_name: Optional[str]) -> schemas.ContactRead:
     return schemas.ContactRead(
         id=contact.id,
         lead_id=contact.lead_id,
         source_id=contact.source_id,
         operator_id=contact.operator_id,
-        operator_name=contact.operator.name if contact.operator else None,
+        operator_name=operator_name,
         status=contact.status,
         message=contact.message,
         created_at=contact.created_at,
     )
 
 
-@router.post("/", response_model=schemas.ContactRead, status_code=status.HTTP_201_CREATED)
-def create_contact(payload: schemas.ContactCreate, db: Session = Depends(get_session)) -> schemas.ContactRead:
-    source = _get_source_with_assignments(db, payload.source_id)
-    lead = _get_or_create_lead(db, payload.lead_external_id, payload.lead_name)
+def _create_contact(db: Session, payload: schemas.ContactCreate) -> tuple[schemas.ContactRead, bool]:
+    # Returns the contact and whether it was replayed for a repeated idempotency key; keys this
+    # worker has cached are answered by the endpoint before it gets here.
+    key = idempotency_key(payload)
+    routing = _get_source_routing(db, payload.source_id)
+    lead = resolve_lead(db, payload.lead_external_id, payload.lead_name)
 
-    allocation: AllocationResult = choose_operator_for_source(db, source)
-    operator_id = allocation.operator.id if allocation.operator else None
+    started = time.perf_counter()
+    allocation: AllocationResult = choose_operator_for_source(db, routing)
+    metrics.allocation_latency.observe(time.perf_counter() - started)
+    operator = allocation.operator
 
     contact = models.Contact(
         lead_id=lead.id,
-        source_id=source.id,
-        operator_id=operator_id,
+        source_id=routing.source_id,
+        operator_id=operator.id if operator else None,
         message=payload.message,
+        external_message_id=payload.external_message_id,
     )
 
     db.add(contact)
+    if operator is None:
+        # Waits in the source's queue; the dispatcher assigns it once an operator has capacity.
+        db.add(models.PendingContact(contact=contact, source_id=routing.source_id, priority=payload.priority))
+    try:
+        db.flush()
+    except IntegrityError:
+        # A retry this process has not cached (first seen by another worker, or evicted): the
+        # unique index keeps the first contact, and the rollback releases the slot reserved above.
+        db.rollback()
+        existing = find_contacts(db, [key]).get(key) if key is not None else None
+        if existing is None:
+            raise
+        idempotency_cache.put(key, existing)
+        return existing, True
+    record_contacts(db, created=[(contact.created_at, contact.source_id, contact.operator_id)])
     db.commit()
-    db.refresh(contact)
+    lead_cache.put(payload.lead_external_id, lead)
+    record_allocation(routing.source_id, contact.operator_id, allocation.reason)
+
+    created = _to_contact_read(contact, operator.name if operator else None)
+    if key is not None:
+        idempotency_cache.put(key, created)
+    return created, False
 
-    contact = (
-        db.query(models.Contact)
-        .options(joinedload(models.Contact.operator))
-        .filter(models.Contact.id == contact.id)
-        .one()
+
+def _create_contacts_bulk(db: Session, payload: schemas.ContactBulkCreate) -> schemas.ContactBulkResult:
+    try:
+        outcomes = bulk_create_contacts(db, payload.items)
+    except CapacityConflict:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Operator loads changed concurrently, retry the batch",
+        )
+
+    items = [
+        schemas.ContactBulkItemResult(
+            index=outcome.index, contact=outcome.contact, reason=outcome.reason, replayed=outcome.replayed
+        )
+        for outcome in outcomes
+    ]
+    created = [item for item in items if item.contact is not None and not item.replayed]
+    replayed = sum(1 for item in items if item.replayed)
+    return schemas.ContactBulkResult(
+        created=len(created),
+        unassigned=sum(1 for item in created if item.contact.operator_id is None),
+        rejected=len(items) - len(created) - replayed,
+        replayed=replayed,
+        items=items,
     )
 
-    return _to_contact_read(contact)
 
+@router.post("/", response_model=schemas.ContactRead, status_code=status.HTTP_201_CREATED)
+async def create_contact(
+    payload: schemas.ContactCreate,
+    response: Response,
+    idempotency_key_header: Optional[str] = Header(None, alias=IDEMPOTENCY_KEY_HEADER, min_length=1, max_length=255),
+    db: DatabaseRunner = Depends(get_db),
+) -> schemas.ContactRead:
+    if idempotency_key_header is not None:
+        if payload.external_message_id not in (None, idempotency_key_header):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"{IDEMPOTENCY_KEY_HEADER} and external_message_id differ",
+            )
+        payload = payload.copy(update={"external_message_id": idempotency_key_header})
+    key = idempotency_key(payload)
+    contact = idempotency_cache.get(key) if key is not None else None
+    if contact is not None:
+        # A retry of an accepted message costs nothing, so it is answered before admission control.
+        response.headers[REPLAYED_HEADER] = "true"
+        return contact
+    _admit({payload.source_id: 1})
+    contact, replayed = await db.run(_create_contact, payload)
+    if replayed:
+        response.headers[REPLAYED_HEADER] = "true"
+    return contact
 
-@router.get("/", response_model=List[schemas.ContactWithLeadRead])
-def list_contacts(db: Session = Depends(get_session)) -> List[schemas.ContactWithLeadRead]:
-    contacts = (
-        db.query(models.Contact)
-        .options(
-            joinedload(models.Contact.lead),
-            joinedload(models.Contact.operator),
-            joinedload(models.Contact.source),
+
+@router.post("/bulk", response_model=schemas.ContactBulkResult)
+async def create_contacts_bulk(
+    payload: schemas.ContactBulkCreate, db: DatabaseRunner = Depends(get_db)
+) -> schemas.ContactBulkResult:
+    # Only items that will create a contact are metered; cached retries are replayed for free.
+    _admit(
+        Counter(
+            item.source_id
+            for item in payload.items
+            if (key := idempotency_key(item)) is None or key not in idempotency_cache
         )
-        .order_by(models.Contact.created_at.desc())
-        .all()
     )
+    return await db.run(_create_contacts_bulk, payload)
 
-    return [
-        schemas.ContactWithLeadRead(
-            id=contact.id,
-            lead_id=contact.lead_id,
-            lead_external_id=contact.lead.external_id,
-            lead_name=contact.lead.name,
-            source_id=contact.source_id,
-            source_name=contact.source.name,
-            operator_id=contact.operator_id,
-            operator_name=contact.operator.name if contact.operator else None,
-            status=contact.status,
-            message=contact.message,
-            created_at=contact.created_at,
+
+def _update_contact(db: Session, contact_id: int, payload: schemas.ContactUpdate) -> schemas.ContactRead:
+    try:
+        transition_contact(
+            db,
+            contact_id,
+            status=payload.status,
+            operator_id=payload.operator_id,
+            reassign="operator_id" in payload.dict(exclude_unset=True),
         )
-        for contact in contacts
-    ]
+    except ContactNotFound:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Contact not found")
+    except OperatorUnavailable as error:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Operator {error.args[0]} is missing, inactive or at its load limit",
+        )
+    except ContactChangedConcurrently:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Contact changed concurrently, retry")
+    db.commit()
+
+    contact, operator_name = db.execute(
+        select(models.Contact, models.Operator.name)
+        .outerjoin(models.Operator, models.Operator.id == models.Contact.operator_id)
+        .where(models.Contact.id == contact_id)
+    ).one()
+    return _to_contact_read(contact, operator_name)
+
+
+def _close_contacts(db: Session, payload: schemas.ContactCloseRequest) -> schemas.ContactCloseResult:
+    closed = close_contacts(
+        db,
+        ids=payload.ids,
+        operator_id=payload.operator_id,
+        source_id=payload.source_id,
+        created_before=to_naive_utc(payload.created_before) if payload.created_before else None,
+    )
+    db.commit()
+    return schemas.ContactCloseResult(closed=closed)
+
+
+@router.post("/close", response_model=schemas.ContactCloseResult)
+async def close_contacts_bulk(
+    payload: schemas.ContactCloseRequest, db: DatabaseRunner = Depends(get_db)
+) -> schemas.ContactCloseResult:
+    return await db.run(_close_contacts, payload)
+
+
+@router.patch("/{contact_id}", response_model=schemas.ContactRead)
+async def update_contact(
+    contact_id: int, payload: schemas.ContactUpdate, db: DatabaseRunner = Depends(get_db)
+) -> schemas.ContactRead:
+    return await db.run(_update_contact, contact_id, payload)
+
+
+class ContactFilters:
+    def __init__(
+        self,
+        source_id: Optional[int] = None,
+        operator_id: Optional[int] = None,
+        contact_status: Optional[str] = Query(None, alias="status"),
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+    ) -> None:
+        self.source_id = source_id
+        self.operator_id = operator_id
+        self.status = contact_status
+        self.created_from = created_from
+        self.created_to = created_to
+
+    def apply(self, query: Select) -> Select:
+        if self.source_id is not None:
+            query = query.where(models.Contact.source_id == self.source_id)
+        if self.operator_id is not None:
+            query = query.where(models.Contact.operator_id == self.operator_id)
+        if self.status is not None:
+            query = query.where(models.Contact.status == self.status)
+        if self.created_from is not None:
+            query = query.where(models.Contact.created_at >= to_naive_utc(self.created_from))
+        if self.created_to is not None:
+            query = query.where(models.Contact.created_at < to_naive_utc(self.created_to))
+        return query
+
+
+def _contact_rows_query() -> Select:
+    return (
+        select(
+            models.Contact.id,
+            models.Contact.lead_id,
+            models.Lead.external_id.label("lead_external_id"),
+            models.Lead.name.label("lead_name"),
+            models.Contact.source_id,
+            models.Source.name.label("source_name"),
+            models.Contact.operator_id,
+            models.Operator.name.label("operator_name"),
+            models.Contact.status,
+            models.Contact.message,
+            models.Contact.created_at,
+        )
+        .join(models.Lead, models.Lead.id == models.Contact.lead_id)
+        .join(models.Source, models.Source.id == models.Contact.source_id)
+        .outerjoin(models.Operator, models.Operator.id == models.Contact.operator_id)
+        .order_by(models.Contact.created_at.desc(), models.Contact.id.desc())
+    )
+
+
+def _list_contacts(db: Session, limit: int, cursor: Optional[str], filters: ContactFilters) -> FastJSONResponse:
+    query = filters.apply(_contact_rows_query()).limit(limit + 1)
+    if cursor is not None:
+        query = query.where(keyset_before(models.Contact.created_at, models.Contact.id, cursor))
+
+    result = db.execute(query)
+    keys = list(result.keys())
+    rows = result.all()
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers[NEXT_CURSOR_HEADER] = encode_cursor(rows[-1].created_at, rows[-1].id)
+
+    # The selected columns already match ContactWithLeadRead, so rows are encoded without building models.
+    return rows_response(keys, rows, headers=headers)
+
+
+@router.get("/", response_model=List[schemas.ContactWithLeadRead])
+async def list_contacts(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    filters: ContactFilters = Depends(),
+    db: DatabaseRunner = Depends(get_db),
+) -> FastJSONResponse:
+    return await db.run(_list_contacts, limit, cursor, filters)
 
 
+@router.get("/export")
+async def export_contacts(
+    export_format: ExportFormat = Query(ExportFormat.ndjson, alias="format"),
+    filters: ContactFilters = Depends(),
+    db: DatabaseRunner = Depends(get_db),
+) -> StreamingResponse:
+    return await stream_export(db, filters.apply(_contact_rows_query()), export_format, "contacts")
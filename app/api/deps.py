@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+from typing import AsyncGenerator, AsyncIterator, Callable, Sequence, TypeVar
+
+from fastapi import Depends
+from sqlalchemy import Row, Select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+
+from ..database import get_async_session, get_session
+
+T = TypeVar("T")
+
+
+# Endpoints are async and hand their ORM work to a runner. The work itself stays written against a
+# sync Session, so both modes share one implementation: the sync runner moves it to the threadpool,
+# the async runner executes it on an AsyncSession through run_sync without blocking the event loop.
+class DatabaseRunner:
+    async def run(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        raise NotImplementedError
+
+    async def stream(self, query: Select, batch_size: int) -> tuple[list[str], AsyncIterator[Sequence[Row]]]:
+        # Column names and the rows in batches of batch_size, fetched while the caller iterates.
+        # The session must stay open until then: request-scoped dependencies close it after the response.
+        raise NotImplementedError
+
+
+class ThreadpoolRunner(DatabaseRunner):
+    def __init__(self, session: Session):
+        self.session = session
+
+    async def run(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        return await run_in_threadpool(fn, self.session, *args, **kwargs)
+
+    async def stream(self, query: Select, batch_size: int) -> tuple[list[str], AsyncIterator[Sequence[Row]]]:
+        result = await run_in_threadpool(self.session.execute, query.execution_options(yield_per=batch_size))
+        return list(result.keys()), iterate_in_threadpool(result.partitions())
+
+
+class AsyncRunner(DatabaseRunner):
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def run(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        return await self.session.run_sync(fn, *args, **kwargs)
+
+    async def stream(self, query: Select, batch_size: int) -> tuple[list[str], AsyncIterator[Sequence[Row]]]:
+        result = await self.session.stream(query.execution_options(yield_per=batch_size))
+        return list(result.keys()), result.partitions()
+
+
+def get_db(session: Session = Depends(get_session)) -> DatabaseRunner:
+    return ThreadpoolRunner(session)
+
+
+async def get_async_db(
+    session: AsyncSession = Depends(get_async_session),
+) -> AsyncGenerator[DatabaseRunner, None]:
+    yield AsyncRunner(session)
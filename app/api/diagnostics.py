@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+from typing import List
+
+from fastapi import APIRouter
+
+from .. import schemas
+from ..query_stats import query_stats
+
+router = APIRouter()
+
+
+@router.get("/queries", response_model=List[schemas.RouteQueryStatsRead])
+async def route_query_stats() -> List[schemas.RouteQueryStatsRead]:
+    return [
+        schemas.RouteQueryStatsRead(
+            method=item.method,
+            path=item.path,
+            requests=item.requests,
+            queries=item.queries,
+            max_queries=item.max_queries,
+            avg_queries=round(item.queries / item.requests, 2),
+            db_time_ms=round(item.db_seconds * 1000, 2),
+        )
+        for item in query_stats.snapshot()
+    ]
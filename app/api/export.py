@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import csv
+import io
+import json
+from datetime import datetime
+from enum import Enum
+from typing import Any, AsyncIterator, Sequence
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select
+
+from .deps import DatabaseRunner
+
+EXPORT_BATCH_SIZE = 1000
+
+
+class ExportFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+MEDIA_TYPES = {
+    ExportFormat.ndjson: "application/x-ndjson",
+    ExportFormat.csv: "text/csv",
+}
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+async def _ndjson_lines(keys: Sequence[str], partitions: AsyncIterator[Sequence[tuple]]) -> AsyncIterator[str]:
+    async for rows in partitions:
+        yield "".join(
+            json.dumps({key: _encode_value(value) for key, value in zip(keys, row)}, ensure_ascii=False) + "\n"
+            for row in rows
+        )
+
+
+async def _csv_lines(keys: Sequence[str], partitions: AsyncIterator[Sequence[tuple]]) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(keys)
+    async for rows in partitions:
+        writer.writerows([[_encode_value(value) for value in row] for row in rows])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+async def stream_export(
+    db: DatabaseRunner, query: Select, export_format: ExportFormat, name: str
+) -> StreamingResponse:
+    # The query runs before the headers are sent; the request's session stays open while the rows
+    # are fetched batch by batch and encoded.
+    keys, partitions = await db.stream(query, EXPORT_BATCH_SIZE)
+    encode = _csv_lines if export_format == ExportFormat.csv else _ndjson_lines
+    return StreamingResponse(
+        encode(keys, partitions),
+        media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{export_format.value}"'},
+    )
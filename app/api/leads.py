@@ -1,52 +1,147 @@
 from __future__ import annotations
 
-from typing import List
+from collections import defaultdict
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session, joinedload
+from fastapi import APIRouter, Depends, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Row, func, select
+from sqlalchemy.orm import Session
 
 from .. import models, schemas
-from ..database import get_session
+from .deps import DatabaseRunner, get_db
+from .export import ExportFormat, stream_export
+from .pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, encode_cursor, keyset_before
+
+DEFAULT_CONTACTS_PER_LEAD = 20
+MAX_CONTACTS_PER_LEAD = 100
 
 router = APIRouter()
 
 
-@router.get("/", response_model=List[schemas.LeadWithContactsRead])
-def list_leads(db: Session = Depends(get_session)) -> List[schemas.LeadWithContactsRead]:
-    leads = (
-        db.query(models.Lead)
-        .options(
-            joinedload(models.Lead.contacts).joinedload(models.Contact.operator),
-            joinedload(models.Lead.contacts).joinedload(models.Contact.source),
+def _lead_page(db: Session, response: Response, limit: int, cursor: Optional[str]) -> list[Row]:
+    query = (
+        select(models.Lead.id, models.Lead.external_id, models.Lead.name, models.Lead.created_at)
+        .order_by(models.Lead.created_at.desc(), models.Lead.id.desc())
+        .limit(limit + 1)
+    )
+    if cursor is not None:
+        query = query.where(keyset_before(models.Lead.created_at, models.Lead.id, cursor))
+
+    rows = db.execute(query).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(rows[-1].created_at, rows[-1].id)
+    return rows
+
+
+def _recent_contacts(db: Session, lead_ids: list[int], per_lead: int) -> dict[int, list[schemas.ContactRead]]:
+    position = (
+        func.row_number()
+        .over(
+            partition_by=models.Contact.lead_id,
+            order_by=(models.Contact.created_at.desc(), models.Contact.id.desc()),
         )
-        .order_by(models.Lead.created_at.desc())
-        .all()
+        .label("position")
     )
+    ranked = (
+        select(
+            models.Contact.id,
+            models.Contact.lead_id,
+            models.Contact.source_id,
+            models.Contact.operator_id,
+            models.Operator.name.label("operator_name"),
+            models.Contact.status,
+            models.Contact.message,
+            models.Contact.created_at,
+            position,
+        )
+        .outerjoin(models.Operator, models.Operator.id == models.Contact.operator_id)
+        .where(models.Contact.lead_id.in_(lead_ids))
+        .subquery()
+    )
+    query = (
+        select(ranked)
+        .where(ranked.c.position <= per_lead)
+        .order_by(ranked.c.lead_id, ranked.c.position)
+    )
+
+    contacts: dict[int, list[schemas.ContactRead]] = defaultdict(list)
+    for row in db.execute(query):
+        contacts[row.lead_id].append(schemas.ContactRead(**row._mapping))
+    return contacts
+
+
+def _list_leads(
+    db: Session, response: Response, limit: int, cursor: Optional[str], contacts_limit: int
+) -> List[schemas.LeadWithContactsRead]:
+    leads = _lead_page(db, response, limit, cursor)
+    contacts = _recent_contacts(db, [lead.id for lead in leads], contacts_limit) if leads and contacts_limit else {}
 
-    result: List[schemas.LeadWithContactsRead] = []
-    for lead in leads:
-        contacts = [
-            schemas.ContactRead(
-                id=contact.id,
-                lead_id=contact.lead_id,
-                source_id=contact.source_id,
-                operator_id=contact.operator_id,
-                operator_name=contact.operator.name if contact.operator else None,
-                status=contact.status,
-                message=contact.message,
-                created_at=contact.created_at,
-            )
-            for contact in sorted(lead.contacts, key=lambda contact: contact.created_at, reverse=True)
-        ]
-        result.append(
-            schemas.LeadWithContactsRead(
-                id=lead.id,
-                external_id=lead.external_id,
-                name=lead.name,
-                created_at=lead.created_at,
-                contacts=contacts,
-            )
+    return [
+        schemas.LeadWithContactsRead(
+            id=lead.id,
+            external_id=lead.external_id,
+            name=lead.name,
+            created_at=lead.created_at,
+            contacts=contacts.get(lead.id, []),
         )
-    return result
+        for lead in leads
+    ]
 
 
+def _list_lead_summaries(
+    db: Session, response: Response, limit: int, cursor: Optional[str]
+) -> List[schemas.LeadSummaryRead]:
+    leads = _lead_page(db, response, limit, cursor)
+    counts: dict[int, int] = {}
+    if leads:
+        counts = dict(
+            db.execute(
+                select(models.Contact.lead_id, func.count(models.Contact.id))
+                .where(models.Contact.lead_id.in_([lead.id for lead in leads]))
+                .group_by(models.Contact.lead_id)
+            ).all()
+        )
+
+    return [
+        schemas.LeadSummaryRead(
+            id=lead.id,
+            external_id=lead.external_id,
+            name=lead.name,
+            created_at=lead.created_at,
+            contacts_count=counts.get(lead.id, 0),
+        )
+        for lead in leads
+    ]
+
+
+@router.get("/", response_model=List[schemas.LeadWithContactsRead])
+async def list_leads(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    contacts_limit: int = Query(DEFAULT_CONTACTS_PER_LEAD, ge=0, le=MAX_CONTACTS_PER_LEAD),
+    db: DatabaseRunner = Depends(get_db),
+) -> List[schemas.LeadWithContactsRead]:
+    return await db.run(_list_leads, response, limit, cursor, contacts_limit)
+
+
+@router.get("/summary", response_model=List[schemas.LeadSummaryRead])
+async def list_lead_summaries(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: DatabaseRunner = Depends(get_db),
+) -> List[schemas.LeadSummaryRead]:
+    return await db.run(_list_lead_summaries, response, limit, cursor)
+
+
+@router.get("/export")
+async def export_leads(
+    export_format: ExportFormat = Query(ExportFormat.ndjson, alias="format"), db: DatabaseRunner = Depends(get_db)
+) -> StreamingResponse:
+    query = select(models.Lead.id, models.Lead.external_id, models.Lead.name, models.Lead.created_at).order_by(
+        models.Lead.created_at.desc(), models.Lead.id.desc()
+    )
+    return await stream_export(db, query, export_format, "leads")
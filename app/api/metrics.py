@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import Pool
+
+from .. import metrics, models
+from ..database import engine, started_async_engine
+from .deps import DatabaseRunner, get_db
+
+POOL_STATES = ("size", "checkedin", "checkedout", "overflow")
+
+router = APIRouter()
+
+
+def _refresh_operator_gauges(db: Session) -> None:
+    rows = db.execute(
+        select(models.Operator.id, models.Operator.name, models.Operator.active_load, models.Operator.load_limit)
+    ).all()
+    metrics.operator_load.replace({(str(row.id), row.name): row.active_load for row in rows})
+    metrics.operator_load_limit.replace({(str(row.id),): row.load_limit for row in rows})
+
+
+def _pool_values(name: str, pool: Pool) -> dict[tuple[str, str], float]:
+    # StaticPool and friends do not implement every counter; report whatever the pool offers.
+    return {
+        (name, state): getattr(pool, state)()
+        for state in POOL_STATES
+        if callable(getattr(pool, state, None))
+    }
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def read_metrics(db: DatabaseRunner = Depends(get_db)) -> PlainTextResponse:
+    await db.run(_refresh_operator_gauges)
+    pools = _pool_values("sync", engine.pool)
+    async_engine = started_async_engine()
+    if async_engine is not None:
+        pools.update(_pool_values("async", async_engine.pool))
+    metrics.db_pool.replace(pools)
+    return PlainTextResponse(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
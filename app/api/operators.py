@@ -3,11 +3,14 @@ from __future__ import annotations
 from typing import List
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import func
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from .. import models, schemas
-from ..database import get_session
+from ..services.pending import dispatch_pending
+from ..services.routing import routing_cache
+from .deps import DatabaseRunner, get_db
+from .responses import FastJSONResponse, rows_response
 
 router = APIRouter()
 
@@ -19,83 +22,83 @@ def _get_operator(db: Session, operator_id: int) -> models.Operator:
     return operator
 
 
-def _count_active_contacts(db: Session, operator_id: int) -> int:
-    return (
-        db.query(func.count(models.Contact.id))
-        .filter(models.Contact.operator_id == operator_id, models.Contact.status == "active")
-        .scalar()
-        or 0
-    )
-
-
-@router.post("/", response_model=schemas.OperatorRead, status_code=status.HTTP_201_CREATED)
-def create_operator(payload: schemas.OperatorCreate, db: Session = Depends(get_session)) -> schemas.OperatorRead:
-    operator = models.Operator(**payload.dict())
-    db.add(operator)
-    db.commit()
-    db.refresh(operator)
-    current_load = _count_active_contacts(db, operator.id)
+def _to_operator_read(operator: models.Operator) -> schemas.OperatorRead:
     return schemas.OperatorRead(
         id=operator.id,
         name=operator.name,
         active=operator.active,
         load_limit=operator.load_limit,
         created_at=operator.created_at,
-        current_load=current_load,
+        current_load=operator.active_load,
     )
 
 
-@router.get("/", response_model=List[schemas.OperatorRead])
-def list_operators(db: Session = Depends(get_session)) -> List[schemas.OperatorRead]:
-    operators = db.query(models.Operator).order_by(models.Operator.id).all()
-    if not operators:
-        return []
-
-    operator_ids = [operator.id for operator in operators]
-    loads = dict(
-        db.query(models.Contact.operator_id, func.count(models.Contact.id))
-        .filter(
-            models.Contact.operator_id.in_(operator_ids),
-            models.Contact.status == "active",
-        )
-        .group_by(models.Contact.operator_id)
-        .all()
+def _create_operator(db: Session, payload: schemas.OperatorCreate) -> schemas.OperatorRead:
+    operator = models.Operator(**payload.dict())
+    db.add(operator)
+    db.commit()
+    # Operators can serve many sources, and updates are rare, so drop every routing snapshot.
+    routing_cache.invalidate()
+    return _to_operator_read(operator)
+
+
+def _list_operators(db: Session) -> FastJSONResponse:
+    # Plain column tuples straight to JSON: no identity map and no per-row model validation.
+    result = db.execute(
+        select(
+            models.Operator.id,
+            models.Operator.name,
+            models.Operator.active,
+            models.Operator.load_limit,
+            models.Operator.created_at,
+            models.Operator.active_load.label("current_load"),
+        ).order_by(models.Operator.id)
     )
+    return rows_response(list(result.keys()), result)
 
-    return [
-        schemas.OperatorRead(
-            id=operator.id,
-            name=operator.name,
-            active=operator.active,
-            load_limit=operator.load_limit,
-            created_at=operator.created_at,
-            current_load=loads.get(operator.id, 0),
-        )
-        for operator in operators
-    ]
 
+def _gains_capacity(operator: models.Operator, update_data: dict) -> bool:
+    if update_data.get("active") and not operator.active:
+        return True
+    limit = update_data.get("load_limit", operator.load_limit)
+    return limit != operator.load_limit and (limit == 0 or 0 < operator.load_limit < limit)
 
-@router.patch("/{operator_id}", response_model=schemas.OperatorRead)
-def update_operator(
-    operator_id: int, payload: schemas.OperatorUpdate, db: Session = Depends(get_session)
-) -> schemas.OperatorRead:
+
+def _update_operator(db: Session, operator_id: int, payload: schemas.OperatorUpdate) -> schemas.OperatorRead:
     operator = _get_operator(db, operator_id)
 
     update_data = payload.dict(exclude_unset=True)
+    backfill = _gains_capacity(operator, update_data)
     for key, value in update_data.items():
         setattr(operator, key, value)
 
     db.add(operator)
     db.commit()
-    db.refresh(operator)
-    current_load = _count_active_contacts(db, operator.id)
-    return schemas.OperatorRead(
-        id=operator.id,
-        name=operator.name,
-        active=operator.active,
-        load_limit=operator.load_limit,
-        created_at=operator.created_at,
-        current_load=current_load,
-    )
+    # Operators can serve many sources, and updates are rare, so drop every routing snapshot.
+    routing_cache.invalidate()
+    if backfill:
+        # Reactivation or a higher limit frees room for contacts queued on this operator's sources.
+        dispatch_pending(db, operator_ids=[operator_id])
+        db.commit()
+        # The backfill raised active_load with a Core UPDATE, which the loaded operator does not see.
+        db.refresh(operator)
+    return _to_operator_read(operator)
 
 
+@router.post("/", response_model=schemas.OperatorRead, status_code=status.HTTP_201_CREATED)
+async def create_operator(
+    payload: schemas.OperatorCreate, db: DatabaseRunner = Depends(get_db)
+) -> schemas.OperatorRead:
+    return await db.run(_create_operator, payload)
+
+
+@router.get("/", response_model=List[schemas.OperatorRead])
+async def list_operators(db: DatabaseRunner = Depends(get_db)) -> FastJSONResponse:
+    return await db.run(_list_operators)
+
+
+@router.patch("/{operator_id}", response_model=schemas.OperatorRead)
+async def update_operator(
+    operator_id: int, payload: schemas.OperatorUpdate, db: DatabaseRunner = Depends(get_db)
+) -> schemas.OperatorRead:
+    return await db.run(_update_operator, operator_id, payload)
@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import base64
+import json
+from datetime import datetime, timezone
+
+from fastapi import HTTPException, status
+from sqlalchemy import ColumnElement, tuple_
+from sqlalchemy.orm import InstrumentedAttribute
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def to_naive_utc(value: datetime) -> datetime:
+    # Timestamps are stored as naive UTC (CURRENT_TIMESTAMP), so aware inputs are converted first.
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = json.dumps([created_at.isoformat(), row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, row_id = json.loads(raw)
+        return to_naive_utc(datetime.fromisoformat(created_at)), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def keyset_before(created_at: InstrumentedAttribute, row_id: InstrumentedAttribute, cursor: str) -> ColumnElement:
+    cursor_created_at, cursor_id = decode_cursor(cursor)
+    return tuple_(created_at, row_id) < (cursor_created_at, cursor_id)
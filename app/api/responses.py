@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import json
+from datetime import datetime
+from typing import Any, Iterable, Mapping, Optional, Sequence
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - the stdlib encoder produces the same documents, only slower
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dump_json(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+class FastJSONResponse(Response):
+    # Renders plain dicts and lists straight to bytes. Endpoints returning it bypass response_model
+    # validation, so it is only used for rows read from the database in the documented shape.
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dump_json(content)
+
+
+def rows_response(
+    keys: Sequence[str], rows: Iterable[Sequence], headers: Optional[Mapping[str, str]] = None
+) -> FastJSONResponse:
+    return FastJSONResponse([dict(zip(keys, row)) for row in rows], headers=headers)
@@ -3,10 +3,14 @@ from __future__ import annotations
 from typing import List
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select
 from sqlalchemy.orm import Session, joinedload
 
 from .. import models, schemas
-from ..database import get_session
+from ..services.pending import dispatch_pending
+from ..services.routing import routing_cache
+from .deps import DatabaseRunner, get_db
+from .responses import FastJSONResponse
 
 router = APIRouter()
 
@@ -23,20 +27,22 @@ def _get_source(db: Session, source_id: int) -> models.Source:
     return source
 
 
-def _ensure_operator_exists(db: Session, operator_id: int) -> None:
-    if db.get(models.Operator, operator_id) is None:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Operator {operator_id} does not exist",
-        )
+def _ensure_operators_exist(db: Session, operator_ids: List[int]) -> None:
+    existing = set(db.execute(select(models.Operator.id).where(models.Operator.id.in_(operator_ids))).scalars())
+    for operator_id in operator_ids:
+        if operator_id not in existing:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Operator {operator_id} does not exist",
+            )
 
 
 def _apply_assignments(db: Session, source: models.Source, assignments: List[schemas.SourceAssignmentInput]) -> None:
+    _ensure_operators_exist(db, [assignment_input.operator_id for assignment_input in assignments])
     existing = {assignment.operator_id: assignment for assignment in source.assignments}
     desired_ids = set()
 
     for assignment_input in assignments:
-        _ensure_operator_exists(db, assignment_input.operator_id)
         desired_ids.add(assignment_input.operator_id)
 
         if assignment_input.operator_id in existing:
@@ -67,14 +73,26 @@ def _to_source_read(source: models.Source) -> schemas.SourceRead:
         id=source.id,
         name=source.name,
         description=source.description,
+        allocation_strategy=source.allocation_strategy,
+        pending_order=source.pending_order,
+        admission_rate=source.admission_rate,
+        admission_burst=source.admission_burst,
         created_at=source.created_at,
         assignments=assignments,
     )
 
 
-@router.post("/", response_model=schemas.SourceRead, status_code=status.HTTP_201_CREATED)
-def create_source(payload: schemas.SourceCreate, db: Session = Depends(get_session)) -> schemas.SourceRead:
-    source = models.Source(name=payload.name, description=payload.description)
+def _create_source(db: Session, payload: schemas.SourceCreate) -> schemas.SourceRead:
+    # An initialized collection keeps _apply_assignments from lazy-loading the (empty) assignments.
+    source = models.Source(
+        name=payload.name,
+        description=payload.description,
+        allocation_strategy=payload.allocation_strategy,
+        pending_order=payload.pending_order,
+        admission_rate=payload.admission_rate,
+        admission_burst=payload.admission_burst,
+        assignments=[],
+    )
     db.add(source)
     db.flush()
 
@@ -82,25 +100,70 @@ def create_source(payload: schemas.SourceCreate, db: Session = Depends(get_sessi
         _apply_assignments(db, source, list(payload.assignments))
 
     db.commit()
-    db.refresh(source)
-    return _to_source_read(source)
-
-
-@router.get("/", response_model=List[schemas.SourceRead])
-def list_sources(db: Session = Depends(get_session)) -> List[schemas.SourceRead]:
-    sources = (
-        db.query(models.Source)
-        .options(joinedload(models.Source.assignments).joinedload(models.SourceOperatorAssignment.operator))
-        .order_by(models.Source.id)
-        .all()
+    routing_cache.invalidate(source.id)
+    # One joined query instead of a refresh plus a lazy load per assignment.
+    return _to_source_read(_get_source(db, source.id))
+
+
+def _list_sources(db: Session) -> FastJSONResponse:
+    # One flat outer join read as tuples; rows arrive grouped by source, so assignments are
+    # appended to the last source seen instead of hydrating Source and assignment objects.
+    assignment = models.SourceOperatorAssignment
+    rows = db.execute(
+        select(
+            models.Source.id,
+            models.Source.name,
+            models.Source.description,
+            models.Source.allocation_strategy,
+            models.Source.pending_order,
+            models.Source.admission_rate,
+            models.Source.admission_burst,
+            models.Source.created_at,
+            assignment.operator_id,
+            models.Operator.name,
+            assignment.weight,
+        )
+        .outerjoin(assignment, assignment.source_id == models.Source.id)
+        .outerjoin(models.Operator, models.Operator.id == assignment.operator_id)
+        .order_by(models.Source.id, assignment.operator_id)
     )
-    return [_to_source_read(source) for source in sources]
 
+    sources: list[dict] = []
+    for (
+        source_id,
+        name,
+        description,
+        strategy,
+        pending_order,
+        admission_rate,
+        admission_burst,
+        created_at,
+        operator_id,
+        operator_name,
+        weight,
+    ) in rows:
+        if not sources or sources[-1]["id"] != source_id:
+            sources.append(
+                {
+                    "id": source_id,
+                    "name": name,
+                    "description": description,
+                    "allocation_strategy": strategy,
+                    "pending_order": pending_order,
+                    "admission_rate": admission_rate,
+                    "admission_burst": admission_burst,
+                    "created_at": created_at,
+                    "assignments": [],
+                }
+            )
+        if operator_id is not None:
+            sources[-1]["assignments"].append(
+                {"operator_id": operator_id, "operator_name": operator_name or "", "weight": weight}
+            )
+    return FastJSONResponse(sources)
 
-@router.patch("/{source_id}", response_model=schemas.SourceRead)
-def update_source(
-    source_id: int, payload: schemas.SourceUpdate, db: Session = Depends(get_session)
-) -> schemas.SourceRead:
+
+def _update_source(db: Session, source_id: int, payload: schemas.SourceUpdate) -> schemas.SourceRead:
     source = _get_source(db, source_id)
 
     update_data = payload.dict(exclude_unset=True, exclude={"assignments"})
@@ -112,9 +175,36 @@ def update_source(
 
     db.add(source)
     db.commit()
-    db.refresh(source)
+    routing_cache.invalidate(source_id)
+    if payload.assignments is not None:
+        # New or reweighted operators may have room for contacts that were waiting in the queue.
+        dispatch_pending(db, source_ids=[source_id])
+        db.commit()
 
     source = _get_source(db, source_id)
     return _to_source_read(source)
 
 
+@router.post("/", response_model=schemas.SourceRead, status_code=status.HTTP_201_CREATED)
+async def create_source(payload: schemas.SourceCreate, db: DatabaseRunner = Depends(get_db)) -> schemas.SourceRead:
+    return await db.run(_create_source, payload)
+
+
+@router.get("/", response_model=List[schemas.SourceRead])
+async def list_sources(db: DatabaseRunner = Depends(get_db)) -> FastJSONResponse:
+    return await db.run(_list_sources)
+
+
+@router.get("/routing-cache", response_model=schemas.RoutingCacheStatsRead)
+async def routing_cache_stats() -> schemas.RoutingCacheStatsRead:
+    stats = routing_cache.stats()
+    return schemas.RoutingCacheStatsRead(
+        hits=stats.hits, misses=stats.misses, invalidations=stats.invalidations, size=stats.size
+    )
+
+
+@router.patch("/{source_id}", response_model=schemas.SourceRead)
+async def update_source(
+    source_id: int, payload: schemas.SourceUpdate, db: DatabaseRunner = Depends(get_db)
+) -> schemas.SourceRead:
+    return await db.run(_update_source, source_id, payload)
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+
+from .. import schemas
+from ..services.rollups import BUCKET_SPANS, HOUR, floor_bucket, query_rollups, utc_now
+from .deps import DatabaseRunner, get_db
+from .pagination import to_naive_utc
+
+# Buckets returned when start is omitted, and the most a single query may span.
+DEFAULT_BUCKETS = {"hour": 48, "day": 30, "week": 26}
+MAX_BUCKETS = 2000
+
+router = APIRouter()
+
+
+class StatsRange:
+    def __init__(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        granularity: schemas.StatsGranularity = HOUR,
+    ) -> None:
+        # Buckets cover [start, end); start is aligned down to the granularity, the default end
+        # includes the current bucket.
+        span = BUCKET_SPANS[granularity]
+        self.granularity = granularity
+        self.end = to_naive_utc(end) if end else floor_bucket(utc_now(), granularity) + span
+        self.start = floor_bucket(
+            to_naive_utc(start) if start else self.end - span * DEFAULT_BUCKETS[granularity], granularity
+        )
+        if self.start >= self.end:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="start must be before end")
+        if (self.end - self.start) / span > MAX_BUCKETS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Range spans more than {MAX_BUCKETS} {granularity} buckets, use a coarser granularity",
+            )
+
+
+def _source_stats(db: Session, stats_range: StatsRange, source_id: Optional[int]) -> List[schemas.SourceStatsRead]:
+    rows = query_rollups(
+        db, stats_range.start, stats_range.end, stats_range.granularity, by="source", source_id=source_id
+    )
+    return [
+        schemas.SourceStatsRead(
+            bucket=row.bucket, source_id=row.key, created=row.created, unassigned=row.unassigned, closed=row.closed
+        )
+        for row in rows
+    ]
+
+
+def _operator_stats(
+    db: Session, stats_range: StatsRange, operator_id: Optional[int], source_id: Optional[int]
+) -> List[schemas.OperatorStatsRead]:
+    rows = query_rollups(
+        db,
+        stats_range.start,
+        stats_range.end,
+        stats_range.granularity,
+        by="operator",
+        source_id=source_id,
+        operator_id=operator_id,
+    )
+    return [
+        schemas.OperatorStatsRead(
+            bucket=row.bucket, operator_id=row.key, created=row.created, unassigned=row.unassigned, closed=row.closed
+        )
+        for row in rows
+    ]
+
+
+@router.get("/sources", response_model=List[schemas.SourceStatsRead])
+async def source_stats(
+    stats_range: StatsRange = Depends(),
+    source_id: Optional[int] = Query(None),
+    db: DatabaseRunner = Depends(get_db),
+) -> List[schemas.SourceStatsRead]:
+    return await db.run(_source_stats, stats_range, source_id)
+
+
+@router.get("/operators", response_model=List[schemas.OperatorStatsRead])
+async def operator_stats(
+    stats_range: StatsRange = Depends(),
+    operator_id: Optional[int] = Query(None),
+    source_id: Optional[int] = Query(None),
+    db: DatabaseRunner = Depends(get_db),
+) -> List[schemas.OperatorStatsRead]:
+    return await db.run(_operator_stats, stats_range, operator_id, source_id)
@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from dataclasses import asdict
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Sequence
+
+from .database import engine, session_scope
+from .schema import MIGRATIONS, SCHEMA_VERSION, migrate, schema_version
+from .services.loads import reconcile_operator_loads
+from .services.rollups import backfill_rollups
+from .services.routing import ALLOCATION_STRATEGIES
+
+
+def _reconcile_loads(args: argparse.Namespace) -> int:
+    with session_scope() as session:
+        drift = reconcile_operator_loads(session, fix=not args.dry_run)
+
+    for item in drift:
+        print(f"operator {item.operator_id}: stored={item.stored} actual={item.actual}")
+    action = "found" if args.dry_run else "fixed"
+    print(f"{len(drift)} operator load counter(s) with drift {action}")
+    return 1 if drift and args.dry_run else 0
+
+
+def _migrate(args: argparse.Namespace) -> int:
+    current = schema_version(engine) or 0
+    if args.status:
+        pending = [migration for migration in MIGRATIONS if migration.version > current]
+        for migration in pending:
+            print(f"pending {migration.version}: {migration.name}")
+        print(f"schema version {current}, latest {SCHEMA_VERSION}")
+        return 1 if pending else 0
+
+    for migration in migrate(engine):
+        print(f"applied {migration.version}: {migration.name}")
+    print(f"schema version {SCHEMA_VERSION}")
+    return 0
+
+
+def _backfill_stats(args: argparse.Namespace) -> int:
+    with session_scope() as session:
+        rows = backfill_rollups(session, since=args.since)
+
+    scope = f"since {args.since:%Y-%m-%d %H:00}" if args.since else "for all contacts"
+    print(f"{rows} hourly rollup row(s) rebuilt {scope}")
+    return 0
+
+
+def _assignment(value: str) -> tuple[str, int]:
+    key, separator, number = value.partition("=")
+    if not separator:
+        raise argparse.ArgumentTypeError(f"expected KEY=VALUE, got {value!r}")
+    return key, int(number)
+
+
+def _rate(value: str) -> tuple[int, float]:
+    source_id, separator, rate = value.partition("=")
+    if not separator:
+        raise argparse.ArgumentTypeError(f"expected SOURCE_ID=PER_HOUR, got {value!r}")
+    return int(source_id), float(rate)
+
+
+def _strategy(value: str) -> tuple[int, str]:
+    source_id, separator, strategy = value.partition("=")
+    if not separator or strategy not in ALLOCATION_STRATEGIES:
+        raise argparse.ArgumentTypeError(
+            f"expected SOURCE_ID=STRATEGY with one of {', '.join(ALLOCATION_STRATEGIES)}, got {value!r}"
+        )
+    return int(source_id), strategy
+
+
+def _simulate(args: argparse.Namespace) -> int:
+    # NumPy is only needed by the simulator, so it is imported here rather than for every command.
+    from .services.simulation import history_stream, load_config, observed_rates, poisson_stream, simulate
+
+    load_limits = {int(operator_id): limit for operator_id, limit in args.set_limit}
+    weights = {}
+    for key, weight in args.set_weight:
+        source_id, _, operator_id = key.partition(":")
+        weights[(int(source_id), int(operator_id))] = weight
+
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    with session_scope() as session:
+        config = load_config(session, include_current_load=args.current_load).with_overrides(
+            load_limits, weights, dict(args.set_strategy)
+        )
+        if args.replay_days:
+            stream = history_stream(session, now - timedelta(days=args.replay_days), args.handle_minutes, args.seed)
+        else:
+            rates = observed_rates(session, now - timedelta(days=args.rate_window_days), now)
+            rates.update(dict(args.rate))
+            stream = poisson_stream(rates, args.hours, args.handle_minutes, args.seed)
+
+    result = simulate(config, stream, seed=args.seed)
+    if args.json:
+        report = {key: value for key, value in asdict(result).items() if key != "assignments"}
+        report.update(unassigned_rate=result.unassigned_rate, events_per_second=result.events_per_second)
+        print(json.dumps(report, indent=2))
+        return 0
+
+    print(
+        f"{result.arrivals} contacts, {result.events} events in {result.elapsed_seconds:.2f}s "
+        f"({result.events_per_second:,.0f} events/s)"
+    )
+    print(f"unassigned: {result.unassigned_rate:.2%} " + " ".join(f"{k}={v}" for k, v in result.unassigned.items()))
+    for operator in result.operators:
+        saturated = "never" if operator.saturated_at is None else f"{operator.saturated_at / 3600:.2f}h"
+        share = operator.assigned / result.arrivals if result.arrivals else 0.0
+        print(
+            f"operator {operator.operator_id}: assigned={operator.assigned} ({share:.1%}) "
+            f"limit={operator.load_limit or 'none'} peak={operator.peak_load} saturated={saturated}"
+        )
+    for source in result.sources:
+        print(f"source {source.source_id}: arrivals={source.arrivals} unassigned={source.unassigned}")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Mini CRM maintenance commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    migrate_parser = subparsers.add_parser("migrate", help="Apply pending schema migrations")
+    migrate_parser.add_argument(
+        "--status", action="store_true", help="Only list pending migrations, exit with 1 if there are any"
+    )
+    migrate_parser.set_defaults(handler=_migrate)
+
+    reconcile = subparsers.add_parser(
+        "reconcile-loads", help="Recompute operator load counters from active contacts and report drift"
+    )
+    reconcile.add_argument("--dry-run", action="store_true", help="Only report drift, do not fix counters")
+    reconcile.set_defaults(handler=_reconcile_loads)
+
+    backfill = subparsers.add_parser(
+        "backfill-stats", help="Rebuild the hourly allocation rollups behind /stats from stored contacts"
+    )
+    backfill.add_argument(
+        "--since",
+        type=datetime.fromisoformat,
+        help="Only rebuild buckets from this UTC timestamp on (YYYY-MM-DD[THH:MM]); everything by default",
+    )
+    backfill.set_defaults(handler=_backfill_stats)
+
+    simulate = subparsers.add_parser(
+        "simulate", help="Replay a contact stream through the current routing configuration offline"
+    )
+    simulate.add_argument(
+        "--replay-days", type=float, help="Replay contacts created in the last N days instead of a synthetic stream"
+    )
+    simulate.add_argument("--hours", type=float, default=24.0, help="Length of the synthetic stream")
+    simulate.add_argument(
+        "--rate",
+        type=_rate,
+        action="append",
+        default=[],
+        metavar="SOURCE_ID=PER_HOUR",
+        help="Arrival rate of a source; others use their observed rate",
+    )
+    simulate.add_argument(
+        "--rate-window-days", type=float, default=7.0, help="History window for observed arrival rates"
+    )
+    simulate.add_argument(
+        "--handle-minutes", type=float, default=30.0, help="Mean time until a contact is closed, 0 keeps them open"
+    )
+    simulate.add_argument(
+        "--set-limit",
+        type=_assignment,
+        action="append",
+        default=[],
+        metavar="OPERATOR_ID=LIMIT",
+        help="Try a different load_limit",
+    )
+    simulate.add_argument(
+        "--set-weight",
+        type=_assignment,
+        action="append",
+        default=[],
+        metavar="SOURCE_ID:OPERATOR_ID=WEIGHT",
+        help="Try a different assignment weight",
+    )
+    simulate.add_argument(
+        "--set-strategy",
+        type=_strategy,
+        action="append",
+        default=[],
+        metavar="SOURCE_ID=STRATEGY",
+        help="Try a different allocation_strategy",
+    )
+    simulate.add_argument(
+        "--current-load", action="store_true", help="Start from the stored active loads instead of empty operators"
+    )
+    simulate.add_argument("--seed", type=int, help="Seed for arrivals, handling times and draws")
+    simulate.add_argument("--json", action="store_true", help="Print the result as JSON")
+    simulate.set_defaults(handler=_simulate)
+
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,23 +2,106 @@ from __future__ import annotations
 
 import os
 from contextlib import contextmanager
-from typing import Generator
+from dataclasses import dataclass
+from typing import Any, AsyncGenerator, Generator, Optional
 
-from sqlalchemy import create_engine
+from sqlalchemy import Engine, create_engine, event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base, sessionmaker, Session
 from sqlalchemy.pool import StaticPool
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./crm.db")
+DB_MODE = os.getenv("DB_MODE", "sync")
 
-connect_args = {}
-engine_kwargs = {}
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
 
-if DATABASE_URL.startswith("sqlite"):
-    connect_args["check_same_thread"] = False
-    if ":memory:" in DATABASE_URL:
-        engine_kwargs["poolclass"] = StaticPool
 
-engine = create_engine(DATABASE_URL, connect_args=connect_args, **engine_kwargs)
+def _env_bool(name: str, default: bool) -> bool:
+    return os.getenv(name, str(default)).strip().lower() in {"1", "true", "yes", "on"}
+
+
+@dataclass(frozen=True)
+class EngineSettings:
+    # SQLite: applied as pragmas on every new connection.
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_busy_timeout_ms: int = 5000
+    # Negative cache_size is in KiB, so the page cache is about 64 MiB regardless of page size.
+    sqlite_cache_size: int = -64000
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+    # Server databases: QueuePool parameters.
+    pool_size: int = 5
+    max_overflow: int = 10
+    pool_timeout: float = 30.0
+    pool_recycle: int = 1800
+    pool_pre_ping: bool = True
+
+    @classmethod
+    def from_env(cls) -> EngineSettings:
+        return cls(
+            sqlite_journal_mode=os.getenv("SQLITE_JOURNAL_MODE", cls.sqlite_journal_mode),
+            sqlite_synchronous=os.getenv("SQLITE_SYNCHRONOUS", cls.sqlite_synchronous),
+            sqlite_busy_timeout_ms=int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", cls.sqlite_busy_timeout_ms)),
+            sqlite_cache_size=int(os.getenv("SQLITE_CACHE_SIZE", cls.sqlite_cache_size)),
+            sqlite_mmap_size=int(os.getenv("SQLITE_MMAP_SIZE", cls.sqlite_mmap_size)),
+            pool_size=int(os.getenv("DB_POOL_SIZE", cls.pool_size)),
+            max_overflow=int(os.getenv("DB_MAX_OVERFLOW", cls.max_overflow)),
+            pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", cls.pool_timeout)),
+            pool_recycle=int(os.getenv("DB_POOL_RECYCLE", cls.pool_recycle)),
+            pool_pre_ping=_env_bool("DB_POOL_PRE_PING", cls.pool_pre_ping),
+        )
+
+    def sqlite_pragmas(self, in_memory: bool) -> list[tuple[str, Any]]:
+        pragmas = [
+            ("busy_timeout", self.sqlite_busy_timeout_ms),
+            ("synchronous", self.sqlite_synchronous),
+            ("cache_size", self.sqlite_cache_size),
+        ]
+        if not in_memory:
+            # WAL and mmap only make sense for a database file.
+            pragmas = [("journal_mode", self.sqlite_journal_mode), *pragmas, ("mmap_size", self.sqlite_mmap_size)]
+        return pragmas
+
+
+def engine_options(url: str, settings: EngineSettings) -> dict[str, Any]:
+    if url.startswith("sqlite"):
+        options: dict[str, Any] = {"connect_args": {"check_same_thread": False}}
+        if ":memory:" in url:
+            options["poolclass"] = StaticPool
+        return options
+    return {
+        "pool_size": settings.pool_size,
+        "max_overflow": settings.max_overflow,
+        "pool_timeout": settings.pool_timeout,
+        "pool_recycle": settings.pool_recycle,
+        "pool_pre_ping": settings.pool_pre_ping,
+    }
+
+
+def install_sqlite_pragmas(sync_engine: Engine, url: str, settings: EngineSettings) -> None:
+    if not url.startswith("sqlite"):
+        return
+    pragmas = settings.sqlite_pragmas(in_memory=":memory:" in url)
+
+    @event.listens_for(sync_engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas:
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+def create_db_engine(url: str, settings: Optional[EngineSettings] = None) -> Engine:
+    settings = settings or EngineSettings.from_env()
+    db_engine = create_engine(url, **engine_options(url, settings))
+    install_sqlite_pragmas(db_engine, url, settings)
+    return db_engine
+
+
+engine = create_db_engine(DATABASE_URL)
 
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False, expire_on_commit=False)
 
@@ -46,3 +129,40 @@ def session_scope() -> Generator[Session, None, None]:
         session.close()
 
 
+def async_database_url(url: str) -> str:
+    scheme, _, rest = url.partition("://")
+    driver = ASYNC_DRIVERS.get(scheme.split("+")[0])
+    if driver is None:
+        raise ValueError(f"No async driver configured for {scheme}")
+    return f"{driver}://{rest}"
+
+
+_async_engine: Optional[AsyncEngine] = None
+_async_session_factory: Optional[async_sessionmaker[AsyncSession]] = None
+
+
+def get_async_engine() -> AsyncEngine:
+    # Created on first use so the sync mode does not require an async driver to be installed.
+    global _async_engine, _async_session_factory
+    if _async_engine is None:
+        settings = EngineSettings.from_env()
+        _async_engine = create_async_engine(async_database_url(DATABASE_URL), **engine_options(DATABASE_URL, settings))
+        install_sqlite_pragmas(_async_engine.sync_engine, DATABASE_URL, settings)
+        _async_session_factory = async_sessionmaker(
+            bind=_async_engine, autocommit=False, autoflush=False, expire_on_commit=False
+        )
+    return _async_engine
+
+
+def started_async_engine() -> Optional[AsyncEngine]:
+    return _async_engine
+
+
+def get_async_session_factory() -> async_sessionmaker[AsyncSession]:
+    get_async_engine()
+    return _async_session_factory
+
+
+async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
+    async with get_async_session_factory()() as session:
+        yield session
@@ -1,20 +1,48 @@
 from __future__ import annotations
 
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
 from fastapi import FastAPI
+from sqlalchemy.engine import Engine
 
 from .api import api_router
-from .database import Base, engine
-
-
-def create_app() -> FastAPI:
-    Base.metadata.create_all(bind=engine)
-
+from .api.deps import get_async_db, get_db
+from .database import DB_MODE, SessionLocal, engine
+from .metrics import MetricsMiddleware
+from .query_stats import QueryStatsMiddleware
+from .schema import check_schema
+from .services.load_store import LOAD_STORE_RECONCILE_SECONDS
+from .services.loads import load_store_reconciler
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    # Startup only checks the schema version; migrations run separately (`python -m app.cli migrate`).
+    check_schema(app.state.schema_bind)
+    # With a shared load store every worker runs its own reconciler; without one this is a no-op.
+    load_store_reconciler.start(SessionLocal, LOAD_STORE_RECONCILE_SECONDS)
+    try:
+        yield
+    finally:
+        load_store_reconciler.stop()
+
+
+def create_app(db_mode: Optional[str] = None, schema_bind: Optional[Engine] = None) -> FastAPI:
+    # Does no I/O: the database is first touched by the startup schema check.
     app = FastAPI(
         title="Мини CRM: распределение лидов",
         version="0.1.0",
         description="Сервис распределяет обращения лидов между операторами с учетом весов и лимитов нагрузки.",
+        lifespan=lifespan,
     )
+    # Engine whose schema version is checked at startup; tests serving another database pass theirs.
+    app.state.schema_bind = schema_bind or engine
     app.include_router(api_router)
+    app.add_middleware(QueryStatsMiddleware)
+    app.add_middleware(MetricsMiddleware)
+    if (db_mode or DB_MODE) == "async":
+        app.dependency_overrides[get_db] = get_async_db
     return app
 
 
@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Generic, Iterable, Optional, Sequence, TypeVar
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .query_stats import route_template
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ALLOCATION_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+
+Labels = tuple[str, ...]
+V = TypeVar("V")
+
+
+class _Shards(Generic[V]):
+    # One value store per thread: writers only touch their own shard, so the hot path takes no lock.
+    # The lock is held only when a thread creates its shard and while a scrape lists the shards.
+    def __init__(self, factory: Callable[[], V]):
+        self._factory = factory
+        self._local = threading.local()
+        self._shards: list[V] = []
+        self._lock = threading.Lock()
+
+    def local(self) -> V:
+        try:
+            return self._local.values
+        except AttributeError:
+            values = self._factory()
+            with self._lock:
+                self._shards.append(values)
+            self._local.values = values
+            return values
+
+    def all(self) -> list[V]:
+        with self._lock:
+            return list(self._shards)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        header = f"# HELP {self.name} {self.documentation}\n# TYPE {self.name} {self.kind}\n"
+        return header + "".join(line + "\n" for line in self.samples())
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._shards: _Shards[dict[Labels, float]] = _Shards(dict)
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        values = self._shards.local()
+        values[labels] = values.get(labels, 0) + amount
+
+    def values(self) -> dict[Labels, float]:
+        totals: dict[Labels, float] = {}
+        for shard in self._shards.all():
+            for labels, value in list(shard.items()):
+                totals[labels] = totals.get(labels, 0) + value
+        return totals
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in sorted(self.values().items()):
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: non-cumulative bucket counts (last slot is +Inf) followed by the sum.
+        self._shards: _Shards[dict[Labels, list[float]]] = _Shards(dict)
+
+    def observe(self, value: float, *labels: str) -> None:
+        values = self._shards.local()
+        entry = values.get(labels)
+        if entry is None:
+            entry = values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        entry[bisect_left(self.buckets, value)] += 1
+        entry[-1] += value
+
+    def values(self) -> dict[Labels, list[float]]:
+        totals: dict[Labels, list[float]] = {}
+        for shard in self._shards.all():
+            for labels, entry in list(shard.items()):
+                current = totals.setdefault(labels, [0] * len(entry))
+                for index, value in enumerate(list(entry)):
+                    current[index] += value
+        return totals
+
+    def samples(self) -> Iterable[str]:
+        names = self.labelnames + ("le",)
+        for labels, entry in sorted(self.values().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), entry[:-1]):
+                cumulative += count
+                yield f"{self.name}_bucket{_format_labels(names, labels + (_format_value(bound),))} {cumulative}"
+            label_text = _format_labels(self.labelnames, labels)
+            yield f"{self.name}_sum{label_text} {_format_value(entry[-1])}"
+            yield f"{self.name}_count{label_text} {cumulative}"
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    # Gauges here are refreshed at scrape time, so a plain dict replaced under a lock is enough.
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def replace(self, values: dict[Labels, float]) -> None:
+        with self._lock:
+            self._values = dict(values)
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+M = TypeVar("M", bound=Metric)
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: list[Metric] = []
+
+    def register(self, metric: M) -> M:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "".join(metric.render() for metric in self._metrics)
+
+
+registry = Registry()
+
+http_requests = registry.register(
+    Counter("crm_http_requests_total", "HTTP requests by route and status.", ("method", "route", "status"))
+)
+http_latency = registry.register(
+    Histogram("crm_http_request_duration_seconds", "HTTP request latency by route.", ("method", "route"))
+)
+allocation_latency = registry.register(
+    Histogram(
+        "crm_allocation_duration_seconds",
+        "Time spent choosing and reserving an operator for one contact.",
+        buckets=ALLOCATION_BUCKETS,
+    )
+)
+allocation_outcomes = registry.register(
+    Counter("crm_allocation_outcomes_total", "Committed allocations by source and outcome.", ("source_id", "outcome"))
+)
+admission_decisions = registry.register(
+    Counter(
+        "crm_admission_contacts_total",
+        "Contacts admitted or throttled by per-source admission control.",
+        ("source_id", "decision"),
+    )
+)
+operator_assignments = registry.register(
+    Counter("crm_operator_assignments_total", "Committed contacts assigned to each operator.", ("operator_id",))
+)
+operator_load = registry.register(
+    Gauge("crm_operator_active_load", "Active contacts per operator.", ("operator_id", "operator_name"))
+)
+operator_load_limit = registry.register(
+    Gauge("crm_operator_load_limit", "Configured load limit per operator, 0 is unlimited.", ("operator_id",))
+)
+db_pool = registry.register(
+    Gauge("crm_db_pool_connections", "Database pool connections by state.", ("engine", "state"))
+)
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code: Optional[int] = None
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # Unmatched paths are folded into one series to keep label cardinality bounded.
+            route = route_template(scope) if scope.get("route") is not None else "unmatched"
+            http_latency.observe(time.perf_counter() - started, scope["method"], route)
+            http_requests.inc(scope["method"], route, str(status_code or 500))
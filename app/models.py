@@ -8,16 +8,26 @@ from sqlalchemy import (
     CheckConstraint,
     Column,
     DateTime,
+    Float,
     ForeignKey,
+    Index,
     Integer,
     String,
     UniqueConstraint,
     func,
 )
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .database import Base
 
+# SQLite stores server-side CURRENT_TIMESTAMP without microseconds; binding datetimes in the
+# same format keeps string comparisons on keyset columns consistent with stored values.
+KeysetTimestamp = DateTime().with_variant(
+    sqlite.DATETIME(storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"),
+    "sqlite",
+)
+
 
 class Operator(Base):
     __tablename__ = "operators"
@@ -26,6 +36,7 @@ class Operator(Base):
     name: Mapped[str] = mapped_column(String(100), nullable=False)
     active: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
     load_limit: Mapped[int] = mapped_column(Integer, default=10, nullable=False)
+    active_load: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
     created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), nullable=False)
 
     contacts: Mapped[list["Contact"]] = relationship("Contact", back_populates="operator")
@@ -40,10 +51,12 @@ class Lead(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     external_id: Mapped[str] = mapped_column(String(255), nullable=False, unique=True)
     name: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
-    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(KeysetTimestamp, server_default=func.now(), nullable=False)
 
     contacts: Mapped[list["Contact"]] = relationship("Contact", back_populates="lead")
 
+    __table_args__ = (Index("ix_leads_created_at_id", "created_at", "id"),)
+
 
 class Source(Base):
     __tablename__ = "sources"
@@ -51,6 +64,13 @@ class Source(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     name: Mapped[str] = mapped_column(String(100), nullable=False, unique=True)
     description: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    allocation_strategy: Mapped[str] = mapped_column(
+        String(32), default="weighted_random", server_default="weighted_random", nullable=False
+    )
+    pending_order: Mapped[str] = mapped_column(String(16), default="fifo", server_default="fifo", nullable=False)
+    # Token bucket for POST /contacts/ and /contacts/bulk: contacts per second and bucket size; no rate is unlimited.
+    admission_rate: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    admission_burst: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), nullable=False)
 
     contacts: Mapped[list["Contact"]] = relationship("Contact", back_populates="source")
@@ -72,6 +92,7 @@ class SourceOperatorAssignment(Base):
 
     __table_args__ = (
         UniqueConstraint("source_id", "operator_id", name="uq_source_operator"),
+        Index("ix_source_operator_assignments_operator_id", "operator_id"),
         CheckConstraint("weight > 0", name="ck_weight_positive"),
     )
 
@@ -85,10 +106,70 @@ class Contact(Base):
     operator_id: Mapped[Optional[int]] = mapped_column(ForeignKey("operators.id", ondelete="SET NULL"), nullable=True)
     status: Mapped[str] = mapped_column(String(32), default="active", nullable=False)
     message: Mapped[Optional[str]] = mapped_column(String(500), nullable=True)
-    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(KeysetTimestamp, server_default=func.now(), nullable=False)
+    closed_at: Mapped[Optional[datetime]] = mapped_column(KeysetTimestamp, nullable=True)
+    # Client-supplied message id (or Idempotency-Key); a retry with the same one returns this contact.
+    external_message_id: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
 
     lead: Mapped["Lead"] = relationship("Lead", back_populates="contacts")
     source: Mapped["Source"] = relationship("Source", back_populates="contacts")
     operator: Mapped[Optional["Operator"]] = relationship("Operator", back_populates="contacts")
 
+    __table_args__ = (
+        Index("ix_contacts_created_at_id", "created_at", "id"),
+        Index("ix_contacts_source_created_at_id", "source_id", "created_at", "id"),
+        Index("ix_contacts_operator_created_at_id", "operator_id", "created_at", "id"),
+        Index("ix_contacts_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_contacts_lead_created_at_id", "lead_id", "created_at", "id"),
+        Index("ix_contacts_status_operator_id", "status", "operator_id"),
+        # NULLs never conflict, so only contacts created with a key are constrained.
+        Index("uq_contacts_source_external_message_id", "source_id", "external_message_id", unique=True),
+    )
+
+
+class PendingContact(Base):
+    # Contacts stored without an operator because none had capacity, waiting for a backfill.
+    __tablename__ = "pending_contacts"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    contact_id: Mapped[int] = mapped_column(ForeignKey("contacts.id", ondelete="CASCADE"), nullable=False, unique=True)
+    source_id: Mapped[int] = mapped_column(ForeignKey("sources.id", ondelete="CASCADE"), nullable=False)
+    priority: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), nullable=False)
+
+    contact: Mapped["Contact"] = relationship("Contact")
 
+    __table_args__ = (
+        Index("ix_pending_contacts_source_id", "source_id", "id"),
+        Index("ix_pending_contacts_source_priority_id", "source_id", priority.desc(), "id"),
+    )
+
+
+class AllocationRollup(Base):
+    # Hourly counters per source and operator, maintained in the transactions that create and close
+    # contacts. operator_id is 0 for contacts without an operator: a NULL would not take part in the
+    # unique key, so upserts could not find the row.
+    __tablename__ = "allocation_rollups"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    bucket: Mapped[datetime] = mapped_column(KeysetTimestamp, nullable=False)
+    source_id: Mapped[int] = mapped_column(ForeignKey("sources.id", ondelete="CASCADE"), nullable=False)
+    operator_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    created: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    unassigned: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    closed: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("bucket", "source_id", "operator_id", name="uq_allocation_rollups_bucket_source_operator"),
+        Index("ix_allocation_rollups_source_bucket", "source_id", "bucket"),
+        Index("ix_allocation_rollups_operator_bucket", "operator_id", "bucket"),
+    )
+
+
+class SchemaMigration(Base):
+    # One row per migration applied by `python -m app.cli migrate`; startup only reads max(version).
+    __tablename__ = "schema_migrations"
+
+    version: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    name: Mapped[str] = mapped_column(String(100), nullable=False)
+    applied_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), nullable=False)
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+QUERIES_HEADER = "X-DB-Queries"
+DB_TIME_HEADER = "X-DB-Time-ms"
+
+
+@dataclass
+class QueryCounter:
+    queries: int = 0
+    seconds: float = 0.0
+
+
+# The counter object is shared by reference, so statements executed in the threadpool or inside
+# AsyncSession.run_sync (both run in a copy of the request context) are added to the same totals.
+_current_counter: ContextVar[Optional[QueryCounter]] = ContextVar("query_counter", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if _current_counter.get() is not None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    counter = _current_counter.get()
+    if counter is not None and conn.info.get("query_started"):
+        counter.queries += 1
+        counter.seconds += time.perf_counter() - conn.info["query_started"].pop()
+
+
+@dataclass(frozen=True)
+class RouteQueryStats:
+    method: str
+    path: str
+    requests: int
+    queries: int
+    max_queries: int
+    db_seconds: float
+
+
+class QueryStatsRegistry:
+    def __init__(self) -> None:
+        self._routes: dict[tuple[str, str], list] = {}
+        self._lock = threading.Lock()
+
+    def record(self, method: str, path: str, counter: QueryCounter) -> None:
+        with self._lock:
+            totals = self._routes.setdefault((method, path), [0, 0, 0, 0.0])
+            totals[0] += 1
+            totals[1] += counter.queries
+            totals[2] = max(totals[2], counter.queries)
+            totals[3] += counter.seconds
+
+    def snapshot(self) -> list[RouteQueryStats]:
+        with self._lock:
+            return [
+                RouteQueryStats(
+                    method=method,
+                    path=path,
+                    requests=requests,
+                    queries=queries,
+                    max_queries=max_queries,
+                    db_seconds=db_seconds,
+                )
+                for (method, path), (requests, queries, max_queries, db_seconds) in sorted(self._routes.items())
+            ]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._routes.clear()
+
+
+query_stats = QueryStatsRegistry()
+
+
+def route_template(scope: Scope) -> str:
+    # Rebuild the matched route's template from the concrete path, so "/contacts/42" is aggregated
+    # as "/contacts/{contact_id}" whichever way the router nested the route.
+    by_value = {str(value): name for name, value in scope.get("path_params", {}).items()}
+    return "/".join(
+        f"{{{by_value[segment]}}}" if segment in by_value else segment for segment in scope["path"].split("/")
+    )
+
+
+class QueryStatsMiddleware:
+    # Plain ASGI middleware: headers are added when the response starts, so statements a streaming
+    # body runs after that point are only reflected in the per-route aggregate.
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        counter = QueryCounter()
+        token = _current_counter.set(counter)
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((QUERIES_HEADER.lower().encode(), str(counter.queries).encode()))
+                headers.append((DB_TIME_HEADER.lower().encode(), f"{counter.seconds * 1000:.2f}".encode()))
+                message["headers"] = headers
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            _current_counter.reset(token)
+            if scope.get("route") is not None:
+                query_stats.record(scope["method"], route_template(scope), counter)
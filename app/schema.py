@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from sqlalchemy import Connection, func, insert, inspect, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlalchemy.orm import Session
+
+from . import models
+from .database import Base
+from .services.loads import reconcile_operator_loads
+
+
+class SchemaVersionError(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    apply: Callable[[Connection], None]
+
+
+def _create_tables(*names: str) -> Callable[[Connection], None]:
+    # Tables are created from the current models, so the column steps below find nothing to add on
+    # a new database; every step checks what exists and is safe to repeat.
+    def apply(connection: Connection) -> None:
+        Base.metadata.create_all(bind=connection, tables=[Base.metadata.tables[name] for name in names])
+
+    return apply
+
+
+def _add_column(table: str, column: str, definition: str) -> Callable[[Connection], None]:
+    def apply(connection: Connection) -> None:
+        if column not in {existing["name"] for existing in inspect(connection).get_columns(table)}:
+            connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {definition}"))
+
+    return apply
+
+
+def _add_operator_active_load(connection: Connection) -> None:
+    if "active_load" in {column["name"] for column in inspect(connection).get_columns("operators")}:
+        return
+    connection.execute(text("ALTER TABLE operators ADD COLUMN active_load INTEGER NOT NULL DEFAULT 0"))
+    with Session(bind=connection) as session:
+        reconcile_operator_loads(session)
+
+
+def _create_missing_indexes(connection: Connection) -> None:
+    # Indexes on columns a later step adds are left to that step.
+    inspector = inspect(connection)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        columns = {column["name"] for column in inspector.get_columns(table.name)}
+        for index in table.indexes:
+            if {column.name for column in index.columns} <= columns:
+                index.create(bind=connection, checkfirst=True)
+
+
+def _add_contact_external_message_id(connection: Connection) -> None:
+    _add_column("contacts", "external_message_id", "VARCHAR(255)")(connection)
+    for index in models.Contact.__table__.indexes:
+        if index.name == "uq_contacts_source_external_message_id":
+            index.create(bind=connection, checkfirst=True)
+
+
+# Append only: a released version number is never reused or edited. Databases created before
+# versioning have no schema_migrations rows and run every step, which upgrades them in place.
+MIGRATIONS = (
+    Migration(
+        1, "core tables", _create_tables("operators", "leads", "sources", "source_operator_assignments", "contacts")
+    ),
+    Migration(2, "operators.active_load", _add_operator_active_load),
+    Migration(
+        3,
+        "sources.allocation_strategy",
+        _add_column("sources", "allocation_strategy", "VARCHAR(32) NOT NULL DEFAULT 'weighted_random'"),
+    ),
+    Migration(
+        4, "sources.pending_order", _add_column("sources", "pending_order", "VARCHAR(16) NOT NULL DEFAULT 'fifo'")
+    ),
+    Migration(5, "pending_contacts", _create_tables("pending_contacts")),
+    Migration(6, "contacts.closed_at", _add_column("contacts", "closed_at", "DATETIME")),
+    Migration(7, "allocation_rollups", _create_tables("allocation_rollups")),
+    Migration(8, "indexes", _create_missing_indexes),
+    Migration(9, "contacts.external_message_id", _add_contact_external_message_id),
+    Migration(10, "sources.admission_rate", _add_column("sources", "admission_rate", "FLOAT")),
+    Migration(11, "sources.admission_burst", _add_column("sources", "admission_burst", "INTEGER")),
+)
+SCHEMA_VERSION = MIGRATIONS[-1].version
+
+
+def schema_version(bind: Engine) -> Optional[int]:
+    # None for an empty database or one that predates versioning.
+    try:
+        with bind.connect() as connection:
+            return connection.execute(select(func.max(models.SchemaMigration.version))).scalar()
+    except (OperationalError, ProgrammingError):
+        return None
+
+
+def migrate(bind: Engine) -> list[Migration]:
+    # Each step commits together with its schema_migrations row, so an interrupted run resumes
+    # from the first step that did not finish.
+    models.SchemaMigration.__table__.create(bind=bind, checkfirst=True)
+    current = schema_version(bind) or 0
+    applied = []
+    for migration in MIGRATIONS:
+        if migration.version <= current:
+            continue
+        with bind.begin() as connection:
+            migration.apply(connection)
+            connection.execute(insert(models.SchemaMigration), {"version": migration.version, "name": migration.name})
+        applied.append(migration)
+    return applied
+
+
+def check_schema(bind: Engine) -> int:
+    # The only database work at startup: one indexed max() instead of reflecting every table.
+    version = schema_version(bind)
+    if version is None or version < SCHEMA_VERSION:
+        raise SchemaVersionError(
+            f"Database schema is at version {version or 0}, this build needs {SCHEMA_VERSION}: "
+            "run `python -m app.cli migrate`"
+        )
+    return version
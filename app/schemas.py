@@ -1,9 +1,14 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Optional, Sequence
+from typing import List, Literal, Optional, Sequence
 
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, Field, root_validator, validator
+
+ContactStatus = Literal["active", "closed"]
+AllocationStrategyName = Literal["weighted_random", "least_loaded", "weighted_round_robin"]
+PendingOrder = Literal["fifo", "priority"]
+StatsGranularity = Literal["hour", "day", "week"]
 
 
 class OperatorBase(BaseModel):
@@ -39,6 +44,11 @@ class SourceAssignmentInput(BaseModel):
 class SourceBase(BaseModel):
     name: str = Field(..., max_length=100)
     description: Optional[str] = Field(None, max_length=255)
+    allocation_strategy: AllocationStrategyName = "weighted_random"
+    pending_order: PendingOrder = "fifo"
+    # Contacts per second admitted for the source; null is unlimited. The burst defaults to one second's worth.
+    admission_rate: Optional[float] = Field(None, gt=0)
+    admission_burst: Optional[int] = Field(None, ge=1)
     assignments: Optional[Sequence[SourceAssignmentInput]] = None
 
 
@@ -49,8 +59,19 @@ class SourceCreate(SourceBase):
 class SourceUpdate(BaseModel):
     name: Optional[str] = Field(None, max_length=100)
     description: Optional[str] = Field(None, max_length=255)
+    allocation_strategy: Optional[AllocationStrategyName] = None
+    pending_order: Optional[PendingOrder] = None
+    admission_rate: Optional[float] = Field(None, gt=0)
+    admission_burst: Optional[int] = Field(None, ge=1)
     assignments: Optional[Sequence[SourceAssignmentInput]] = None
 
+    # Omitted fields stay unchanged; an explicit null would be written into a NOT NULL column.
+    @validator("name", "allocation_strategy", "pending_order")
+    def ensure_not_null(cls, value: Optional[str]) -> str:
+        if value is None:
+            raise ValueError("must not be null")
+        return value
+
 
 class SourceAssignmentRead(BaseModel):
     operator_id: int
@@ -65,6 +86,10 @@ class SourceRead(BaseModel):
     id: int
     name: str
     description: Optional[str]
+    allocation_strategy: AllocationStrategyName
+    pending_order: PendingOrder
+    admission_rate: Optional[float]
+    admission_burst: Optional[int]
     created_at: datetime
     assignments: Sequence[SourceAssignmentRead]
 
@@ -72,6 +97,23 @@ class SourceRead(BaseModel):
         orm_mode = True
 
 
+class RoutingCacheStatsRead(BaseModel):
+    hits: int
+    misses: int
+    invalidations: int
+    size: int
+
+
+class RouteQueryStatsRead(BaseModel):
+    method: str
+    path: str
+    requests: int
+    queries: int
+    max_queries: int
+    avg_queries: float
+    db_time_ms: float
+
+
 class LeadBase(BaseModel):
     external_id: str = Field(..., max_length=255)
     name: Optional[str] = Field(None, max_length=255)
@@ -90,6 +132,10 @@ class ContactCreate(BaseModel):
     lead_name: Optional[str] = Field(None, max_length=255)
     source_id: int
     message: Optional[str] = Field(None, max_length=500)
+    # Only orders the pending queue of sources with pending_order="priority"; higher waits less.
+    priority: int = Field(0, ge=0)
+    # Idempotency key within the source: a retry with the same id returns the contact created first.
+    external_message_id: Optional[str] = Field(None, min_length=1, max_length=255)
 
     @validator("lead_external_id")
     def ensure_non_empty(cls, value: str) -> str:
@@ -112,6 +158,49 @@ class ContactRead(BaseModel):
         orm_mode = True
 
 
+class ContactBulkCreate(BaseModel):
+    items: List[ContactCreate] = Field(..., min_items=1, max_items=10000)
+
+
+class ContactBulkItemResult(BaseModel):
+    index: int
+    contact: Optional[ContactRead] = None
+    reason: Optional[str] = None
+    # The item repeated an external_message_id; contact is the one created for it before.
+    replayed: bool = False
+
+
+class ContactBulkResult(BaseModel):
+    created: int
+    unassigned: int
+    rejected: int
+    replayed: int = 0
+    items: Sequence[ContactBulkItemResult]
+
+
+class ContactUpdate(BaseModel):
+    status: Optional[ContactStatus] = None
+    # Setting operator_id, including to null, reassigns the contact.
+    operator_id: Optional[int] = None
+
+
+class ContactCloseRequest(BaseModel):
+    ids: Optional[List[int]] = Field(None, min_items=1, max_items=10000)
+    operator_id: Optional[int] = None
+    source_id: Optional[int] = None
+    created_before: Optional[datetime] = None
+
+    @root_validator(skip_on_failure=True)
+    def ensure_selection(cls, values: dict) -> dict:
+        if all(values.get(key) is None for key in ("ids", "operator_id", "source_id", "created_before")):
+            raise ValueError("Pass ids or at least one filter")
+        return values
+
+
+class ContactCloseResult(BaseModel):
+    closed: int
+
+
 class ContactWithLeadRead(ContactRead):
     lead_external_id: str
     lead_name: Optional[str]
@@ -122,4 +211,21 @@ class LeadWithContactsRead(LeadRead):
     contacts: Sequence[ContactRead]
 
 
+class LeadSummaryRead(LeadRead):
+    contacts_count: int
+
 
+class StatsBucketRead(BaseModel):
+    bucket: datetime
+    created: int
+    unassigned: int
+    closed: int
+
+
+class SourceStatsRead(StatsBucketRead):
+    source_id: int
+
+
+class OperatorStatsRead(StatsBucketRead):
+    # null for contacts that were created or closed without an operator.
+    operator_id: Optional[int]
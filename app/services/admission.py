@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional, Sequence
+
+from .. import metrics
+from .routing import SourceRouting
+
+ADMITTED = "admitted"
+THROTTLED = "throttled"
+
+
+@dataclass
+class TokenBucket:
+    rate: float
+    burst: int
+    tokens: float
+    updated_at: float
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def wait_for(self, cost: int) -> float:
+        # Seconds until cost can be taken. A request larger than the bucket waits for a full bucket
+        # and leaves it in debt, so oversized batches are slowed down instead of refused forever.
+        needed = min(cost, self.burst)
+        return 0.0 if self.tokens >= needed else (needed - self.tokens) / self.rate
+
+
+def bucket_size(rate: float, burst: Optional[int]) -> int:
+    return burst if burst is not None else max(1, math.ceil(rate))
+
+
+# Per-process token buckets for the sources that have an admission_rate. The configuration comes
+# from the routing snapshot the request already needs, so a decision is a few arithmetic steps
+# under a lock and never waits on the database. Each worker meters its own share of the traffic.
+class AdmissionController:
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._buckets: dict[int, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def admit(self, demands: Sequence[tuple[SourceRouting, int]]) -> float:
+        # All or nothing over (source, contacts) pairs: 0.0 when admitted, otherwise the seconds
+        # to wait before retrying. Sources without an admission_rate are always admitted.
+        limited = [(routing, cost) for routing, cost in demands if routing.admission_rate]
+        if not limited:
+            return 0.0
+        with self._lock:
+            now = self._clock()
+            buckets = [(self._bucket(routing, now), routing.source_id, cost) for routing, cost in limited]
+            wait = max(bucket.wait_for(cost) for bucket, _, cost in buckets)
+            if wait == 0.0:
+                for bucket, _, cost in buckets:
+                    bucket.tokens -= cost
+        decision = ADMITTED if wait == 0.0 else THROTTLED
+        for _, source_id, cost in buckets:
+            metrics.admission_decisions.inc(str(source_id), decision, amount=cost)
+        return wait
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+    def _bucket(self, routing: SourceRouting, now: float) -> TokenBucket:
+        burst = bucket_size(routing.admission_rate, routing.admission_burst)
+        bucket = self._buckets.get(routing.source_id)
+        if bucket is None:
+            bucket = self._buckets[routing.source_id] = TokenBucket(routing.admission_rate, burst, burst, now)
+            return bucket
+        bucket.refill(now)
+        if (bucket.rate, bucket.burst) != (routing.admission_rate, burst):
+            # Reconfigured: tokens already earned are kept up to the new size.
+            bucket.rate, bucket.burst = routing.admission_rate, burst
+            bucket.tokens = min(bucket.tokens, burst)
+        return bucket
+
+
+admission_controller = AdmissionController()
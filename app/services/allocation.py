@@ -1,63 +1,250 @@
 from __future__ import annotations
 
+import os
 import random
+import threading
 from dataclasses import dataclass
-from typing import Optional
+from typing import Iterable, Optional, Sequence
 
-from sqlalchemy import func, select
+from sqlalchemy import or_, update
 from sqlalchemy.orm import Session
 
-from .. import models
+from .. import metrics, models
+from .loads import load_index, read_operator_loads, track_load_changes
+from .routing import (
+    LEAST_LOADED,
+    WEIGHTED_RANDOM,
+    WEIGHTED_ROUND_ROBIN,
+    OperatorRoute,
+    SourceRouting,
+)
+
+NO_ACTIVE_OPERATORS = "No active operators configured for this source"
+ALL_OPERATORS_FULL = "All operators reached their load limit"
+
+# Metric label per AllocationResult.reason; None means an operator was assigned.
+OUTCOME_LABELS = {
+    None: "assigned",
+    NO_ACTIVE_OPERATORS: "no_active_operators",
+    ALL_OPERATORS_FULL: "all_operators_full",
+}
+
+# Failed O(1) draws tolerated before falling back to a load snapshot of the remaining operators.
+MAX_SAMPLING_ATTEMPTS = 4
+
+_seed = os.getenv("ALLOCATION_RNG_SEED")
+allocation_rng = random.Random(int(_seed) if _seed is not None else None)
 
 
 @dataclass
 class AllocationResult:
-    operator: Optional[models.Operator]
+    operator: Optional[OperatorRoute]
     reason: Optional[str] = None
 
 
-def compute_operator_loads(session: Session, operator_ids: list[int]) -> dict[int, int]:
-    if not operator_ids:
-        return {}
-
-    query = (
-        select(models.Contact.operator_id, func.count(models.Contact.id))
-        .where(
-            models.Contact.operator_id.in_(operator_ids),
-            models.Contact.status == "active",
-        )
-        .group_by(models.Contact.operator_id)
-    )
-    result = session.execute(query)
-    return {operator_id: count for operator_id, count in result.all()}
+@dataclass
+class OperatorCandidate:
+    operator_id: int
+    weight: int
+    load: int
+    load_limit: int
 
+    def has_capacity(self) -> bool:
+        return self.load_limit == 0 or self.load < self.load_limit
 
-def choose_operator_for_source(session: Session, source: models.Source) -> AllocationResult:
-    assignments = [
-        assignment
-        for assignment in source.assignments
-        if assignment.operator is not None and assignment.operator.active
-    ]
+    def utilization(self) -> tuple[float, int, int]:
+        # Same ordering as the least-loaded index: load relative to the limit, unlimited operators first.
+        return (self.load / self.load_limit if self.load_limit else 0.0), self.load, self.operator_id
 
-    if not assignments:
-        return AllocationResult(operator=None, reason="No active operators configured for this source")
 
-    operator_ids = [assignment.operator_id for assignment in assignments]
-    loads = compute_operator_loads(session, operator_ids)
+def record_allocation(source_id: int, operator_id: Optional[int], reason: Optional[str]) -> None:
+    # Called after commit, so rolled-back reservations are not counted.
+    metrics.allocation_outcomes.inc(str(source_id), OUTCOME_LABELS.get(reason, "other"))
+    if operator_id is not None:
+        metrics.operator_assignments.inc(str(operator_id))
 
-    eligible = []
-    for assignment in assignments:
-        operator = assignment.operator
-        current_load = loads.get(operator.id, 0)
-        limit = operator.load_limit or float("inf")
-        if current_load < limit:
-            eligible.append((operator, assignment.weight))
 
+def pick_candidate(
+    candidates: Sequence[OperatorCandidate], rng: Optional[random.Random] = None
+) -> Optional[OperatorCandidate]:
+    eligible = [candidate for candidate in candidates if candidate.has_capacity()]
     if not eligible:
-        return AllocationResult(operator=None, reason="All operators reached their load limit")
+        return None
+    return (rng or allocation_rng).choices(eligible, weights=[candidate.weight for candidate in eligible], k=1)[0]
 
-    operators, weights = zip(*eligible)
-    chosen = random.choices(operators, weights=weights, k=1)[0]
-    return AllocationResult(operator=chosen)
+
+def reserve_operator_capacity(session: Session, operator_id: int) -> bool:
+    result = session.execute(
+        update(models.Operator)
+        .where(
+            models.Operator.id == operator_id,
+            models.Operator.active.is_(True),
+            or_(models.Operator.load_limit == 0, models.Operator.active_load < models.Operator.load_limit),
+        )
+        .values(active_load=models.Operator.active_load + 1)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        return False
+    track_load_changes(session, {operator_id: 1})
+    return True
+
+
+def _candidates(session: Session, routes: Iterable[OperatorRoute]) -> list[OperatorCandidate]:
+    routes = list(routes)
+    loads = read_operator_loads(session, [route.id for route in routes])
+    return [
+        OperatorCandidate(
+            operator_id=route.id,
+            weight=route.weight,
+            load=loads.get(route.id, 0),
+            load_limit=route.load_limit,
+        )
+        for route in routes
+    ]
 
 
+class AllocationStrategy:
+    # choose() reserves a slot for one contact through the guarded UPDATE; pick() applies the same
+    # policy to in-memory loads, as bulk ingestion does before reserving everything at once.
+    name: str
+
+    def choose(self, session: Session, routing: SourceRouting, rng: random.Random) -> AllocationResult:
+        raise NotImplementedError
+
+    def pick(
+        self, routing: SourceRouting, candidates: Sequence[OperatorCandidate], rng: random.Random
+    ) -> Optional[OperatorCandidate]:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        pass
+
+
+class WeightedRandomStrategy(AllocationStrategy):
+    name = WEIGHTED_RANDOM
+
+    def choose(self, session: Session, routing: SourceRouting, rng: random.Random) -> AllocationResult:
+        routes = routing.active_routes
+        # Fast path: draw from the snapshot's alias table and reserve directly; the conditional
+        # UPDATE rejects saturated operators, so no load read is needed while capacity is available.
+        rejected: set[int] = set()
+        for _ in range(MAX_SAMPLING_ATTEMPTS):
+            route = routes[routing.sampler.sample(rng)]
+            if route.id in rejected:
+                continue
+            if reserve_operator_capacity(session, route.id):
+                return AllocationResult(operator=route)
+            rejected.add(route.id)
+
+        remaining = {route.id: route for route in routes if route.id not in rejected}
+        candidates = _candidates(session, remaining.values())
+
+        # A candidate that was filled concurrently is dropped and the draw repeated.
+        while True:
+            chosen = pick_candidate(candidates, rng)
+            if chosen is None:
+                return AllocationResult(operator=None, reason=ALL_OPERATORS_FULL)
+            if reserve_operator_capacity(session, chosen.operator_id):
+                return AllocationResult(operator=remaining[chosen.operator_id])
+            candidates.remove(chosen)
+
+    def pick(
+        self, routing: SourceRouting, candidates: Sequence[OperatorCandidate], rng: random.Random
+    ) -> Optional[OperatorCandidate]:
+        return pick_candidate(candidates, rng)
+
+
+class LeastLoadedStrategy(AllocationStrategy):
+    # The operator with the lowest load relative to its limit, taken from the in-memory index.
+    name = LEAST_LOADED
+
+    def choose(self, session: Session, routing: SourceRouting, rng: random.Random) -> AllocationResult:
+        for _ in routing.active_routes:
+            route = load_index.best(session, routing)
+            if route is None:
+                break
+            if reserve_operator_capacity(session, route.id):
+                return AllocationResult(operator=route)
+            # Filled by another process or deactivated since the snapshot; skip it until its load changes.
+            load_index.block(route.id)
+        return AllocationResult(operator=None, reason=ALL_OPERATORS_FULL)
+
+    def pick(
+        self, routing: SourceRouting, candidates: Sequence[OperatorCandidate], rng: random.Random
+    ) -> Optional[OperatorCandidate]:
+        eligible = [candidate for candidate in candidates if candidate.has_capacity()]
+        return min(eligible, key=OperatorCandidate.utilization) if eligible else None
+
+
+class WeightedRoundRobinStrategy(AllocationStrategy):
+    # Smooth weighted round-robin (as in nginx): over any window each operator gets its weight's
+    # share and picks of one operator are spread out instead of coming in runs. The rotation state
+    # is kept per routing snapshot and per process.
+    name = WEIGHTED_ROUND_ROBIN
+
+    def __init__(self) -> None:
+        self._state: dict[int, tuple[SourceRouting, dict[int, int]]] = {}
+        self._lock = threading.Lock()
+
+    def _next(self, routing: SourceRouting, allowed: Sequence[tuple[int, int]]) -> Optional[int]:
+        if not allowed:
+            return None
+        with self._lock:
+            state = self._state.get(routing.source_id)
+            if state is None or state[0] is not routing:
+                state = self._state[routing.source_id] = (routing, {})
+            current = state[1]
+            total = 0
+            chosen = None
+            for operator_id, weight in allowed:
+                current[operator_id] = current.get(operator_id, 0) + weight
+                total += weight
+                if chosen is None or current[operator_id] > current[chosen]:
+                    chosen = operator_id
+            current[chosen] -= total
+            return chosen
+
+    def choose(self, session: Session, routing: SourceRouting, rng: random.Random) -> AllocationResult:
+        routes = {route.id: route for route in routing.active_routes}
+        allowed = [(route.id, route.weight) for route in routing.active_routes]
+        # Reserve the next operator in the rotation; after a few full ones, drop every saturated
+        # operator with one load read instead of probing them one by one.
+        for attempt in range(len(routes)):
+            if attempt == MAX_SAMPLING_ATTEMPTS:
+                candidates = _candidates(session, (routes[operator_id] for operator_id, _ in allowed))
+                free = {candidate.operator_id for candidate in candidates if candidate.has_capacity()}
+                allowed = [item for item in allowed if item[0] in free]
+            operator_id = self._next(routing, allowed)
+            if operator_id is None:
+                break
+            if reserve_operator_capacity(session, operator_id):
+                return AllocationResult(operator=routes[operator_id])
+            allowed = [item for item in allowed if item[0] != operator_id]
+        return AllocationResult(operator=None, reason=ALL_OPERATORS_FULL)
+
+    def pick(
+        self, routing: SourceRouting, candidates: Sequence[OperatorCandidate], rng: random.Random
+    ) -> Optional[OperatorCandidate]:
+        eligible = {candidate.operator_id: candidate for candidate in candidates if candidate.has_capacity()}
+        allowed = [(candidate.operator_id, candidate.weight) for candidate in eligible.values()]
+        operator_id = self._next(routing, allowed)
+        return eligible[operator_id] if operator_id is not None else None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._state.clear()
+
+
+STRATEGIES: dict[str, AllocationStrategy] = {
+    strategy.name: strategy
+    for strategy in (WeightedRandomStrategy(), LeastLoadedStrategy(), WeightedRoundRobinStrategy())
+}
+
+
+def choose_operator_for_source(
+    session: Session, routing: SourceRouting, rng: Optional[random.Random] = None
+) -> AllocationResult:
+    if not routing.active_routes:
+        return AllocationResult(operator=None, reason=NO_ACTIVE_OPERATORS)
+    return STRATEGIES[routing.strategy].choose(session, routing, rng or allocation_rng)
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+from typing import Any, Generic, Hashable, Iterator, Optional, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+
+
+class IndexedHeap(Generic[K]):
+    # Binary min-heap with a position per key: the smallest entry is read in O(1) and any key's
+    # priority is changed or removed in O(log n) without searching the heap.
+
+    __slots__ = ("_keys", "_priorities", "_positions")
+
+    def __init__(self) -> None:
+        self._keys: list[K] = []
+        self._priorities: list[Any] = []
+        self._positions: dict[K, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._positions
+
+    def __iter__(self) -> Iterator[K]:
+        return iter(list(self._keys))
+
+    def priority(self, key: K) -> Any:
+        return self._priorities[self._positions[key]]
+
+    def peek(self) -> Optional[tuple[K, Any]]:
+        if not self._keys:
+            return None
+        return self._keys[0], self._priorities[0]
+
+    def set(self, key: K, priority: Any) -> None:
+        position = self._positions.get(key)
+        if position is None:
+            self._keys.append(key)
+            self._priorities.append(priority)
+            self._positions[key] = len(self._keys) - 1
+            self._sift_up(len(self._keys) - 1)
+            return
+        previous = self._priorities[position]
+        self._priorities[position] = priority
+        if priority < previous:
+            self._sift_up(position)
+        else:
+            self._sift_down(position)
+
+    def pop(self) -> tuple[K, Any]:
+        if not self._keys:
+            raise IndexError("pop from an empty heap")
+        key, priority = self._keys[0], self._priorities[0]
+        self.remove(key)
+        return key, priority
+
+    def remove(self, key: K) -> None:
+        position = self._positions.pop(key)
+        last_key = self._keys.pop()
+        last_priority = self._priorities.pop()
+        if position == len(self._keys):
+            return
+        self._keys[position] = last_key
+        self._priorities[position] = last_priority
+        self._positions[last_key] = position
+        self._sift_up(position)
+        self._sift_down(self._positions[last_key])
+
+    def _swap(self, first: int, second: int) -> None:
+        keys, priorities = self._keys, self._priorities
+        keys[first], keys[second] = keys[second], keys[first]
+        priorities[first], priorities[second] = priorities[second], priorities[first]
+        self._positions[keys[first]] = first
+        self._positions[keys[second]] = second
+
+    def _sift_up(self, position: int) -> None:
+        priorities = self._priorities
+        while position:
+            parent = (position - 1) // 2
+            if not priorities[position] < priorities[parent]:
+                return
+            self._swap(position, parent)
+            position = parent
+
+    def _sift_down(self, position: int) -> None:
+        priorities = self._priorities
+        count = len(priorities)
+        while True:
+            smallest = position
+            for child in (2 * position + 1, 2 * position + 2):
+                if child < count and priorities[child] < priorities[smallest]:
+                    smallest = child
+            if smallest == position:
+                return
+            self._swap(position, smallest)
+            position = smallest
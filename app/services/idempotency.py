@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Collection, Optional
+
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import Session
+
+from .. import models, schemas
+
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))
+IDEMPOTENCY_CACHE_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_CACHE_TTL_SECONDS", "3600"))
+LOOKUP_CHUNK_SIZE = 500
+
+# (source_id, external message id): message ids only have to be unique within their source.
+IdempotencyKey = tuple[int, str]
+
+
+def idempotency_key(item: schemas.ContactCreate) -> Optional[IdempotencyKey]:
+    return (item.source_id, item.external_message_id) if item.external_message_id else None
+
+
+# Bounded LRU of recently created contacts by idempotency key, so a retry is answered without
+# touching the database. Entries expire after the TTL (a retry storm is short) and are only put
+# after the creating transaction committed; the unique index on contacts is what makes keys
+# exact across workers and after eviction.
+class IdempotencyCache:
+    def __init__(
+        self,
+        max_size: int = IDEMPOTENCY_CACHE_SIZE,
+        ttl_seconds: float = IDEMPOTENCY_CACHE_TTL_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: OrderedDict[IdempotencyKey, tuple[float, schemas.ContactRead]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: IdempotencyKey) -> Optional[schemas.ContactRead]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= self._clock():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def __contains__(self, key: IdempotencyKey) -> bool:
+        # A check that neither counts as a hit or miss nor refreshes the entry's LRU position.
+        entry = self._entries.get(key)
+        return entry is not None and entry[0] > self._clock()
+
+    def put(self, key: IdempotencyKey, contact: schemas.ContactRead) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl_seconds, contact)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+idempotency_cache = IdempotencyCache()
+
+
+def find_contacts(session: Session, keys: Collection[IdempotencyKey]) -> dict[IdempotencyKey, schemas.ContactRead]:
+    # Contacts already stored under these keys, as they are now; served by the unique index.
+    # Grouped per source: SQLite does not use the index for a row-value IN over (source_id, id) pairs.
+    contact = models.Contact
+    keys = sorted(keys)
+    found: dict[IdempotencyKey, schemas.ContactRead] = {}
+    for start in range(0, len(keys), LOOKUP_CHUNK_SIZE):
+        by_source: dict[int, list[str]] = {}
+        for source_id, message_id in keys[start : start + LOOKUP_CHUNK_SIZE]:
+            by_source.setdefault(source_id, []).append(message_id)
+        rows = session.execute(
+            select(contact, models.Operator.name)
+            .outerjoin(models.Operator, models.Operator.id == contact.operator_id)
+            .where(
+                or_(
+                    *(
+                        and_(contact.source_id == source_id, contact.external_message_id.in_(message_ids))
+                        for source_id, message_ids in by_source.items()
+                    )
+                )
+            )
+        )
+        for row, operator_name in rows:
+            found[(row.source_id, row.external_message_id)] = schemas.ContactRead(
+                id=row.id,
+                lead_id=row.lead_id,
+                source_id=row.source_id,
+                operator_id=row.operator_id,
+                operator_name=operator_name,
+                status=row.status,
+                message=row.message,
+                created_at=row.created_at,
+            )
+    return found
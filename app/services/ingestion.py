@@ -0,0 +1,287 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Iterable, Optional, Sequence
+
+from sqlalchemy import bindparam, insert, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .. import models, schemas
+from .allocation import (
+    ALL_OPERATORS_FULL,
+    NO_ACTIVE_OPERATORS,
+    STRATEGIES,
+    OperatorCandidate,
+    allocation_rng,
+    record_allocation,
+)
+from .idempotency import IdempotencyKey, find_contacts, idempotency_cache, idempotency_key
+from .loads import track_load_changes
+from .rollups import record_contacts
+from .routing import SourceRouting, routing_cache
+
+IN_CHUNK_SIZE = 500
+MAX_CONFLICT_RETRIES = 3
+
+SOURCE_NOT_FOUND = "Source not found"
+
+
+class CapacityConflict(Exception):
+    pass
+
+
+@dataclass
+class BulkItemOutcome:
+    index: int
+    contact: Optional[schemas.ContactRead] = None
+    reason: Optional[str] = None
+    replayed: bool = False
+
+
+@dataclass
+class OperatorState:
+    name: str
+    active: bool
+    load_limit: int
+    load: int
+    reserved: int = 0
+
+
+def _chunks(values: Sequence, size: int = IN_CHUNK_SIZE) -> Iterable[Sequence]:
+    for start in range(0, len(values), size):
+        yield values[start : start + size]
+
+
+def load_operator_states(session: Session, operator_ids: set[int]) -> dict[int, OperatorState]:
+    if not operator_ids:
+        return {}
+    rows = session.execute(
+        select(
+            models.Operator.id,
+            models.Operator.name,
+            models.Operator.active,
+            models.Operator.load_limit,
+            models.Operator.active_load,
+        )
+        .where(models.Operator.id.in_(operator_ids))
+        .with_for_update()
+    )
+    return {
+        operator_id: OperatorState(name=name, active=active, load_limit=load_limit, load=load)
+        for operator_id, name, active, load_limit, load in rows
+    }
+
+
+def _insert_leads_ignoring_conflicts(session: Session, rows: list[dict]) -> None:
+    # A concurrent request may insert the same external_id between our lookup and this insert;
+    # such rows are skipped here and picked up by the following re-select.
+    dialect = session.get_bind().dialect.name
+    if dialect == "sqlite":
+        statement = sqlite.insert(models.Lead).on_conflict_do_nothing(index_elements=["external_id"])
+    elif dialect == "postgresql":
+        statement = postgresql.insert(models.Lead).on_conflict_do_nothing(index_elements=["external_id"])
+    else:
+        statement = insert(models.Lead)
+    session.execute(statement, rows)
+
+
+def _lookup_leads(session: Session, external_ids: Sequence[str]) -> dict[str, tuple[int, Optional[str]]]:
+    found: dict[str, tuple[int, Optional[str]]] = {}
+    for chunk in _chunks(external_ids):
+        rows = session.execute(
+            select(models.Lead.external_id, models.Lead.id, models.Lead.name).where(models.Lead.external_id.in_(chunk))
+        )
+        found.update({external_id: (lead_id, name) for external_id, lead_id, name in rows})
+    return found
+
+
+def _upsert_leads(session: Session, items: Sequence[schemas.ContactCreate]) -> dict[str, int]:
+    names: dict[str, Optional[str]] = {}
+    for item in items:
+        if not names.get(item.lead_external_id):
+            names[item.lead_external_id] = item.lead_name
+
+    found = _lookup_leads(session, list(names))
+    missing = [
+        {"external_id": external_id, "name": name}
+        for external_id, name in names.items()
+        if external_id not in found
+    ]
+    if missing:
+        _insert_leads_ignoring_conflicts(session, missing)
+        found.update(_lookup_leads(session, [row["external_id"] for row in missing]))
+
+    renamed = [
+        {"lead_id": lead_id, "new_name": names[external_id]}
+        for external_id, (lead_id, name) in found.items()
+        if names[external_id] and not name
+    ]
+    if renamed:
+        leads = models.Lead.__table__
+        session.connection().execute(
+            update(leads).where(leads.c.id == bindparam("lead_id")).values(name=bindparam("new_name")),
+            renamed,
+        )
+
+    return {external_id: lead_id for external_id, (lead_id, _) in found.items()}
+
+
+def allocate_from_states(
+    routing: SourceRouting, states: dict[int, OperatorState]
+) -> tuple[Optional[int], Optional[str]]:
+    candidates = [
+        OperatorCandidate(
+            operator_id=route.id,
+            weight=route.weight,
+            load=states[route.id].load + states[route.id].reserved,
+            load_limit=states[route.id].load_limit,
+        )
+        for route in routing.routes
+        if route.id in states and states[route.id].active
+    ]
+    if not candidates:
+        return None, NO_ACTIVE_OPERATORS
+
+    chosen = STRATEGIES[routing.strategy].pick(routing, candidates, allocation_rng)
+    if chosen is None:
+        return None, ALL_OPERATORS_FULL
+
+    states[chosen.operator_id].reserved += 1
+    return chosen.operator_id, None
+
+
+def _commit_reservations(session: Session, states: dict[int, OperatorState]) -> None:
+    for operator_id, state in states.items():
+        if not state.reserved:
+            continue
+        result = session.execute(
+            update(models.Operator)
+            .where(
+                models.Operator.id == operator_id,
+                models.Operator.active.is_(True),
+                or_(
+                    models.Operator.load_limit == 0,
+                    models.Operator.active_load + state.reserved <= models.Operator.load_limit,
+                ),
+            )
+            .values(active_load=models.Operator.active_load + state.reserved)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            raise CapacityConflict(operator_id)
+    track_load_changes(session, {operator_id: state.reserved for operator_id, state in states.items()})
+
+
+def _ingest(session: Session, items: Sequence[schemas.ContactCreate]) -> list[BulkItemOutcome]:
+    source_ids = sorted({item.source_id for item in items})
+    routing = routing_cache.get_many(session, source_ids)
+    lead_ids = _upsert_leads(session, [item for item in items if item.source_id in routing])
+    states = load_operator_states(
+        session, {route.id for source_routing in routing.values() for route in source_routing.routes}
+    )
+
+    # Items repeating a stored idempotency key get that contact back and allocate nothing.
+    keys = {key for key in map(idempotency_key, items) if key is not None and key[0] in routing}
+    existing = {key: contact for key in keys if (contact := idempotency_cache.get(key)) is not None}
+    if len(existing) < len(keys):
+        existing.update(find_contacts(session, keys - existing.keys()))
+
+    outcomes: list[BulkItemOutcome] = []
+    accepted: list[BulkItemOutcome] = []
+    first_by_key: dict[IdempotencyKey, BulkItemOutcome] = {}
+    repeats: list[tuple[BulkItemOutcome, BulkItemOutcome]] = []
+    rows = []
+    for index, item in enumerate(items):
+        if item.source_id not in routing:
+            outcomes.append(BulkItemOutcome(index=index, reason=SOURCE_NOT_FOUND))
+            continue
+        key = idempotency_key(item)
+        if key in existing:
+            outcomes.append(BulkItemOutcome(index=index, contact=existing[key], replayed=True))
+            continue
+        if key in first_by_key:
+            # Repeated within the batch: answered with the contact of its first occurrence.
+            outcome = BulkItemOutcome(index=index, replayed=True)
+            outcomes.append(outcome)
+            repeats.append((outcome, first_by_key[key]))
+            continue
+        operator_id, reason = allocate_from_states(routing[item.source_id], states)
+        outcome = BulkItemOutcome(index=index, reason=reason)
+        outcomes.append(outcome)
+        accepted.append(outcome)
+        if key is not None:
+            first_by_key[key] = outcome
+        rows.append(
+            {
+                "lead_id": lead_ids[item.lead_external_id],
+                "source_id": item.source_id,
+                "operator_id": operator_id,
+                "status": "active",
+                "message": item.message,
+                "external_message_id": item.external_message_id,
+            }
+        )
+
+    _commit_reservations(session, states)
+
+    if rows:
+        # Asking for RETURNING in parameter order makes SQLAlchemy fall back to one INSERT per row on
+        # SQLite. Ids are still assigned in VALUES order, so sorting by id restores the mapping.
+        inserted = sorted(
+            session.execute(insert(models.Contact).returning(models.Contact.id, models.Contact.created_at), rows).all()
+        )
+        for outcome, row, (contact_id, created_at) in zip(accepted, rows, inserted):
+            operator_id = row["operator_id"]
+            outcome.contact = schemas.ContactRead(
+                id=contact_id,
+                lead_id=row["lead_id"],
+                source_id=row["source_id"],
+                operator_id=operator_id,
+                operator_name=states[operator_id].name if operator_id is not None else None,
+                status=row["status"],
+                message=row["message"],
+                created_at=created_at,
+            )
+        for outcome, first in repeats:
+            outcome.contact = first.contact
+        record_contacts(
+            session,
+            created=[
+                (outcome.contact.created_at, outcome.contact.source_id, outcome.contact.operator_id)
+                for outcome in accepted
+            ],
+        )
+        # Contacts nobody could take wait in the source's queue until capacity frees up.
+        waiting = [
+            {"contact_id": outcome.contact.id, "source_id": outcome.contact.source_id, "priority": item.priority}
+            for outcome, item in ((outcome, items[outcome.index]) for outcome in accepted)
+            if outcome.contact.operator_id is None
+        ]
+        if waiting:
+            session.execute(insert(models.PendingContact), waiting)
+    return outcomes
+
+
+def bulk_create_contacts(session: Session, items: Sequence[schemas.ContactCreate]) -> list[BulkItemOutcome]:
+    attempts = 0
+    while True:
+        try:
+            outcomes = _ingest(session, items)
+            session.commit()
+            for outcome, item in zip(outcomes, items):
+                if outcome.contact is None:
+                    continue
+                if not outcome.replayed:
+                    record_allocation(outcome.contact.source_id, outcome.contact.operator_id, outcome.reason)
+                key = idempotency_key(item)
+                if key is not None:
+                    idempotency_cache.put(key, outcome.contact)
+            return outcomes
+        # An IntegrityError can also be a key stored concurrently by another request; the retry finds it.
+        except (CapacityConflict, IntegrityError):
+            session.rollback()
+            attempts += 1
+            if attempts >= MAX_CONFLICT_RETRIES:
+                raise
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from .. import models
+
+LEAD_CACHE_SIZE = int(os.getenv("LEAD_CACHE_SIZE", "10000"))
+
+
+@dataclass(frozen=True)
+class LeadRef:
+    id: int
+    has_name: bool
+
+
+# Bounded LRU of external_id -> lead. Lead ids never change, so entries need no invalidation;
+# callers only remember a lead after the transaction that resolved it has committed.
+class LeadCache:
+    def __init__(self, max_size: int = LEAD_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries: OrderedDict[str, LeadRef] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, external_id: str) -> Optional[LeadRef]:
+        with self._lock:
+            lead = self._entries.get(external_id)
+            if lead is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(external_id)
+            self.hits += 1
+            return lead
+
+    def put(self, external_id: str, lead: LeadRef) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[external_id] = lead
+            self._entries.move_to_end(external_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+lead_cache = LeadCache()
+
+
+def _upsert_statement(dialect: str, external_id: str, name: Optional[str]):
+    insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+    statement = insert(models.Lead).values(external_id=external_id, name=name)
+    return statement.on_conflict_do_update(
+        index_elements=["external_id"],
+        # Keep an existing name; fill it only when it is still empty.
+        set_={"name": func.coalesce(func.nullif(models.Lead.name, ""), statement.excluded.name)},
+    ).returning(models.Lead.id, models.Lead.name)
+
+
+def _get_or_create_lead(session: Session, external_id: str, name: Optional[str]) -> LeadRef:
+    lead = session.query(models.Lead).filter(models.Lead.external_id == external_id).one_or_none()
+    if lead:
+        if name and not lead.name:
+            lead.name = name
+            session.add(lead)
+        return LeadRef(id=lead.id, has_name=bool(lead.name))
+
+    lead = models.Lead(external_id=external_id, name=name)
+    session.add(lead)
+    session.flush()
+    return LeadRef(id=lead.id, has_name=bool(name))
+
+
+def resolve_lead(session: Session, external_id: str, name: Optional[str]) -> LeadRef:
+    cached = lead_cache.get(external_id)
+    if cached is not None and (cached.has_name or not name):
+        return cached
+
+    dialect = session.get_bind().dialect.name
+    if dialect not in ("sqlite", "postgresql"):
+        return _get_or_create_lead(session, external_id, name)
+
+    lead_id, stored_name = session.execute(_upsert_statement(dialect, external_id, name)).one()
+    return LeadRef(id=lead_id, has_name=bool(stored_name))
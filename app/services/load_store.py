@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+import importlib
+import os
+import tempfile
+import threading
+from array import array
+from contextlib import contextmanager
+from typing import Iterable, Iterator, Optional
+
+# Where operator loads used by allocation live when several workers serve the app:
+#   unset / "none" - per process, loads are read from the database (single worker);
+#   "memory"       - in-process store, the stand-in for a networked one in tests and single-worker runs;
+#   "shm"          - shared memory segment on this host, for uvicorn/gunicorn workers;
+#   "module:func"  - factory returning a LoadStore, e.g. a Redis-backed store.
+LOAD_STORE = os.getenv("LOAD_STORE", "")
+LOAD_STORE_NAME = os.getenv("LOAD_STORE_NAME", "crm-operator-loads")
+# Shared memory slots, one per operator id; operators with a larger id fall back to the database.
+LOAD_STORE_SLOTS = int(os.getenv("LOAD_STORE_SLOTS", "65536"))
+# How often each worker compares the store with operators.active_load; 0 disables the reconciler.
+LOAD_STORE_RECONCILE_SECONDS = float(os.getenv("LOAD_STORE_RECONCILE_SECONDS", "30"))
+
+UNKNOWN = -1
+
+
+class LoadStore:
+    # Active contacts per operator as seen by allocation, shared by every worker attached to the
+    # same store. It only saves database reads: the guarded UPDATE on operators.active_load still
+    # decides whether a reservation fits, and the reconciler corrects the store from the database.
+    #
+    # generation moves on every change, so per-process caches built from the loads know when they
+    # are stale; config_version moves when routing configuration changes in any worker.
+
+    def loads(self, operator_ids: Iterable[int]) -> dict[int, int]:
+        # Known loads only; operators missing from the result have to be read from the database.
+        raise NotImplementedError
+
+    def seed(self, loads: dict[int, int]) -> None:
+        # Stores database loads for operators the store does not know yet.
+        raise NotImplementedError
+
+    def add(self, changes: Iterable[tuple[int, int]]) -> int:
+        # Applies load deltas and returns the new generation; unknown operators stay unknown.
+        raise NotImplementedError
+
+    def generation(self) -> int:
+        raise NotImplementedError
+
+    def config_version(self) -> int:
+        raise NotImplementedError
+
+    def bump_config_version(self) -> int:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+
+class InMemoryLoadStore(LoadStore):
+    def __init__(self) -> None:
+        self._loads: dict[int, int] = {}
+        self._generation = 0
+        self._config_version = 0
+        self._lock = threading.Lock()
+
+    def loads(self, operator_ids: Iterable[int]) -> dict[int, int]:
+        loads = self._loads
+        return {operator_id: loads[operator_id] for operator_id in operator_ids if operator_id in loads}
+
+    def seed(self, loads: dict[int, int]) -> None:
+        with self._lock:
+            for operator_id, load in loads.items():
+                self._loads.setdefault(operator_id, load)
+
+    def add(self, changes: Iterable[tuple[int, int]]) -> int:
+        with self._lock:
+            for operator_id, delta in changes:
+                if operator_id in self._loads:
+                    self._loads[operator_id] += delta
+            self._generation += 1
+            return self._generation
+
+    def generation(self) -> int:
+        return self._generation
+
+    def config_version(self) -> int:
+        return self._config_version
+
+    def bump_config_version(self) -> int:
+        with self._lock:
+            self._config_version += 1
+            return self._config_version
+
+    def clear(self) -> None:
+        with self._lock:
+            self._loads.clear()
+            self._generation += 1
+
+
+# Shared memory layout: int64 slots [generation, config version, load of operator 0, 1, ...].
+_HEADER = 2
+
+
+class SharedMemoryLoadStore(LoadStore):
+    # One segment per host, created by the first worker that touches it and left in place when
+    # workers exit, so restarted workers keep the loads. Writers serialize on flock() of a lock
+    # file (and a thread lock, since flock does not exclude threads sharing the descriptor);
+    # readers take single aligned int64 values without locking.
+
+    def __init__(self, name: str = LOAD_STORE_NAME, slots: int = LOAD_STORE_SLOTS, lock_path: Optional[str] = None):
+        self.name = name
+        self.slots = slots
+        self.lock_path = lock_path or os.path.join(tempfile.gettempdir(), f"{name}.lock")
+        self._thread_lock = threading.Lock()
+        self._segment = None
+        self._lock_file = None
+        self._values: Optional[memoryview] = None
+
+    def _view(self) -> memoryview:
+        # Attached on first use, so importing the app does not touch shared memory.
+        if self._values is None:
+            with self._thread_lock:
+                if self._values is None:
+                    self._attach()
+        return self._values
+
+    def _attach(self) -> None:
+        import fcntl
+        from multiprocessing import resource_tracker, shared_memory
+
+        lock_file = open(self.lock_path, "a+b")
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            try:
+                segment = shared_memory.SharedMemory(self.name, create=True, size=(_HEADER + self.slots) * 8)
+                created = True
+            except FileExistsError:
+                segment = shared_memory.SharedMemory(self.name)
+                created = False
+            # The tracker would unlink the segment when this process exits, under the other workers.
+            resource_tracker.unregister(segment._name, "shared_memory")
+            values = segment.buf.cast("q")
+            if created:
+                values[:_HEADER] = array("q", [0] * _HEADER)
+                values[_HEADER:] = array("q", [UNKNOWN]) * (len(values) - _HEADER)
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+        self.slots = len(values) - _HEADER
+        self._segment, self._lock_file, self._values = segment, lock_file, values
+
+    @contextmanager
+    def _locked(self) -> Iterator[memoryview]:
+        import fcntl
+
+        values = self._view()
+        with self._thread_lock:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+            try:
+                yield values
+            finally:
+                fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _slot(self, operator_id: int) -> Optional[int]:
+        return _HEADER + operator_id if 0 <= operator_id < self.slots else None
+
+    def loads(self, operator_ids: Iterable[int]) -> dict[int, int]:
+        values = self._view()
+        found = {}
+        for operator_id in operator_ids:
+            slot = self._slot(operator_id)
+            if slot is not None and values[slot] != UNKNOWN:
+                found[operator_id] = values[slot]
+        return found
+
+    def seed(self, loads: dict[int, int]) -> None:
+        with self._locked() as values:
+            for operator_id, load in loads.items():
+                slot = self._slot(operator_id)
+                if slot is not None and values[slot] == UNKNOWN:
+                    values[slot] = load
+
+    def add(self, changes: Iterable[tuple[int, int]]) -> int:
+        with self._locked() as values:
+            for operator_id, delta in changes:
+                slot = self._slot(operator_id)
+                if slot is not None and values[slot] != UNKNOWN:
+                    values[slot] += delta
+            values[0] += 1
+            return values[0]
+
+    def generation(self) -> int:
+        return self._view()[0]
+
+    def config_version(self) -> int:
+        return self._view()[1]
+
+    def bump_config_version(self) -> int:
+        with self._locked() as values:
+            values[1] += 1
+            return values[1]
+
+    def clear(self) -> None:
+        with self._locked() as values:
+            values[_HEADER:] = array("q", [UNKNOWN]) * self.slots
+            values[0] += 1
+
+    def unlink(self) -> None:
+        # Removes the segment for every worker; for tests and maintenance, not for worker shutdown.
+        self._view()
+        values, self._values = self._values, None
+        values.release()
+        self._segment.close()
+        self._segment.unlink()
+        self._lock_file.close()
+        os.unlink(self.lock_path)
+
+
+def build_load_store(spec: str = LOAD_STORE) -> Optional[LoadStore]:
+    if spec in ("", "none"):
+        return None
+    if spec == "memory":
+        return InMemoryLoadStore()
+    if spec == "shm":
+        return SharedMemoryLoadStore()
+    module_name, separator, factory = spec.partition(":")
+    if not separator:
+        raise ValueError(f"LOAD_STORE must be none, memory, shm or module:factory, got {spec!r}")
+    return getattr(importlib.import_module(module_name), factory)()
+
+
+_load_store: Optional[LoadStore] = build_load_store()
+
+
+def get_load_store() -> Optional[LoadStore]:
+    return _load_store
+
+
+def set_load_store(store: Optional[LoadStore]) -> None:
+    global _load_store
+    _load_store = store
@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Optional
+
+from sqlalchemy import event, func, select, update
+from sqlalchemy.orm import Session, SessionTransaction
+
+from .. import models
+from .heap import IndexedHeap
+from .load_store import get_load_store
+from .routing import OperatorRoute, SourceRouting
+
+ACTIVE_STATUS = "active"
+
+# Session.info key holding load changes applied to the in-memory index but not committed yet.
+PENDING_LOAD_CHANGES = "pending_load_changes"
+
+
+@dataclass
+class LoadDrift:
+    operator_id: int
+    stored: int
+    actual: int
+
+
+def count_active_contacts(session: Session) -> dict[int, int]:
+    query = (
+        select(models.Contact.operator_id, func.count(models.Contact.id))
+        .where(models.Contact.operator_id.is_not(None), models.Contact.status == ACTIVE_STATUS)
+        .group_by(models.Contact.operator_id)
+    )
+    return {operator_id: count for operator_id, count in session.execute(query).all()}
+
+
+def read_operator_loads(session: Optional[Session], operator_ids: list[int]) -> dict[int, int]:
+    # With a shared load store only operators it does not know yet are read from the database.
+    store = get_load_store()
+    loads = store.loads(operator_ids) if store is not None else {}
+    missing = [operator_id for operator_id in operator_ids if operator_id not in loads]
+    if not missing or session is None:
+        return loads
+    query = select(models.Operator.id, models.Operator.active_load).where(models.Operator.id.in_(missing))
+    fetched = {operator_id: load for operator_id, load in session.execute(query).all()}
+    if store is not None:
+        store.seed(fetched)
+    loads.update(fetched)
+    return loads
+
+
+@dataclass
+class _SourceLoads:
+    routing: SourceRouting
+    routes: dict[int, OperatorRoute]
+    loads: dict[int, int]
+    heap: IndexedHeap[int] = field(default_factory=IndexedHeap)
+    # Operators whose reservation failed although the index saw room; skipped until their load changes.
+    blocked: set[int] = field(default_factory=set)
+    # Load store generation the loads were read at; None without a shared store.
+    generation: Optional[int] = None
+
+    def priority(self, operator_id: int) -> tuple[float, int, int]:
+        # Utilization relative to the limit; an unlimited operator is never saturated and ranks
+        # by its raw load among other unlimited ones.
+        load = self.loads[operator_id]
+        if operator_id in self.blocked:
+            return float("inf"), load, operator_id
+        limit = self.routes[operator_id].load_limit
+        return (load / limit if limit else 0.0), load, operator_id
+
+
+class LeastLoadedIndex:
+    # Per-source indexed heaps of operator utilization. Loads are read once per routing snapshot
+    # and then moved incrementally on every reservation and release this process makes, so the
+    # least-loaded operator is found in O(1) and updated in O(log n) per source it serves. Other
+    # processes' changes are picked up when the snapshot is refreshed, or, with a shared load
+    # store, as soon as the store generation moves past the one the entry was read at; the
+    # guarded UPDATE keeps limits exact in between.
+
+    def __init__(self) -> None:
+        self._sources: dict[int, _SourceLoads] = {}
+        self._by_operator: dict[int, set[int]] = {}
+        self._lock = threading.Lock()
+
+    def load(self, routing: SourceRouting, loads: dict[int, int], generation: Optional[int] = None) -> None:
+        entry = _SourceLoads(
+            routing=routing,
+            routes={route.id: route for route in routing.active_routes},
+            loads={route.id: loads.get(route.id, 0) for route in routing.active_routes},
+            generation=generation,
+        )
+        for operator_id in entry.routes:
+            entry.heap.set(operator_id, entry.priority(operator_id))
+        with self._lock:
+            previous = self._sources.get(routing.source_id)
+            if previous is not None:
+                for operator_id in previous.routes:
+                    self._by_operator.get(operator_id, set()).discard(routing.source_id)
+            self._sources[routing.source_id] = entry
+            for operator_id in entry.routes:
+                self._by_operator.setdefault(operator_id, set()).add(routing.source_id)
+
+    def best(self, session: Optional[Session], routing: SourceRouting) -> Optional[OperatorRoute]:
+        # Least utilized operator of the source with room left, or None when all are saturated.
+        store = get_load_store()
+        generation = store.generation() if store is not None else None
+        entry = self._sources.get(routing.source_id)
+        stale = entry is None or entry.routing is not routing
+        if stale or (session is not None and entry.generation != generation):
+            if session is None:
+                raise KeyError(routing.source_id)
+            # Loads are read after the generation, so a change racing with the read leaves the entry stale.
+            operator_ids = [route.id for route in routing.active_routes]
+            self.load(routing, read_operator_loads(session, operator_ids), generation)
+            entry = self._sources[routing.source_id]
+        with self._lock:
+            top = entry.heap.peek()
+        if top is None or top[1][0] >= 1.0:
+            return None
+        return entry.routes[top[0]]
+
+    def apply(self, changes: Iterable[tuple[int, int]], generation: Optional[int] = None) -> None:
+        # generation is the load store's after these changes: entries that were current just
+        # before them stay current, the others are reloaded on their next pick.
+        with self._lock:
+            for operator_id, delta in changes:
+                for source_id in self._by_operator.get(operator_id, ()):
+                    entry = self._sources[source_id]
+                    entry.loads[operator_id] += delta
+                    entry.blocked.discard(operator_id)
+                    entry.heap.set(operator_id, entry.priority(operator_id))
+                    if generation is not None and entry.generation == generation - 1:
+                        entry.generation = generation
+
+    def block(self, operator_id: int) -> None:
+        with self._lock:
+            for source_id in self._by_operator.get(operator_id, ()):
+                entry = self._sources[source_id]
+                entry.blocked.add(operator_id)
+                entry.heap.set(operator_id, entry.priority(operator_id))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._sources.clear()
+            self._by_operator.clear()
+
+
+load_index = LeastLoadedIndex()
+
+
+def track_load_changes(session: Session, changes: dict[int, int]) -> None:
+    # Applied to the index right away so concurrent picks see the reservation, and reverted if
+    # the transaction ends without a commit.
+    changes = [(operator_id, delta) for operator_id, delta in changes.items() if delta]
+    if not changes:
+        return
+    _apply_load_changes(changes)
+    session.info.setdefault(PENDING_LOAD_CHANGES, []).extend(changes)
+
+
+def _apply_load_changes(changes: list[tuple[int, int]]) -> None:
+    store = get_load_store()
+    load_index.apply(changes, store.add(changes) if store is not None else None)
+
+
+@event.listens_for(Session, "after_commit")
+def _keep_load_changes(session: Session) -> None:
+    session.info.pop(PENDING_LOAD_CHANGES, None)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _revert_load_changes(session: Session, transaction: SessionTransaction) -> None:
+    if transaction.parent is None:
+        pending = session.info.pop(PENDING_LOAD_CHANGES, None)
+        if pending:
+            _apply_load_changes([(operator_id, -delta) for operator_id, delta in pending])
+
+
+def reconcile_operator_loads(session: Session, fix: bool = True) -> list[LoadDrift]:
+    actual = count_active_contacts(session)
+    stored = session.execute(select(models.Operator.id, models.Operator.active_load)).all()
+
+    drift = [
+        LoadDrift(operator_id=operator_id, stored=load, actual=actual.get(operator_id, 0))
+        for operator_id, load in stored
+        if load != actual.get(operator_id, 0)
+    ]
+    if fix:
+        for item in drift:
+            session.execute(
+                update(models.Operator)
+                .where(models.Operator.id == item.operator_id)
+                .values(active_load=item.actual)
+                .execution_options(synchronize_session=False)
+            )
+        if drift:
+            load_index.clear()
+            track_load_changes(session, {item.operator_id: item.actual - item.stored for item in drift})
+    return drift
+
+
+class LoadStoreReconciler:
+    # Periodically compares the shared load store with operators.active_load, which stays the
+    # source of truth. A difference is corrected only when the next pass finds the same one, so a
+    # reservation in flight while a pass reads both sides is not "fixed" away; corrections are
+    # applied as deltas and do not overwrite concurrent changes.
+
+    def __init__(self) -> None:
+        self._suspected: dict[int, int] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def run_once(self, session: Session) -> int:
+        store = get_load_store()
+        if store is None:
+            return 0
+        stored = dict(session.execute(select(models.Operator.id, models.Operator.active_load)).all())
+        known = store.loads(stored)
+        drift = {
+            operator_id: known[operator_id] - load
+            for operator_id, load in stored.items()
+            if known.get(operator_id, load) != load
+        }
+        suspected, self._suspected = self._suspected, {}
+        confirmed = []
+        for operator_id, delta in drift.items():
+            if suspected.get(operator_id) == delta:
+                confirmed.append((operator_id, -delta))
+            else:
+                self._suspected[operator_id] = delta
+        if confirmed:
+            _apply_load_changes(confirmed)
+        store.seed({operator_id: load for operator_id, load in stored.items() if operator_id not in known})
+        return len(confirmed)
+
+    def start(self, session_factory: Callable[[], Session], interval: float) -> None:
+        if interval <= 0 or self._thread is not None or get_load_store() is None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(session_factory, interval), name="load-store-reconciler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def _run(self, session_factory: Callable[[], Session], interval: float) -> None:
+        while not self._stop.wait(interval):
+            try:
+                with session_factory() as session:
+                    self.run_once(session)
+            except Exception:
+                # A failed pass (database busy or restarting) is retried on the next tick.
+                logging.getLogger(__name__).exception("Load store reconciliation failed")
+
+
+load_store_reconciler = LoadStoreReconciler()
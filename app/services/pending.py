@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import os
+from collections import Counter
+from typing import Iterable, Optional
+
+from sqlalchemy import bindparam, delete, exists, or_, select, update
+from sqlalchemy.orm import Session
+
+from .. import models
+from .ingestion import IN_CHUNK_SIZE, allocate_from_states, load_operator_states
+from .loads import track_load_changes
+from .routing import PRIORITY, routing_cache
+
+# Contacts backfilled per source in one dispatch pass; the rest wait for the next capacity event.
+DISPATCH_BATCH_SIZE = int(os.getenv("PENDING_DISPATCH_BATCH_SIZE", "500"))
+
+
+def dequeue_pending(session: Session, contact_ids: Iterable[int]) -> None:
+    contact_ids = sorted(set(contact_ids))
+    for start in range(0, len(contact_ids), IN_CHUNK_SIZE):
+        session.execute(
+            delete(models.PendingContact).where(
+                models.PendingContact.contact_id.in_(contact_ids[start : start + IN_CHUNK_SIZE])
+            )
+        )
+
+
+def sources_waiting_for(session: Session, operator_ids: Iterable[int]) -> list[int]:
+    # Sources served by these operators that have pending contacts; both sides are index lookups,
+    # so a capacity event never scans contacts for unassigned rows.
+    operator_ids = sorted(set(operator_ids))
+    if not operator_ids:
+        return []
+    assignment = models.SourceOperatorAssignment
+    query = (
+        select(assignment.source_id)
+        .where(
+            assignment.operator_id.in_(operator_ids),
+            exists().where(models.PendingContact.source_id == assignment.source_id),
+        )
+        .distinct()
+    )
+    return sorted(session.execute(query).scalars())
+
+
+def _reserve(session: Session, reserved: Counter[int]) -> set[int]:
+    # Guarded per-operator reservation; an operator filled concurrently is skipped and its
+    # contacts stay pending for the next event instead of failing the caller's transaction.
+    granted: set[int] = set()
+    for operator_id, count in reserved.items():
+        result = session.execute(
+            update(models.Operator)
+            .where(
+                models.Operator.id == operator_id,
+                models.Operator.active.is_(True),
+                or_(models.Operator.load_limit == 0, models.Operator.active_load + count <= models.Operator.load_limit),
+            )
+            .values(active_load=models.Operator.active_load + count)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 1:
+            granted.add(operator_id)
+    track_load_changes(session, {operator_id: reserved[operator_id] for operator_id in granted})
+    return granted
+
+
+def _dispatch_source(session: Session, source_id: int) -> int:
+    routing = routing_cache.get(session, source_id)
+    if routing is None or not routing.routes:
+        return 0
+    states = load_operator_states(session, {route.id for route in routing.routes})
+    active = [state for state in states.values() if state.active]
+    if any(state.load_limit == 0 for state in active):
+        capacity = DISPATCH_BATCH_SIZE
+    else:
+        capacity = min(DISPATCH_BATCH_SIZE, sum(max(0, state.load_limit - state.load) for state in active))
+    if not capacity:
+        return 0
+
+    pending = models.PendingContact
+    order = (pending.priority.desc(), pending.id) if routing.pending_order == PRIORITY else (pending.id,)
+    waiting = session.execute(
+        select(pending.id, pending.contact_id)
+        .where(pending.source_id == source_id)
+        .order_by(*order)
+        .limit(capacity)
+        .with_for_update(skip_locked=True)
+    ).all()
+
+    # Same weighting and limit rules as bulk ingestion: the source's strategy over in-memory loads.
+    chosen: list[tuple[int, int, int]] = []
+    for pending_id, contact_id in waiting:
+        operator_id, _ = allocate_from_states(routing, states)
+        if operator_id is None:
+            break
+        chosen.append((pending_id, contact_id, operator_id))
+    if not chosen:
+        return 0
+
+    granted = _reserve(session, Counter(operator_id for _, _, operator_id in chosen))
+    chosen = [item for item in chosen if item[2] in granted]
+    if not chosen:
+        return 0
+    contacts = models.Contact.__table__
+    session.connection().execute(
+        update(contacts).where(contacts.c.id == bindparam("contact_id")).values(operator_id=bindparam("operator_id")),
+        [{"contact_id": contact_id, "operator_id": operator_id} for _, contact_id, operator_id in chosen],
+    )
+    session.execute(delete(pending).where(pending.id.in_([pending_id for pending_id, _, _ in chosen])))
+    return len(chosen)
+
+
+def dispatch_pending(
+    session: Session, source_ids: Optional[Iterable[int]] = None, operator_ids: Optional[Iterable[int]] = None
+) -> int:
+    # Called in the transaction that freed capacity (closes) or right after a configuration change
+    # (limit raised, operator reactivated, assignments changed). Returns the number of contacts assigned.
+    targets: set[int] = set()
+    if source_ids:
+        # One index probe keeps the common case, an empty queue, from loading routing and operator states.
+        targets.update(
+            session.execute(
+                select(models.PendingContact.source_id)
+                .where(models.PendingContact.source_id.in_(sorted(set(source_ids))))
+                .distinct()
+            ).scalars()
+        )
+    if operator_ids is not None:
+        targets.update(sources_waiting_for(session, operator_ids))
+    return sum(_dispatch_source(session, source_id) for source_id in sorted(targets))
@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional
+
+from sqlalchemy import ColumnElement, and_, delete, func, insert, select, type_coerce, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from .. import models
+from .loads import ACTIVE_STATUS
+
+UNASSIGNED_OPERATOR = 0
+
+HOUR = "hour"
+DAY = "day"
+WEEK = "week"
+GRANULARITIES = (HOUR, DAY, WEEK)
+BUCKET_SPANS = {HOUR: timedelta(hours=1), DAY: timedelta(days=1), WEEK: timedelta(weeks=1)}
+
+# (moment, source_id, operator_id or None) of a created or closed contact.
+ContactEvent = tuple[datetime, int, Optional[int]]
+
+_COUNTERS = ("created", "unassigned", "closed")
+
+
+@dataclass
+class RollupRow:
+    bucket: datetime
+    key: Optional[int]
+    created: int
+    unassigned: int
+    closed: int
+
+
+def utc_now() -> datetime:
+    # Naive UTC at second precision, the same shape as server-side CURRENT_TIMESTAMP values.
+    return datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+
+
+def floor_bucket(moment: datetime, granularity: str = HOUR) -> datetime:
+    moment = moment.replace(minute=0, second=0, microsecond=0)
+    if granularity == HOUR:
+        return moment
+    moment = moment.replace(hour=0)
+    if granularity == WEEK:
+        moment -= timedelta(days=moment.weekday())
+    return moment
+
+
+def _rows(counters: dict[tuple[datetime, int, int], list[int]]) -> list[dict]:
+    return [
+        {"bucket": bucket, "source_id": source_id, "operator_id": operator_id, **dict(zip(_COUNTERS, counts))}
+        for (bucket, source_id, operator_id), counts in counters.items()
+    ]
+
+
+def _upsert(session: Session, rows: list[dict]) -> None:
+    table = models.AllocationRollup.__table__
+    key = ["bucket", "source_id", "operator_id"]
+    dialect = session.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        statement = (sqlite if dialect == "sqlite" else postgresql).insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=key,
+            set_={name: table.c[name] + statement.excluded[name] for name in _COUNTERS},
+        )
+        session.execute(statement, rows)
+        return
+    # Other backends: increment what exists, insert the rest.
+    for row in rows:
+        result = session.execute(
+            update(table)
+            .where(and_(*(table.c[name] == row[name] for name in key)))
+            .values({name: table.c[name] + row[name] for name in _COUNTERS})
+        )
+        if not result.rowcount:
+            session.execute(insert(table), row)
+
+
+def record_contacts(
+    session: Session, created: Iterable[ContactEvent] = (), closed: Iterable[ContactEvent] = ()
+) -> None:
+    # One upsert per transaction, folded per hour, source and operator before it reaches the database.
+    counters: dict[tuple[datetime, int, int], list[int]] = defaultdict(lambda: [0, 0, 0])
+    for moment, source_id, operator_id in created:
+        counts = counters[(floor_bucket(moment), source_id, operator_id or UNASSIGNED_OPERATOR)]
+        counts[0] += 1
+        counts[1] += operator_id is None
+    for moment, source_id, operator_id in closed:
+        counters[(floor_bucket(moment), source_id, operator_id or UNASSIGNED_OPERATOR)][2] += 1
+    if counters:
+        _upsert(session, _rows(counters))
+
+
+def _truncate(session: Session, column: ColumnElement, granularity: str) -> ColumnElement:
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        return func.date_trunc(granularity, column)
+    # SQLite keeps timestamps as text, so truncation is string formatting; weeks start on Monday.
+    formats = {HOUR: "%Y-%m-%d %H:00:00", DAY: "%Y-%m-%d 00:00:00", WEEK: "%Y-%m-%d 00:00:00"}
+    arguments = (column, "weekday 0", "-6 days") if granularity == WEEK else (column,)
+    return type_coerce(func.strftime(formats[granularity], *arguments), models.KeysetTimestamp)
+
+
+def query_rollups(
+    session: Session,
+    start: datetime,
+    end: datetime,
+    granularity: str = HOUR,
+    by: str = "source",
+    source_id: Optional[int] = None,
+    operator_id: Optional[int] = None,
+) -> list[RollupRow]:
+    # Reads only rollup rows in [start, end), re-aggregated in SQL to the requested granularity
+    # and grouped by source or by operator; the contacts table is never touched.
+    rollup = models.AllocationRollup
+    bucket = rollup.bucket if granularity == HOUR else _truncate(session, rollup.bucket, granularity).label("bucket")
+    key = rollup.source_id if by == "source" else rollup.operator_id
+    query = (
+        select(bucket, key, *(func.sum(getattr(rollup, name)) for name in _COUNTERS))
+        .where(rollup.bucket >= start, rollup.bucket < end)
+        .group_by(bucket, key)
+        .order_by(bucket, key)
+    )
+    if source_id is not None:
+        query = query.where(rollup.source_id == source_id)
+    if operator_id is not None:
+        query = query.where(rollup.operator_id == operator_id)
+    return [
+        RollupRow(
+            bucket=row_bucket,
+            key=None if by == "operator" and row_key == UNASSIGNED_OPERATOR else row_key,
+            created=created,
+            unassigned=unassigned,
+            closed=closed,
+        )
+        for row_bucket, row_key, created, unassigned, closed in session.execute(query)
+    ]
+
+
+def backfill_rollups(session: Session, since: Optional[datetime] = None) -> int:
+    # Rebuilds rollups from contacts: created and unassigned by created_at, closed by closed_at.
+    # History has only the current operator of each contact, so "unassigned" counts contacts that
+    # still have none, and contacts closed before closed_at existed are counted in their creation hour.
+    contact = models.Contact
+    rollup_delete = delete(models.AllocationRollup)
+    if since is not None:
+        since = floor_bucket(since)
+        rollup_delete = rollup_delete.where(models.AllocationRollup.bucket >= since)
+    session.execute(rollup_delete)
+
+    operator = func.coalesce(contact.operator_id, UNASSIGNED_OPERATOR)
+    created_bucket = _truncate(session, contact.created_at, HOUR)
+    created = select(
+        created_bucket,
+        contact.source_id,
+        operator,
+        func.count(),
+        func.count().filter(contact.operator_id.is_(None)),
+    ).group_by(created_bucket, contact.source_id, operator)
+    closed_at = func.coalesce(contact.closed_at, contact.created_at)
+    closed_bucket = _truncate(session, closed_at, HOUR)
+    closed = (
+        select(closed_bucket, contact.source_id, operator, func.count())
+        .where(contact.status != ACTIVE_STATUS)
+        .group_by(closed_bucket, contact.source_id, operator)
+    )
+    if since is not None:
+        created = created.where(contact.created_at >= since)
+        closed = closed.where(closed_at >= since)
+
+    counters: dict[tuple[datetime, int, int], list[int]] = defaultdict(lambda: [0, 0, 0])
+    for bucket, source_id, operator_id, count, unassigned in session.execute(created):
+        counters[(bucket, source_id, operator_id)][:2] = [count, unassigned]
+    for bucket, source_id, operator_id, count in session.execute(closed):
+        counters[(bucket, source_id, operator_id)][2] = count
+    rows = _rows(counters)
+    if rows:
+        session.execute(insert(models.AllocationRollup), rows)
+    return len(rows)
@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Iterable, Optional
+
+from sqlalchemy.orm import Session, selectinload
+
+from .. import models
+from .load_store import get_load_store
+from .sampling import AliasSampler
+
+ROUTING_CACHE_TTL_SECONDS = float(os.getenv("ROUTING_CACHE_TTL_SECONDS", "60"))
+
+# Allocation strategies a Source can select; the implementations live in allocation.py.
+WEIGHTED_RANDOM = "weighted_random"
+LEAST_LOADED = "least_loaded"
+WEIGHTED_ROUND_ROBIN = "weighted_round_robin"
+ALLOCATION_STRATEGIES = (WEIGHTED_RANDOM, LEAST_LOADED, WEIGHTED_ROUND_ROBIN)
+
+# Order in which a source's pending contacts are backfilled.
+FIFO = "fifo"
+PRIORITY = "priority"
+PENDING_ORDERS = (FIFO, PRIORITY)
+
+
+@dataclass(frozen=True)
+class OperatorRoute:
+    id: int
+    name: str
+    weight: int
+    active: bool
+    load_limit: int
+
+
+@dataclass(frozen=True)
+class SourceRouting:
+    source_id: int
+    routes: tuple[OperatorRoute, ...]
+    active_routes: tuple[OperatorRoute, ...]
+    # Weighted sampler over active_routes, built once per snapshot.
+    sampler: Optional[AliasSampler]
+    expires_at: float
+    strategy: str = WEIGHTED_RANDOM
+    pending_order: str = FIFO
+    admission_rate: Optional[float] = None
+    admission_burst: Optional[int] = None
+
+
+def build_routing(
+    source_id: int,
+    routes: Iterable[OperatorRoute],
+    expires_at: float,
+    strategy: str = WEIGHTED_RANDOM,
+    pending_order: str = FIFO,
+    admission_rate: Optional[float] = None,
+    admission_burst: Optional[int] = None,
+) -> SourceRouting:
+    routes = tuple(routes)
+    active_routes = tuple(route for route in routes if route.active)
+    sampler = AliasSampler([route.weight for route in active_routes]) if active_routes else None
+    return SourceRouting(
+        source_id=source_id,
+        routes=routes,
+        active_routes=active_routes,
+        sampler=sampler,
+        expires_at=expires_at,
+        strategy=strategy,
+        pending_order=pending_order,
+        admission_rate=admission_rate,
+        admission_burst=admission_burst,
+    )
+
+
+@dataclass(frozen=True)
+class RoutingCacheStats:
+    hits: int
+    misses: int
+    invalidations: int
+    size: int
+
+
+# Per-process cache of source routing snapshots. Writers invalidate after commit and the TTL
+# bounds staleness for changes made by other processes; the generation counter keeps a load
+# that raced with an invalidation from being stored. With a shared load store, invalidations
+# also bump its config version and every worker drops its snapshots when it sees the bump.
+class RoutingCache:
+    def __init__(self, ttl_seconds: float = ROUTING_CACHE_TTL_SECONDS, clock: Callable[[], float] = time.monotonic):
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: dict[int, SourceRouting] = {}
+        self._generation = 0
+        self._config_version: Optional[int] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, session: Session, source_id: int) -> Optional[SourceRouting]:
+        return self.get_many(session, [source_id]).get(source_id)
+
+    def get_many(self, session: Session, source_ids: Iterable[int]) -> dict[int, SourceRouting]:
+        store = get_load_store()
+        version = store.config_version() if store is not None else None
+        if version != self._config_version:
+            with self._lock:
+                self._generation += 1
+                self._entries.clear()
+                self._config_version = version
+        now = self._clock()
+        found: dict[int, SourceRouting] = {}
+        missing: list[int] = []
+        for source_id in source_ids:
+            entry = self._entries.get(source_id)
+            if entry is not None and entry.expires_at > now:
+                found[source_id] = entry
+            else:
+                missing.append(source_id)
+
+        self.hits += len(found)
+        self.misses += len(missing)
+        if missing:
+            generation = self._generation
+            loaded = self._load(session, missing, now + self.ttl_seconds)
+            with self._lock:
+                if generation == self._generation:
+                    self._entries.update(loaded)
+            found.update(loaded)
+        return found
+
+    def peek(self, source_id: int) -> Optional[SourceRouting]:
+        # The cached snapshot, even past its TTL, without a session; None until a request loads it.
+        return self._entries.get(source_id)
+
+    def invalidate(self, source_id: Optional[int] = None) -> None:
+        with self._lock:
+            self._generation += 1
+            self.invalidations += 1
+            if source_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(source_id, None)
+            store = get_load_store()
+            if store is not None:
+                version = store.bump_config_version()
+                # Only this bump happened since the last sync: the other snapshots are still valid here.
+                if self._config_version == version - 1:
+                    self._config_version = version
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self.hits = self.misses = self.invalidations = 0
+
+    def stats(self) -> RoutingCacheStats:
+        return RoutingCacheStats(
+            hits=self.hits, misses=self.misses, invalidations=self.invalidations, size=len(self._entries)
+        )
+
+    @staticmethod
+    def _load(session: Session, source_ids: list[int], expires_at: float) -> dict[int, SourceRouting]:
+        sources = (
+            session.query(models.Source)
+            .options(selectinload(models.Source.assignments).joinedload(models.SourceOperatorAssignment.operator))
+            .filter(models.Source.id.in_(source_ids))
+            .all()
+        )
+        return {
+            source.id: build_routing(
+                source.id,
+                (
+                    OperatorRoute(
+                        id=assignment.operator_id,
+                        name=assignment.operator.name,
+                        weight=assignment.weight,
+                        active=assignment.operator.active,
+                        load_limit=assignment.operator.load_limit,
+                    )
+                    for assignment in sorted(source.assignments, key=lambda item: item.operator_id)
+                    if assignment.operator is not None
+                ),
+                expires_at,
+                source.allocation_strategy,
+                source.pending_order,
+                source.admission_rate,
+                source.admission_burst,
+            )
+            for source in sources
+        }
+
+
+routing_cache = RoutingCache()
@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import random
+from typing import Sequence
+
+
+class AliasSampler:
+    # Vose's alias method: O(n) to build, O(1) per weighted draw.
+
+    __slots__ = ("_probabilities", "_aliases")
+
+    def __init__(self, weights: Sequence[float]):
+        count = len(weights)
+        total = float(sum(weights))
+        if count == 0 or total <= 0:
+            raise ValueError("AliasSampler needs at least one positive weight")
+
+        scaled = [weight * count / total for weight in weights]
+        probabilities = [0.0] * count
+        aliases = list(range(count))
+        small = [index for index, value in enumerate(scaled) if value < 1.0]
+        large = [index for index, value in enumerate(scaled) if value >= 1.0]
+
+        while small and large:
+            low = small.pop()
+            high = large.pop()
+            probabilities[low] = scaled[low]
+            aliases[low] = high
+            scaled[high] = scaled[high] + scaled[low] - 1.0
+            if scaled[high] < 1.0:
+                small.append(high)
+            else:
+                large.append(high)
+        for index in large + small:
+            probabilities[index] = 1.0
+
+        self._probabilities = probabilities
+        self._aliases = aliases
+
+    def __len__(self) -> int:
+        return len(self._probabilities)
+
+    def table(self) -> tuple[list[float], list[int]]:
+        # Acceptance probability and alias per column, for samplers that draw in bulk.
+        return list(self._probabilities), list(self._aliases)
+
+    def sample(self, rng: random.Random) -> int:
+        column = int(rng.random() * len(self._probabilities))
+        if rng.random() < self._probabilities[column]:
+            return column
+        return self._aliases[column]
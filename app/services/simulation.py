@@ -0,0 +1,513 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field, replace
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from .. import models
+from .allocation import ALL_OPERATORS_FULL, NO_ACTIVE_OPERATORS, OUTCOME_LABELS
+from .routing import ALLOCATION_STRATEGIES, LEAST_LOADED, WEIGHTED_RANDOM, SourceRouting, build_routing, routing_cache
+
+# Events examined per vectorized step. The step shrinks while operators are saturated (every
+# rejection ends a step early) and grows back while whole steps are accepted.
+DEFAULT_CHUNK_SIZE = 65_536
+MIN_CHUNK_SIZE = 256
+# Events replayed one by one after a rejection before trying a vectorized step again.
+SCALAR_STRETCH = 2_048
+
+UNLIMITED = np.iinfo(np.int64).max
+
+
+@dataclass(frozen=True)
+class SimulationConfig:
+    routings: dict[int, SourceRouting]
+    # Active load per operator at the start of the run; these contacts stay open throughout.
+    initial_loads: dict[int, int] = field(default_factory=dict)
+
+    def with_overrides(
+        self,
+        load_limits: Optional[dict[int, int]] = None,
+        weights: Optional[dict[tuple[int, int], int]] = None,
+        strategies: Optional[dict[int, str]] = None,
+    ) -> SimulationConfig:
+        # weights are keyed by (source_id, operator_id); load limits apply to the operator in every source.
+        load_limits = load_limits or {}
+        weights = weights or {}
+        strategies = strategies or {}
+        routings = {}
+        for source_id, routing in self.routings.items():
+            routes = [
+                replace(
+                    route,
+                    load_limit=load_limits.get(route.id, route.load_limit),
+                    weight=weights.get((source_id, route.id), route.weight),
+                )
+                for route in routing.routes
+            ]
+            routings[source_id] = build_routing(
+                source_id,
+                routes,
+                routing.expires_at,
+                strategies.get(source_id, routing.strategy),
+                routing.pending_order,
+            )
+        return SimulationConfig(routings=routings, initial_loads=dict(self.initial_loads))
+
+
+@dataclass(frozen=True)
+class ContactStream:
+    # One entry per contact: arrival offset in seconds, source and time until it is closed (inf keeps it open).
+    arrival_times: np.ndarray
+    source_ids: np.ndarray
+    handle_times: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.arrival_times)
+
+
+@dataclass
+class OperatorOutcome:
+    operator_id: int
+    load_limit: int
+    assigned: int
+    peak_load: int
+    final_load: int
+    # Seconds from the start of the stream until the operator first reached its limit.
+    saturated_at: Optional[float]
+
+
+@dataclass
+class SourceOutcome:
+    source_id: int
+    arrivals: int
+    unassigned: int
+
+
+@dataclass
+class SimulationResult:
+    arrivals: int
+    events: int
+    elapsed_seconds: float
+    unassigned: dict[str, int]
+    operators: list[OperatorOutcome]
+    sources: list[SourceOutcome]
+    # Operator chosen for every contact of the stream, -1 when it stayed unassigned.
+    assignments: np.ndarray
+
+    @property
+    def unassigned_rate(self) -> float:
+        return sum(self.unassigned.values()) / self.arrivals if self.arrivals else 0.0
+
+    @property
+    def events_per_second(self) -> float:
+        return self.events / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+
+def load_config(session: Session, include_current_load: bool = False) -> SimulationConfig:
+    # The same routing snapshots the allocator uses; current loads only when asked to start from them.
+    source_ids = list(session.execute(select(models.Source.id)).scalars())
+    routings = routing_cache.get_many(session, source_ids)
+    loads: dict[int, int] = {}
+    if include_current_load:
+        query = select(models.Operator.id, models.Operator.active_load).where(models.Operator.active_load > 0)
+        loads = {operator_id: load for operator_id, load in session.execute(query).all()}
+    return SimulationConfig(routings=routings, initial_loads=loads)
+
+
+def observed_rates(session: Session, since: datetime, until: datetime) -> dict[int, float]:
+    # Average hourly arrivals per source over a window, as defaults for synthetic streams.
+    hours = max((until - since).total_seconds() / 3600.0, 1e-9)
+    query = (
+        select(models.Contact.source_id, func.count(models.Contact.id))
+        .where(models.Contact.created_at >= since, models.Contact.created_at < until)
+        .group_by(models.Contact.source_id)
+    )
+    return {source_id: count / hours for source_id, count in session.execute(query).all()}
+
+
+def _handle_times(rng: np.random.Generator, count: int, mean_handle_minutes: Optional[float]) -> np.ndarray:
+    if not mean_handle_minutes:
+        return np.full(count, np.inf)
+    return rng.exponential(mean_handle_minutes * 60.0, count)
+
+
+def poisson_stream(
+    rates_per_hour: dict[int, float],
+    hours: float,
+    mean_handle_minutes: Optional[float] = None,
+    seed: Optional[int] = None,
+) -> ContactStream:
+    # Independent Poisson arrivals per source and exponential handling times.
+    rng = np.random.default_rng(seed)
+    horizon = hours * 3600.0
+    counts = {source_id: rng.poisson(rate * hours) for source_id, rate in rates_per_hour.items()}
+    total = int(sum(counts.values()))
+    sources = np.repeat(np.fromiter(counts, dtype=np.int64, count=len(counts)), list(counts.values()))
+    times = rng.uniform(0.0, horizon, total)
+    order = np.argsort(times, kind="stable")
+    return ContactStream(
+        arrival_times=times[order],
+        source_ids=sources[order],
+        handle_times=_handle_times(rng, total, mean_handle_minutes),
+    )
+
+
+def history_stream(
+    session: Session,
+    since: datetime,
+    mean_handle_minutes: Optional[float] = None,
+    seed: Optional[int] = None,
+) -> ContactStream:
+    # Replays recorded arrivals with their recorded close times. Contacts without closed_at (still
+    # open, or closed before it was stored) get a drawn handling time instead.
+    query = (
+        select(models.Contact.created_at, models.Contact.source_id, models.Contact.closed_at)
+        .where(models.Contact.created_at >= since)
+        .order_by(models.Contact.created_at, models.Contact.id)
+    )
+    rows = session.execute(query).all()
+    rng = np.random.default_rng(seed)
+    if not rows:
+        return ContactStream(np.empty(0), np.empty(0, dtype=np.int64), np.empty(0))
+    start = rows[0][0]
+    times = np.fromiter(((created_at - start).total_seconds() for created_at, _, _ in rows), float, len(rows))
+    sources = np.fromiter((source_id for _, source_id, _ in rows), np.int64, len(rows))
+    handle_times = _handle_times(rng, len(rows), mean_handle_minutes)
+    for index, (created_at, _, closed_at) in enumerate(rows):
+        if closed_at is not None:
+            handle_times[index] = max((closed_at - created_at).total_seconds(), 0.0)
+    return ContactStream(times, sources, handle_times)
+
+
+class _RoutingTables:
+    # Alias tables of all sources concatenated into flat arrays, so every arrival is drawn in one pass.
+    # Sources with another strategy are flagged as sequential: their pick depends on the loads at the
+    # moment of arrival, so their arrivals are always replayed event by event.
+    def __init__(self, config: SimulationConfig):
+        for source_id, routing in config.routings.items():
+            if routing.strategy not in ALLOCATION_STRATEGIES:
+                raise ValueError(f"Source {source_id} uses unknown allocation strategy {routing.strategy!r}")
+        limits: dict[int, int] = {}
+        for routing in config.routings.values():
+            for route in routing.active_routes:
+                limits[route.id] = route.load_limit
+        self.operator_ids = np.array(sorted(limits), dtype=np.int64)
+        self.no_operator = len(self.operator_ids)
+        index = {operator_id: position for position, operator_id in enumerate(self.operator_ids.tolist())}
+
+        self.limits = np.full(self.no_operator + 1, UNLIMITED, dtype=np.int64)
+        for operator_id, limit in limits.items():
+            if limit:
+                self.limits[index[operator_id]] = limit
+        self.initial_loads = np.zeros(self.no_operator + 1, dtype=np.int64)
+        for operator_id, load in config.initial_loads.items():
+            if operator_id in index:
+                self.initial_loads[index[operator_id]] = load
+
+        self.source_ids = np.array(sorted(config.routings), dtype=np.int64)
+        self.offsets = np.zeros(len(self.source_ids), dtype=np.int64)
+        self.counts = np.zeros(len(self.source_ids), dtype=np.int64)
+        self.strategies: list[str] = []
+        self.sequential = np.zeros(len(self.source_ids), dtype=bool)
+        self.routes: list[np.ndarray] = []
+        self.weights: list[np.ndarray] = []
+        probabilities: list[float] = []
+        aliases: list[int] = []
+        operators: list[int] = []
+        for position, source_id in enumerate(self.source_ids.tolist()):
+            routing = config.routings[source_id]
+            route_positions = [index[route.id] for route in routing.active_routes]
+            self.routes.append(np.array(route_positions, dtype=np.int64))
+            self.weights.append(np.array([route.weight for route in routing.active_routes], dtype=np.float64))
+            self.offsets[position] = len(operators)
+            self.counts[position] = len(route_positions)
+            self.strategies.append(routing.strategy)
+            self.sequential[position] = routing.strategy != WEIGHTED_RANDOM and bool(route_positions)
+            if routing.sampler is not None:
+                source_probabilities, source_aliases = routing.sampler.table()
+                probabilities.extend(source_probabilities)
+                aliases.extend(source_aliases)
+                operators.extend(route_positions)
+        self.probabilities = np.array(probabilities, dtype=np.float64)
+        self.aliases = np.array(aliases, dtype=np.int64)
+        self.route_operators = np.array(operators, dtype=np.int64)
+
+    def source_positions(self, source_ids: np.ndarray) -> np.ndarray:
+        if not len(self.source_ids):
+            return np.full(len(source_ids), -1, dtype=np.int64)
+        positions = np.minimum(np.searchsorted(self.source_ids, source_ids), len(self.source_ids) - 1)
+        return np.where(self.source_ids[positions] == source_ids, positions, -1)
+
+    def draw(self, positions: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        # Vectorized alias draw per arrival; arrivals without an active operator get no_operator.
+        chosen = np.full(len(positions), self.no_operator, dtype=np.int64)
+        known = positions >= 0
+        counts = np.where(known, self.counts[np.maximum(positions, 0)], 0)
+        drawable = counts > 0
+        if not drawable.any():
+            return chosen
+        offsets = self.offsets[positions[drawable]]
+        counts = counts[drawable]
+        columns = np.minimum((rng.random(len(counts)) * counts).astype(np.int64), counts - 1)
+        accepted = rng.random(len(counts)) < self.probabilities[offsets + columns]
+        local = np.where(accepted, columns, self.aliases[offsets + columns])
+        chosen[drawable] = self.route_operators[offsets + local]
+        return chosen
+
+    def route_pairs(self) -> list[list[tuple[int, float]]]:
+        return [list(zip(routes.tolist(), weights.tolist())) for routes, weights in zip(self.routes, self.weights)]
+
+
+def _running_loads(operators: np.ndarray, deltas: np.ndarray, loads: np.ndarray) -> np.ndarray:
+    # Load of each event's operator right after the event, via a cumulative sum per operator group.
+    # Small operator indexes are narrowed so the stable sort runs as a radix sort.
+    keys = operators.astype(np.int16) if len(loads) <= np.iinfo(np.int16).max else operators
+    order = np.argsort(keys, kind="stable")
+    grouped = operators[order]
+    sums = np.cumsum(deltas[order])
+    starts = np.flatnonzero(np.r_[True, grouped[1:] != grouped[:-1]])
+    group = np.cumsum(np.r_[True, grouped[1:] != grouped[:-1]]) - 1
+    running = np.empty_like(sums)
+    running[order] = sums - (sums[starts] - deltas[order][starts])[group] + loads[grouped]
+    return running
+
+
+def _merge_events(arrival_times: np.ndarray, handle_times: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Merged arrival/departure process in time order, an arrival before a close at the same instant.
+    # Closes after the last arrival are left open. Both sides are sorted separately and interleaved
+    # with searchsorted, which is cheaper than sorting the concatenation.
+    count = len(arrival_times)
+    if count and np.any(np.diff(arrival_times) < 0):
+        arrival_contacts = np.argsort(arrival_times, kind="stable")
+    else:
+        arrival_contacts = np.arange(count)
+    arrival_times = arrival_times[arrival_contacts]
+    close_times = arrival_times + handle_times[arrival_contacts]
+    closing = np.flatnonzero(close_times <= (arrival_times[-1] if count else 0.0))
+    close_order = closing[np.argsort(close_times[closing])]
+    close_times = close_times[close_order]
+
+    total = count + len(close_order)
+    arrival_slots = np.arange(count) + np.searchsorted(close_times, arrival_times, side="left")
+    close_slots = np.arange(len(close_order)) + np.searchsorted(arrival_times, close_times, side="right")
+    event_times = np.empty(total)
+    event_contacts = np.empty(total, dtype=np.int64)
+    event_arrivals = np.zeros(total, dtype=bool)
+    event_times[arrival_slots] = arrival_times
+    event_times[close_slots] = close_times
+    event_contacts[arrival_slots] = arrival_contacts
+    event_contacts[close_slots] = arrival_contacts[close_order]
+    event_arrivals[arrival_slots] = True
+    return event_times, event_contacts, event_arrivals
+
+
+class _Replay:
+    # Walks the merged arrival/departure events. Vectorized steps accept the longest prefix in which
+    # every tentative operator stays within its limit and no sequential source has an arrival; from
+    # there a short stretch is replayed event by event with the allocator's fallback (weighted choice
+    # among the source's operators with capacity) and the least_loaded and weighted_round_robin
+    # picks, then vectorized steps resume.
+
+    def __init__(
+        self,
+        tables: _RoutingTables,
+        assigned: np.ndarray,
+        positions: np.ndarray,
+        redraws: np.ndarray,
+        sequential: np.ndarray,
+    ):
+        self.tables = tables
+        self.assigned = assigned
+        self.positions = positions
+        self.redraws = redraws
+        self.sequential = sequential
+        # Smooth weighted round-robin counters per source position, as WeightedRoundRobinStrategy keeps them.
+        self.rotations: list[dict[int, float]] = [{} for _ in tables.source_ids]
+        self.loads = tables.initial_loads.copy()
+        self.peaks = self.loads.copy()
+        self.saturated_at = np.where(self.loads >= tables.limits, 0.0, np.nan)
+        self.full = 0
+        self.routes = tables.route_pairs()
+
+    def vector_step(self, times: np.ndarray, contacts: np.ndarray, arrivals: np.ndarray) -> int:
+        operators = self.assigned[contacts]
+        deltas = np.where(arrivals, 1, -1)
+        running = _running_loads(operators, deltas, self.loads)
+        over = np.flatnonzero(arrivals & ((running > self.tables.limits[operators]) | self.sequential[contacts]))
+        accepted = int(over[0]) if len(over) else len(contacts)
+        if not accepted:
+            return 0
+
+        operators, running, arrivals = operators[:accepted], running[:accepted], arrivals[:accepted]
+        self.loads += np.bincount(operators, weights=deltas[:accepted], minlength=len(self.loads)).astype(np.int64)
+        np.maximum.at(self.peaks, operators, running)
+        hit = arrivals & (running == self.tables.limits[operators])
+        if hit.any():
+            saturated, first = np.unique(operators[hit], return_index=True)
+            fresh = np.isnan(self.saturated_at[saturated])
+            self.saturated_at[saturated[fresh]] = times[:accepted][hit][first][fresh]
+        return accepted
+
+    def scalar_step(self, times: np.ndarray, contacts: np.ndarray, arrivals: np.ndarray) -> None:
+        no_operator = self.tables.no_operator
+        loads = self.loads.tolist()
+        peaks = self.peaks.tolist()
+        limits = self.tables.limits.tolist()
+        saturated_at = self.saturated_at.tolist()
+        positions = self.positions[contacts].tolist()
+        redraws = self.redraws[contacts].tolist()
+        operators = self.assigned[contacts].tolist()
+        sequential = self.sequential[contacts].tolist()
+        redirected: dict[int, int] = {}
+
+        for index, (contact, arrival, operator) in enumerate(zip(contacts.tolist(), arrivals.tolist(), operators)):
+            if not arrival:
+                operator = redirected.get(contact, operator)
+                if operator != no_operator:
+                    loads[operator] -= 1
+                continue
+            if operator == no_operator:
+                continue
+            if sequential[index]:
+                operator = redirected[contact] = self._pick(positions[index], loads, limits)
+                if operator == no_operator:
+                    self.full += 1
+                    continue
+            elif loads[operator] >= limits[operator]:
+                operator = no_operator
+                routes = self.routes[positions[index]]
+                total = 0.0
+                for candidate, weight in routes:
+                    if loads[candidate] < limits[candidate]:
+                        total += weight
+                target = redraws[index] * total
+                for candidate, weight in routes:
+                    if loads[candidate] < limits[candidate]:
+                        operator = candidate
+                        target -= weight
+                        if target < 0:
+                            break
+                redirected[contact] = operator
+                if operator == no_operator:
+                    self.full += 1
+                    continue
+            load = loads[operator] = loads[operator] + 1
+            if load > peaks[operator]:
+                peaks[operator] = load
+                if load == limits[operator] and saturated_at[operator] != saturated_at[operator]:
+                    saturated_at[operator] = float(times[index])
+
+        self.loads = np.array(loads, dtype=np.int64)
+        self.peaks = np.array(peaks, dtype=np.int64)
+        self.saturated_at = np.array(saturated_at)
+        if redirected:
+            self.assigned[np.fromiter(redirected, np.int64, len(redirected))] = list(redirected.values())
+
+
+    def _pick(self, position: int, loads: list[int], limits: list[int]) -> int:
+        routes = self.routes[position]
+        if self.tables.strategies[position] == LEAST_LOADED:
+            # Same order as LeastLoadedStrategy: load relative to the limit, unlimited operators first,
+            # then the load and the operator id (positions follow operator ids).
+            best = None
+            for candidate, _ in routes:
+                load, limit = loads[candidate], limits[candidate]
+                if load < limit:
+                    key = (load / limit if limit != UNLIMITED else 0.0, load, candidate)
+                    if best is None or key < best:
+                        best = key
+            return best[2] if best is not None else self.tables.no_operator
+
+        current = self.rotations[position]
+        chosen = None
+        total = 0.0
+        for candidate, weight in routes:
+            if loads[candidate] < limits[candidate]:
+                current[candidate] = current.get(candidate, 0.0) + weight
+                total += weight
+                if chosen is None or current[candidate] > current[chosen]:
+                    chosen = candidate
+        if chosen is None:
+            return self.tables.no_operator
+        current[chosen] -= total
+        return chosen
+
+
+def simulate(
+    config: SimulationConfig,
+    stream: ContactStream,
+    seed: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> SimulationResult:
+    started = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    tables = _RoutingTables(config)
+    arrivals = len(stream)
+
+    positions = tables.source_positions(np.asarray(stream.source_ids, dtype=np.int64))
+    # Tentative operator per contact is its first alias draw; the uniform for a fallback redraw
+    # is drawn up front as well, so results depend only on the seed.
+    assigned = tables.draw(positions, rng)
+    redraws = rng.random(arrivals)
+    no_active = int(np.count_nonzero(assigned == tables.no_operator))
+    sequential = tables.sequential[np.maximum(positions, 0)] & (positions >= 0)
+
+    event_times, event_contacts, event_arrivals = _merge_events(
+        np.asarray(stream.arrival_times, dtype=np.float64), np.asarray(stream.handle_times, dtype=np.float64)
+    )
+
+    replay = _Replay(tables, assigned, positions, redraws, sequential)
+    events = len(event_times)
+    position = 0
+    chunk = chunk_size
+    while position < events:
+        window = slice(position, min(position + chunk, events))
+        accepted = replay.vector_step(event_times[window], event_contacts[window], event_arrivals[window])
+        position += accepted
+        if position == window.stop:
+            chunk = min(chunk_size, chunk * 2)
+            continue
+        window = slice(position, min(position + SCALAR_STRETCH, events))
+        replay.scalar_step(event_times[window], event_contacts[window], event_arrivals[window])
+        position = window.stop
+        if accepted < chunk // 4:
+            chunk = max(MIN_CHUNK_SIZE, chunk // 2)
+
+    loads, peaks, saturated_at = replay.loads, replay.peaks, replay.saturated_at
+    unassigned_mask = assigned == tables.no_operator
+    assigned_counts = np.bincount(assigned, minlength=tables.no_operator + 1)
+    source_arrivals = np.bincount(positions[positions >= 0], minlength=len(tables.source_ids))
+    source_unassigned = np.bincount(positions[unassigned_mask & (positions >= 0)], minlength=len(tables.source_ids))
+    operator_ids = np.append(tables.operator_ids, -1)
+
+    return SimulationResult(
+        arrivals=arrivals,
+        events=events,
+        elapsed_seconds=time.perf_counter() - started,
+        unassigned={OUTCOME_LABELS[NO_ACTIVE_OPERATORS]: no_active, OUTCOME_LABELS[ALL_OPERATORS_FULL]: replay.full},
+        operators=[
+            OperatorOutcome(
+                operator_id=int(operator_id),
+                load_limit=0 if tables.limits[index] == UNLIMITED else int(tables.limits[index]),
+                assigned=int(assigned_counts[index]),
+                peak_load=int(peaks[index]),
+                final_load=int(loads[index]),
+                saturated_at=None if np.isnan(saturated_at[index]) else float(saturated_at[index]),
+            )
+            for index, operator_id in enumerate(tables.operator_ids.tolist())
+        ],
+        sources=[
+            SourceOutcome(
+                source_id=int(source_id),
+                arrivals=int(source_arrivals[index]),
+                unassigned=int(source_unassigned[index]),
+            )
+            for index, source_id in enumerate(tables.source_ids.tolist())
+        ],
+        assignments=operator_ids[assigned],
+    )
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+from collections import Counter
+from datetime import datetime
+from typing import Iterable, Optional, Sequence
+
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.orm import Session
+
+from .. import models
+from .allocation import reserve_operator_capacity
+from .loads import ACTIVE_STATUS, track_load_changes
+from .pending import dequeue_pending, dispatch_pending
+from .rollups import record_contacts, utc_now
+
+CLOSED_STATUS = "closed"
+CONTACT_STATUSES = (ACTIVE_STATUS, CLOSED_STATUS)
+
+
+class ContactNotFound(Exception):
+    pass
+
+
+class OperatorUnavailable(Exception):
+    pass
+
+
+class ContactChangedConcurrently(Exception):
+    pass
+
+
+def release_operator_loads(session: Session, operator_ids: Iterable[Optional[int]]) -> None:
+    released = Counter(operator_id for operator_id in operator_ids if operator_id is not None)
+    if not released:
+        return
+    operators = models.Operator.__table__
+    session.connection().execute(
+        update(operators)
+        .where(operators.c.id == bindparam("operator_id"))
+        .values(active_load=operators.c.active_load - bindparam("released")),
+        [{"operator_id": operator_id, "released": count} for operator_id, count in released.items()],
+    )
+    track_load_changes(session, {operator_id: -count for operator_id, count in released.items()})
+
+
+def close_contacts(
+    session: Session,
+    ids: Optional[Sequence[int]] = None,
+    operator_id: Optional[int] = None,
+    source_id: Optional[int] = None,
+    created_before: Optional[datetime] = None,
+) -> int:
+    # One set-based UPDATE for any selection. Only active contacts are touched, and RETURNING yields
+    # the operators whose load drops, so the counters change by exactly the number of contacts that
+    # were closed. Explicit ids go into a single IN list: the API caps them at 10000, below the bound
+    # parameter limits of SQLite (32766) and PostgreSQL (65535).
+    closed_at = utc_now()
+    statement = (
+        update(models.Contact)
+        .where(models.Contact.status == ACTIVE_STATUS)
+        .values(status=CLOSED_STATUS, closed_at=closed_at)
+        .returning(models.Contact.id, models.Contact.source_id, models.Contact.operator_id)
+        .execution_options(synchronize_session=False)
+    )
+    if operator_id is not None:
+        statement = statement.where(models.Contact.operator_id == operator_id)
+    if source_id is not None:
+        statement = statement.where(models.Contact.source_id == source_id)
+    if created_before is not None:
+        statement = statement.where(models.Contact.created_at < created_before)
+
+    if ids is not None:
+        statement = statement.where(models.Contact.id.in_(sorted(set(ids))))
+    closed = session.execute(statement).all()
+
+    # Unassigned contacts closed while waiting leave the queue; freed slots are backfilled from it
+    # in the same transaction, so a committed close never leaves capacity idle next to waiting contacts.
+    dequeue_pending(session, [contact_id for contact_id, _, operator_id in closed if operator_id is None])
+    released = [operator_id for _, _, operator_id in closed if operator_id is not None]
+    release_operator_loads(session, released)
+    record_contacts(session, closed=[(closed_at, source_id, operator_id) for _, source_id, operator_id in closed])
+    if released:
+        dispatch_pending(session, operator_ids=released)
+    return len(closed)
+
+
+def transition_contact(
+    session: Session,
+    contact_id: int,
+    status: Optional[str] = None,
+    operator_id: Optional[int] = None,
+    reassign: bool = False,
+) -> None:
+    current = session.execute(
+        select(models.Contact.status, models.Contact.source_id, models.Contact.operator_id).where(
+            models.Contact.id == contact_id
+        )
+    ).one_or_none()
+    if current is None:
+        raise ContactNotFound(contact_id)
+
+    new_status = status or current.status
+    new_operator_id = operator_id if reassign else current.operator_id
+    if (new_status, new_operator_id) == (current.status, current.operator_id):
+        return
+
+    counted = current.status == ACTIVE_STATUS and current.operator_id is not None
+    will_count = new_status == ACTIVE_STATUS and new_operator_id is not None
+    keeps_slot = counted and will_count and new_operator_id == current.operator_id
+    if will_count and not keeps_slot and not reserve_operator_capacity(session, new_operator_id):
+        raise OperatorUnavailable(new_operator_id)
+
+    # Reopening clears closed_at; reassigning an already closed contact keeps it.
+    closes = current.status == ACTIVE_STATUS and new_status == CLOSED_STATUS
+    closed_at = utc_now() if closes else None if new_status == ACTIVE_STATUS else models.Contact.closed_at
+
+    # Compare-and-set on the state read above, so a concurrent transition cannot release the same slot twice.
+    result = session.execute(
+        update(models.Contact)
+        .where(
+            models.Contact.id == contact_id,
+            models.Contact.status == current.status,
+            models.Contact.operator_id.is_not_distinct_from(current.operator_id),
+        )
+        .values(status=new_status, operator_id=new_operator_id, closed_at=closed_at)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        raise ContactChangedConcurrently(contact_id)
+    if closes:
+        record_contacts(session, closed=[(closed_at, current.source_id, new_operator_id)])
+
+    # Manual unassigning or reopening does not enqueue: the contact was taken out of routing on purpose.
+    if current.status == ACTIVE_STATUS and current.operator_id is None:
+        dequeue_pending(session, [contact_id])
+    if counted and not keeps_slot:
+        release_operator_loads(session, [current.operator_id])
+        dispatch_pending(session, operator_ids=[current.operator_id])
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+
+from harness import git_revision
+
+from app.services.routing import OperatorRoute, build_routing
+from app.services.simulation import SimulationConfig, poisson_stream, simulate
+
+# Mean handling time per scenario: short handling keeps limited operators below their limits,
+# long handling saturates them and exercises the event-by-event fallback.
+SCENARIOS = {"relaxed": 2.0, "saturated": 60.0}
+
+
+def _config(operators: int, sources: int, operators_per_source: int, seed: int) -> SimulationConfig:
+    rng = random.Random(seed)
+    routes = [
+        OperatorRoute(
+            id=index,
+            name=f"Operator {index}",
+            weight=rng.randint(1, 100),
+            active=True,
+            load_limit=rng.choice([0, 100, 200, 400]),
+        )
+        for index in range(1, operators + 1)
+    ]
+    return SimulationConfig(
+        routings={
+            source_id: build_routing(source_id, rng.sample(routes, min(operators_per_source, operators)), 0)
+            for source_id in range(1, sources + 1)
+        }
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Measure the offline allocation simulator throughput")
+    parser.add_argument("--operators", type=int, default=50)
+    parser.add_argument("--sources", type=int, default=10)
+    parser.add_argument("--operators-per-source", type=int, default=10)
+    parser.add_argument("--contacts", type=int, default=1_000_000, help="Arrivals per scenario")
+    parser.add_argument("--hours", type=float, default=24.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--min-events-per-second", type=float, help="Fail when the relaxed scenario is slower")
+    args = parser.parse_args()
+
+    config = _config(args.operators, args.sources, args.operators_per_source, args.seed)
+    rate = args.contacts / args.hours / args.sources
+    results = []
+    for scenario in args.scenarios:
+        stream = poisson_stream(
+            dict.fromkeys(config.routings, rate), args.hours, mean_handle_minutes=SCENARIOS[scenario], seed=args.seed
+        )
+        result = simulate(config, stream, seed=args.seed)
+        results.append(
+            {
+                "scenario": scenario,
+                "arrivals": result.arrivals,
+                "events": result.events,
+                "seconds": round(result.elapsed_seconds, 3),
+                "events_per_second": round(result.events_per_second),
+                "unassigned_rate": round(result.unassigned_rate, 4),
+                "saturated_operators": sum(operator.saturated_at is not None for operator in result.operators),
+            }
+        )
+
+    print(json.dumps({"revision": git_revision(), "results": results}, indent=2))
+    relaxed = next((item for item in results if item["scenario"] == "relaxed"), None)
+    if args.min_events_per_second and relaxed and relaxed["events_per_second"] < args.min_events_per_second:
+        print(f"relaxed scenario below {args.min_events_per_second:.0f} events/s", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
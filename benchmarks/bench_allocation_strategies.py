@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import timeit
+
+from harness import git_revision
+
+from app.services.allocation import STRATEGIES, OperatorCandidate
+from app.services.loads import LeastLoadedIndex
+from app.services.routing import LEAST_LOADED, OperatorRoute, build_routing
+
+
+def _routes(size: int, rng: random.Random, load_limit: int) -> list[OperatorRoute]:
+    return [
+        OperatorRoute(id=index, name=f"Operator {index}", weight=rng.randint(1, 10), active=True, load_limit=load_limit)
+        for index in range(1, size + 1)
+    ]
+
+
+def pick_cost(sizes: list[int], picks: int, seed: int) -> list[dict]:
+    # Cost of one least-loaded pick plus the load update it causes: indexed heap versus a scan.
+    results = []
+    for size in sizes:
+        rng = random.Random(seed)
+        routing = build_routing(1, _routes(size, rng, load_limit=1_000_000), float("inf"), LEAST_LOADED)
+        loads = {route.id: rng.randrange(1000) for route in routing.active_routes}
+        index = LeastLoadedIndex()
+        index.load(routing, loads)
+        limits = {route.id: route.load_limit for route in routing.active_routes}
+
+        def heap_pick() -> None:
+            route = index.best(None, routing)
+            index.apply([(route.id, 1)])
+
+        def scan_pick() -> None:
+            operator_id = min(loads, key=lambda key: (loads[key] / limits[key], loads[key], key))
+            loads[operator_id] += 1
+
+        heap = timeit.timeit(heap_pick, number=picks)
+        scan = timeit.timeit(scan_pick, number=picks)
+        results.append(
+            {
+                "operators": size,
+                "heap_us_per_pick": round(heap / picks * 1e6, 3),
+                "scan_us_per_pick": round(scan / picks * 1e6, 3),
+                "speedup": round(scan / heap, 1),
+            }
+        )
+    return results
+
+
+def fairness(operators: int, load_limit: int, burst: int, close_probability: float, seed: int) -> list[dict]:
+    # A burst of arrivals with random closes; the spread of utilization across operators is the
+    # queue imbalance each strategy leaves behind.
+    results = []
+    for name, strategy in STRATEGIES.items():
+        rng = random.Random(seed)
+        routing = build_routing(1, _routes(operators, rng, load_limit), float("inf"), name)
+        loads = {route.id: 0 for route in routing.active_routes}
+        spreads = []
+        unassigned = 0
+        for _ in range(burst):
+            candidates = [
+                OperatorCandidate(
+                    operator_id=route.id, weight=route.weight, load=loads[route.id], load_limit=load_limit
+                )
+                for route in routing.active_routes
+            ]
+            chosen = strategy.pick(routing, candidates, rng)
+            if chosen is None:
+                unassigned += 1
+            else:
+                loads[chosen.operator_id] += 1
+            if rng.random() < close_probability:
+                busy = [operator_id for operator_id, load in loads.items() if load]
+                if busy:
+                    loads[rng.choice(busy)] -= 1
+            utilization = [load / load_limit for load in loads.values()]
+            spreads.append(max(utilization) - min(utilization))
+        strategy.clear()
+        results.append(
+            {
+                "strategy": name,
+                "mean_utilization_spread": round(statistics.mean(spreads), 3),
+                "max_utilization_spread": round(max(spreads), 3),
+                "unassigned": unassigned,
+            }
+        )
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare allocation strategies: pick cost and queue fairness")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--picks", type=int, default=20_000)
+    parser.add_argument("--operators", type=int, default=20)
+    parser.add_argument("--load-limit", type=int, default=50)
+    parser.add_argument("--burst", type=int, default=1_500)
+    parser.add_argument("--close-probability", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    report = {
+        "revision": git_revision(),
+        "least_loaded_pick_cost": pick_cost(args.sizes, args.picks, args.seed),
+        "fairness": fairness(args.operators, args.load_limit, args.burst, args.close_probability, args.seed),
+    }
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
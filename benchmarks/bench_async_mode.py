@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from harness import percentile
+
+
+async def _seed(client, mode: str, operators: int) -> int:
+    operator_ids = []
+    for index in range(operators):
+        response = await client.post("/operators/", json={"name": f"{mode} operator {index}", "load_limit": 0})
+        operator_ids.append(response.json()["id"])
+    assignments = [{"operator_id": operator_id, "weight": 1} for operator_id in operator_ids]
+    response = await client.post("/sources/", json={"name": f"{mode} source", "assignments": assignments})
+    return response.json()["id"]
+
+
+async def _run_level(client, mode: str, source_id: int, concurrency: int, requests: int) -> dict:
+    latencies: list[float] = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker() -> None:
+        nonlocal errors
+        for index in counter:
+            started = time.perf_counter()
+            if index % 2:
+                response = await client.get("/contacts/", params={"limit": 50, "source_id": source_id})
+            else:
+                payload = {"lead_external_id": f"{mode}-{concurrency}-{index}", "source_id": source_id}
+                response = await client.post("/contacts/", json=payload)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "concurrency": concurrency,
+        "requests_per_second": round(requests / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "errors": errors,
+    }
+
+
+async def _run_mode(mode: str, levels: list[int], requests: int, operators: int) -> list[dict]:
+    import httpx
+
+    from app.database import engine, get_async_engine
+    from app.main import create_app
+    from app.schema import migrate
+
+    migrate(engine)
+    # Failed requests (for example "database is locked") are counted as errors instead of aborting the run.
+    transport = httpx.ASGITransport(app=create_app(db_mode=mode), raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        source_id = await _seed(client, mode, operators)
+        results = [await _run_level(client, mode, source_id, level, requests) for level in levels]
+    if mode == "async":
+        await get_async_engine().dispose()
+    return results
+
+
+def _max_concurrency(results: list[dict], p99_budget_ms: float) -> int:
+    passing = [item["concurrency"] for item in results if not item["errors"] and item["p99_ms"] <= p99_budget_ms]
+    return max(passing, default=0)
+
+
+def run(levels: list[int], requests: int, operators: int, p99_budget_ms: float) -> dict:
+    report = {"requests_per_level": requests, "p99_budget_ms": p99_budget_ms}
+    for mode in ("sync", "async"):
+        results = asyncio.run(_run_mode(mode, levels, requests, operators))
+        report[mode] = {"levels": results, "max_concurrency": _max_concurrency(results, p99_budget_ms)}
+    return report
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare the sync and async request paths on file SQLite")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 8, 32, 128, 256])
+    parser.add_argument("--requests", type=int, default=1000, help="Requests per concurrency level")
+    parser.add_argument("--operators", type=int, default=10)
+    parser.add_argument("--p99-budget-ms", type=float, default=250.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["DATABASE_URL"] = f"sqlite:///{Path(directory) / 'bench.db'}"
+        result = run(args.levels, args.requests, args.operators, args.p99_budget_ms)
+
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+
+def _seed(client, operators: int) -> int:
+    operator_ids = [
+        client.post("/operators/", json={"name": f"Operator {index}", "load_limit": 0}).json()["id"]
+        for index in range(operators)
+    ]
+    assignments = [{"operator_id": operator_id, "weight": index + 1} for index, operator_id in enumerate(operator_ids)]
+    response = client.post("/sources/", json={"name": "Benchmark source", "assignments": assignments})
+    return response.json()["id"]
+
+
+def _payloads(source_id: int, prefix: str, count: int) -> list[dict]:
+    return [
+        {"lead_external_id": f"{prefix}-{index % (count // 2 or 1)}", "source_id": source_id, "message": "hello"}
+        for index in range(count)
+    ]
+
+
+def run(items: int, operators: int) -> dict:
+    from fastapi.testclient import TestClient
+
+    from app.database import engine
+    from app.main import create_app
+    from app.schema import migrate
+
+    migrate(engine)
+    with TestClient(create_app()) as client:
+        source_id = _seed(client, operators)
+
+        started = time.perf_counter()
+        for payload in _payloads(source_id, "single", items):
+            assert client.post("/contacts/", json=payload).status_code == 201
+        single_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        response = client.post("/contacts/bulk", json={"items": _payloads(source_id, "bulk", items)})
+        bulk_seconds = time.perf_counter() - started
+        assert response.status_code == 200 and response.json()["created"] == items
+
+    return {
+        "items": items,
+        "operators": operators,
+        "single_seconds": round(single_seconds, 4),
+        "single_items_per_second": round(items / single_seconds, 1),
+        "bulk_seconds": round(bulk_seconds, 4),
+        "bulk_items_per_second": round(items / bulk_seconds, 1),
+        "speedup": round(single_seconds / bulk_seconds, 1),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare POST /contacts/ against POST /contacts/bulk on file SQLite")
+    parser.add_argument("--items", type=int, default=2000)
+    parser.add_argument("--operators", type=int, default=10)
+    parser.add_argument("--min-speedup", type=float, default=None, help="Exit with code 1 below this speedup")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["DATABASE_URL"] = f"sqlite:///{Path(directory) / 'bench.db'}"
+        result = run(args.items, args.operators)
+
+    print(json.dumps(result, indent=2))
+    if args.min_speedup is not None and result["speedup"] < args.min_speedup:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+
+from harness import Dataset, git_revision, latency_summary, seed_dataset
+
+SCENARIOS = ("create_contact", "list_operators", "list_contacts")
+
+
+def _request(client, scenario: str, index: int, rng: random.Random, source_ids: list[int], dataset: Dataset):
+    if scenario == "create_contact":
+        # Half returning leads from the seeded history, half first-time leads.
+        if index % 2:
+            external_id = f"seed-lead-{rng.randrange(dataset.leads)}"
+        else:
+            external_id = f"bench-lead-{time.monotonic_ns()}-{index}"
+        return client.post("/contacts/", json={"lead_external_id": external_id, "source_id": rng.choice(source_ids)})
+    if scenario == "list_operators":
+        return client.get("/operators/")
+    params = {"limit": 50}
+    if index % 2:
+        params["source_id"] = rng.choice(source_ids)
+    return client.get("/contacts/", params=params)
+
+
+async def _run_level(client, scenario: str, concurrency: int, requests: int, source_ids: list[int], dataset: Dataset):
+    rng = random.Random(concurrency)
+    latencies: list[float] = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker() -> None:
+        nonlocal errors
+        for index in counter:
+            started = time.perf_counter()
+            response = await _request(client, scenario, index, rng, source_ids, dataset)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return {"concurrency": concurrency, **latency_summary(latencies, time.perf_counter() - started, errors)}
+
+
+async def _drive(url: Optional[str], scenarios: list[str], levels: list[int], requests: int, dataset: Dataset) -> dict:
+    import httpx
+
+    if url is None:
+        from app.main import create_app
+
+        # In-process ASGI: no network stack in the measurement, failures are counted instead of raised.
+        transport = httpx.ASGITransport(app=create_app(), raise_app_exceptions=False)
+        client = httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None)
+    else:
+        client = httpx.AsyncClient(base_url=url, timeout=None, limits=httpx.Limits(max_connections=max(levels)))
+
+    async with client:
+        source_ids = [source["id"] for source in (await client.get("/sources/")).json()]
+        results = {}
+        for scenario in scenarios:
+            await _run_level(client, scenario, 1, min(requests, 20), source_ids, dataset)
+            results[scenario] = [
+                await _run_level(client, scenario, level, requests, source_ids, dataset) for level in levels
+            ]
+    return results
+
+
+def _regressions(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    found = []
+    for scenario, levels in report["results"].items():
+        previous = {item["concurrency"]: item for item in baseline.get("results", {}).get(scenario, [])}
+        for item in levels:
+            before = previous.get(item["concurrency"])
+            if before is None:
+                continue
+            if item["p99_ms"] > before["p99_ms"] * (1 + tolerance):
+                found.append(f"{scenario}@{item['concurrency']}: p99 {before['p99_ms']} -> {item['p99_ms']} ms")
+            if item["requests_per_second"] < before["requests_per_second"] * (1 - tolerance):
+                found.append(
+                    f"{scenario}@{item['concurrency']}: "
+                    f"{before['requests_per_second']} -> {item['requests_per_second']} rps"
+                )
+    return found
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Seed a dataset and load-test the contact ingestion path")
+    parser.add_argument("--database", type=Path, help="SQLite file; a temporary one is used when omitted")
+    parser.add_argument("--reuse", action="store_true", help="Skip seeding when the database file already exists")
+    parser.add_argument("--url", help="Drive a running server (e.g. http://127.0.0.1:8000) instead of in-process ASGI")
+    parser.add_argument("--operators", type=int, default=Dataset.operators)
+    parser.add_argument("--sources", type=int, default=Dataset.sources)
+    parser.add_argument("--operators-per-source", type=int, default=Dataset.operators_per_source)
+    parser.add_argument("--leads", type=int, default=Dataset.leads)
+    parser.add_argument("--contacts", type=int, default=Dataset.contacts)
+    parser.add_argument("--seed", type=int, default=Dataset.seed)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=500, help="Requests per scenario and concurrency level")
+    parser.add_argument("--output", type=Path, help="Also write the JSON report to this file")
+    parser.add_argument("--baseline", type=Path, help="Earlier report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression vs the baseline")
+    args = parser.parse_args()
+
+    dataset = Dataset(
+        operators=args.operators,
+        sources=args.sources,
+        operators_per_source=args.operators_per_source,
+        leads=args.leads,
+        contacts=args.contacts,
+        seed=args.seed,
+    )
+
+    with tempfile.TemporaryDirectory() as directory:
+        database = args.database or Path(directory) / "bench.db"
+        seeded = not (args.reuse and database.exists())
+        if seeded and database.exists():
+            database.unlink()
+        os.environ["DATABASE_URL"] = f"sqlite:///{database}"
+
+        from app.database import engine
+        from app.schema import migrate
+
+        migrate(engine)
+        seed_info = seed_dataset(engine, dataset) if seeded else {"reused": str(database)}
+        results = asyncio.run(_drive(args.url, args.scenarios, args.levels, args.requests, dataset))
+        engine.dispose()
+
+    report = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "target": args.url or "asgi",
+        "dataset": seed_info,
+        "results": results,
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+
+    if args.baseline:
+        regressions = _regressions(report, json.loads(args.baseline.read_text()), args.tolerance)
+        for line in regressions:
+            print(f"regression: {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from harness import Dataset, git_revision, seed_dataset
+
+ENDPOINTS = ("operators", "sources", "contacts")
+
+
+def _legacy_router():
+    # The list endpoints as they were before the projection path: ORM entities or rows turned into
+    # pydantic models one by one, then validated and encoded again through response_model. FastAPI
+    # resolves these local annotations at definition time, hence no postponed annotations in this file.
+    from fastapi import APIRouter, Depends, Query, Response
+    from sqlalchemy.orm import Session, joinedload
+
+    from app import models, schemas
+    from app.api.contacts import ContactFilters, _contact_rows_query
+    from app.api.deps import DatabaseRunner, get_db
+    from app.api.operators import _to_operator_read
+    from app.api.pagination import MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, encode_cursor, keyset_before
+    from app.api.sources import _to_source_read
+
+    router = APIRouter()
+
+    def list_operators(db: Session) -> List[schemas.OperatorRead]:
+        return [_to_operator_read(operator) for operator in db.query(models.Operator).order_by(models.Operator.id)]
+
+    def list_sources(db: Session) -> List[schemas.SourceRead]:
+        sources = (
+            db.query(models.Source)
+            .options(joinedload(models.Source.assignments).joinedload(models.SourceOperatorAssignment.operator))
+            .order_by(models.Source.id)
+            .all()
+        )
+        return [_to_source_read(source) for source in sources]
+
+    def list_contacts(db: Session, response: Response, limit: int, cursor: Optional[str], filters: ContactFilters):
+        query = filters.apply(_contact_rows_query()).limit(limit + 1)
+        if cursor is not None:
+            query = query.where(keyset_before(models.Contact.created_at, models.Contact.id, cursor))
+        rows = db.execute(query).all()
+        if len(rows) > limit:
+            rows = rows[:limit]
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor(rows[-1].created_at, rows[-1].id)
+        return [schemas.ContactWithLeadRead(**row._mapping) for row in rows]
+
+    @router.get("/operators/", response_model=List[schemas.OperatorRead])
+    async def legacy_operators(db: DatabaseRunner = Depends(get_db)):
+        return await db.run(list_operators)
+
+    @router.get("/sources/", response_model=List[schemas.SourceRead])
+    async def legacy_sources(db: DatabaseRunner = Depends(get_db)):
+        return await db.run(list_sources)
+
+    @router.get("/contacts/", response_model=List[schemas.ContactWithLeadRead])
+    async def legacy_contacts(
+        response: Response,
+        limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = None,
+        filters: ContactFilters = Depends(),
+        db: DatabaseRunner = Depends(get_db),
+    ):
+        return await db.run(list_contacts, response, limit, cursor, filters)
+
+    return router
+
+
+def _fetch(client, prefix: str, endpoint: str) -> list[bytes]:
+    # Contacts are paged with the maximum page size until the cursor runs out, so every endpoint
+    # serializes the whole table.
+    if endpoint != "contacts":
+        return [client.get(f"{prefix}/{endpoint}/").content]
+    from app.api.pagination import MAX_PAGE_SIZE, NEXT_CURSOR_HEADER
+
+    bodies, cursor = [], None
+    while True:
+        params = {"limit": MAX_PAGE_SIZE, **({"cursor": cursor} if cursor else {})}
+        response = client.get(f"{prefix}/contacts/", params=params)
+        bodies.append(response.content)
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if cursor is None:
+            return bodies
+
+
+def _measure(client, prefix: str, endpoint: str, repeat: int) -> tuple[dict, list]:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        bodies = _fetch(client, prefix, endpoint)
+        timings.append(time.perf_counter() - started)
+    # Decoded outside the timed loop; only used to check both paths return the same documents.
+    items = [item for body in bodies for item in json.loads(body)]
+    return {
+        "rows": len(items),
+        "requests": len(bodies),
+        "bytes": sum(len(body) for body in bodies),
+        "best_ms": round(min(timings) * 1000, 1),
+        "median_ms": round(statistics.median(timings) * 1000, 1),
+        "rows_per_second": round(len(items) / min(timings)),
+    }, items
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare list endpoint serialization before/after column projection")
+    parser.add_argument("--database", type=Path, help="SQLite file; a temporary one is used when omitted")
+    parser.add_argument("--reuse", action="store_true", help="Skip seeding when the database file already exists")
+    parser.add_argument("--rows", type=int, default=100_000, help="Operators, contacts and source assignments")
+    parser.add_argument("--operators-per-source", type=int, default=100)
+    parser.add_argument("--endpoints", nargs="+", choices=ENDPOINTS, default=list(ENDPOINTS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", type=Path, help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    dataset = Dataset(
+        operators=args.rows,
+        sources=max(1, args.rows // args.operators_per_source),
+        operators_per_source=args.operators_per_source,
+        leads=max(1, args.rows // 5),
+        contacts=args.rows,
+    )
+
+    with tempfile.TemporaryDirectory() as directory:
+        database = args.database or Path(directory) / "bench.db"
+        seeded = not (args.reuse and database.exists())
+        if seeded and database.exists():
+            database.unlink()
+        os.environ["DATABASE_URL"] = f"sqlite:///{database}"
+
+        from fastapi.testclient import TestClient
+
+        from app.database import engine
+        from app.main import create_app
+        from app.schema import migrate
+
+        migrate(engine)
+        app = create_app()
+        app.include_router(_legacy_router(), prefix="/legacy")
+        seed_info = seed_dataset(engine, dataset) if seeded else {"reused": str(database)}
+
+        results = {}
+        with TestClient(app) as client:
+            for endpoint in args.endpoints:
+                before, legacy_items = _measure(client, "/legacy", endpoint, args.repeat)
+                after, items = _measure(client, "", endpoint, args.repeat)
+                if items != legacy_items:
+                    print(f"{endpoint}: projected output differs from the model-based output", file=sys.stderr)
+                    return 1
+                results[endpoint] = {
+                    "before": before,
+                    "after": after,
+                    "speedup": round(before["best_ms"] / after["best_ms"], 2),
+                }
+        engine.dispose()
+
+    report = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "dataset": seed_info,
+        "results": results,
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import timeit
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.services.routing import OperatorRoute, build_routing  # noqa: E402
+
+
+def _legacy_pick(routes: tuple[OperatorRoute, ...], loads: dict[int, int], rng: random.Random) -> OperatorRoute:
+    # Selection as it was before alias tables: rebuild the eligible list and weights on every call.
+    eligible = []
+    for route in routes:
+        limit = route.load_limit or float("inf")
+        if loads.get(route.id, 0) < limit:
+            eligible.append((route, route.weight))
+    operators, weights = zip(*eligible)
+    return rng.choices(operators, weights=weights, k=1)[0]
+
+
+def run(sizes: list[int], draws: int, seed: int) -> list[dict]:
+    results = []
+    for size in sizes:
+        rng = random.Random(seed)
+        routes = [
+            OperatorRoute(id=index, name=f"Operator {index}", weight=rng.randint(1, 100), active=True, load_limit=0)
+            for index in range(size)
+        ]
+        routing = build_routing(1, routes, expires_at=float("inf"))
+        loads = {route.id: 0 for route in routes}
+
+        legacy = timeit.timeit(lambda: _legacy_pick(routing.active_routes, loads, rng), number=draws)
+        alias = timeit.timeit(lambda: routing.active_routes[routing.sampler.sample(rng)], number=draws)
+        results.append(
+            {
+                "operators": size,
+                "draws": draws,
+                "legacy_us_per_draw": round(legacy / draws * 1e6, 3),
+                "alias_us_per_draw": round(alias / draws * 1e6, 3),
+                "speedup": round(legacy / alias, 1),
+            }
+        )
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare per-request weighted selection with alias-table sampling")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--draws", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.sizes, args.draws, args.seed), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from harness import percentile
+
+
+def _build_engine(profile: str, url: str):
+    from sqlalchemy import create_engine
+
+    from app.database import create_db_engine
+
+    if profile == "default":
+        # What app/database.py used before the tuning profile: rollback journal, 5s busy handler.
+        return create_engine(url, connect_args={"check_same_thread": False})
+    return create_db_engine(url)
+
+
+def run_profile(profile: str, directory: Path, workers: int, requests: int, operators: int) -> dict:
+    from fastapi.testclient import TestClient
+    from sqlalchemy.orm import sessionmaker
+
+    from app.database import get_session
+    from app.main import create_app
+    from app.schema import migrate
+    from app.services.leads import lead_cache
+    from app.services.routing import routing_cache
+
+    engine = _build_engine(profile, f"sqlite:///{directory / f'{profile}.db'}")
+    migrate(engine)
+    routing_cache.clear()
+    lead_cache.clear()
+    session_factory = sessionmaker(bind=engine, autocommit=False, autoflush=False, expire_on_commit=False)
+
+    def override_get_session():
+        with session_factory() as session:
+            yield session
+
+    app = create_app(schema_bind=engine)
+    app.dependency_overrides[get_session] = override_get_session
+    latencies: list[float] = []
+    errors = 0
+
+    with TestClient(app, raise_server_exceptions=False) as client:
+        operator_ids = [
+            client.post("/operators/", json={"name": f"Operator {index}", "load_limit": 0}).json()["id"]
+            for index in range(operators)
+        ]
+        assignments = [{"operator_id": operator_id, "weight": 1} for operator_id in operator_ids]
+        source_id = client.post("/sources/", json={"name": "Writes", "assignments": assignments}).json()["id"]
+
+        def send(index: int) -> None:
+            nonlocal errors
+            started = time.perf_counter()
+            response = client.post("/contacts/", json={"lead_external_id": f"lead-{index}", "source_id": source_id})
+            latencies.append((time.perf_counter() - started) * 1000)
+            if response.status_code != 201:
+                errors += 1
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(send, range(requests)))
+        elapsed = time.perf_counter() - started
+
+    engine.dispose()
+    return {
+        "profile": profile,
+        "requests_per_second": round(requests / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "errors": errors,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Concurrent POST /contacts/ on file SQLite: default vs tuned engine")
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--operators", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        results = [
+            run_profile(profile, Path(directory), args.workers, args.requests, args.operators)
+            for profile in ("default", "tuned")
+        ]
+
+    default, tuned = results
+    print(
+        json.dumps(
+            {
+                "workers": args.workers,
+                "requests": args.requests,
+                "results": results,
+                "speedup": round(tuned["requests_per_second"] / default["requests_per_second"], 2),
+            },
+            indent=2,
+        )
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
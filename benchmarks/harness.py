@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import random
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Optional
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+SEED_BATCH_SIZE = 50_000
+
+
+def percentile(values: list[float], percent: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+
+def latency_summary(latencies_ms: list[float], elapsed_seconds: float, errors: int) -> dict:
+    return {
+        "requests": len(latencies_ms),
+        "errors": errors,
+        "requests_per_second": round(len(latencies_ms) / elapsed_seconds, 1),
+        "p50_ms": round(statistics.median(latencies_ms), 2),
+        "p95_ms": round(percentile(latencies_ms, 95), 2),
+        "p99_ms": round(percentile(latencies_ms, 99), 2),
+    }
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+@dataclass(frozen=True)
+class Dataset:
+    operators: int = 50
+    sources: int = 10
+    operators_per_source: int = 10
+    leads: int = 20_000
+    contacts: int = 100_000
+    # Share of historical contacts that are still active; the rest are closed.
+    active_share: float = 0.05
+    history_days: int = 90
+    seed: int = 1
+
+
+def seed_dataset(engine, dataset: Dataset) -> dict:
+    # Core executemany inserts in large batches; ORM objects would dominate the time at millions of rows.
+    from sqlalchemy import insert
+    from sqlalchemy.orm import Session
+
+    from app import models
+    from app.services.loads import reconcile_operator_loads
+
+    rng = random.Random(dataset.seed)
+    started = time.perf_counter()
+    now = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+
+    with engine.begin() as connection:
+        connection.execute(
+            insert(models.Operator.__table__),
+            [
+                {"name": f"Seed operator {index}", "active": True, "load_limit": 0, "active_load": 0}
+                for index in range(dataset.operators)
+            ],
+        )
+        connection.execute(
+            insert(models.Source.__table__),
+            [{"name": f"Seed source {index}", "description": None} for index in range(dataset.sources)],
+        )
+        operator_ids = [row[0] for row in connection.exec_driver_sql("SELECT id FROM operators ORDER BY id")]
+        source_ids = [row[0] for row in connection.exec_driver_sql("SELECT id FROM sources ORDER BY id")]
+
+        routes: dict[int, tuple[list[int], list[int]]] = {}
+        assignments = []
+        for source_id in source_ids:
+            chosen = rng.sample(operator_ids, min(dataset.operators_per_source, len(operator_ids)))
+            weights = [rng.randint(1, 100) for _ in chosen]
+            routes[source_id] = (chosen, weights)
+            assignments.extend(
+                {"source_id": source_id, "operator_id": operator_id, "weight": weight}
+                for operator_id, weight in zip(chosen, weights)
+            )
+        connection.execute(insert(models.SourceOperatorAssignment.__table__), assignments)
+
+        for start in range(0, dataset.leads, SEED_BATCH_SIZE):
+            connection.execute(
+                insert(models.Lead.__table__),
+                [
+                    {"external_id": f"seed-lead-{index}", "name": f"Lead {index}", "created_at": now}
+                    for index in range(start, min(start + SEED_BATCH_SIZE, dataset.leads))
+                ],
+            )
+        first_lead_id = connection.exec_driver_sql("SELECT min(id) FROM leads").scalar()
+
+        history_seconds = dataset.history_days * 86400
+        for start in range(0, dataset.contacts, SEED_BATCH_SIZE):
+            batch = []
+            for _ in range(start, min(start + SEED_BATCH_SIZE, dataset.contacts)):
+                source_id = rng.choice(source_ids)
+                chosen, weights = routes[source_id]
+                batch.append(
+                    {
+                        "lead_id": first_lead_id + rng.randrange(dataset.leads),
+                        "source_id": source_id,
+                        "operator_id": rng.choices(chosen, weights=weights, k=1)[0] if chosen else None,
+                        "status": "active" if rng.random() < dataset.active_share else "closed",
+                        "message": None,
+                        "created_at": now - timedelta(seconds=rng.randrange(history_seconds)),
+                    }
+                )
+            connection.execute(insert(models.Contact.__table__), batch)
+
+    with Session(bind=engine) as session:
+        reconcile_operator_loads(session)
+        session.commit()
+
+    return {**asdict(dataset), "seed_seconds": round(time.perf_counter() - started, 2)}
@@ -1,10 +1,14 @@
 import os
 import sys
-from collections.abc import Generator
+from collections.abc import Callable, Generator, Iterator, Sequence
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Any, ContextManager, NamedTuple, Optional
 
 import pytest
 from fastapi.testclient import TestClient
+from httpx import Response
+from sqlalchemy import Engine, event
 
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
 if str(PROJECT_ROOT) not in sys.path:
@@ -14,6 +18,15 @@ os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
 
 from app.database import Base, SessionLocal, engine, get_session  # noqa: E402
 from app.main import create_app  # noqa: E402
+from app.query_stats import QUERIES_HEADER, query_stats  # noqa: E402
+from app.schema import migrate  # noqa: E402
+from app.services.admission import admission_controller  # noqa: E402
+from app.services.allocation import STRATEGIES  # noqa: E402
+from app.services.idempotency import idempotency_cache  # noqa: E402
+from app.services.leads import lead_cache  # noqa: E402
+from app.services.load_store import get_load_store  # noqa: E402
+from app.services.loads import load_index  # noqa: E402
+from app.services.routing import routing_cache  # noqa: E402
 
 
 def override_get_session() -> Generator:
@@ -27,7 +40,18 @@ def override_get_session() -> Generator:
 @pytest.fixture()
 def client() -> Generator[TestClient, None, None]:
     Base.metadata.drop_all(bind=engine)
-    Base.metadata.create_all(bind=engine)
+    migrate(engine)
+    routing_cache.clear()
+    lead_cache.clear()
+    idempotency_cache.clear()
+    admission_controller.clear()
+    load_index.clear()
+    # LOAD_STORE=memory or shm runs the suite against a shared load store.
+    if get_load_store() is not None:
+        get_load_store().clear()
+    for strategy in STRATEGIES.values():
+        strategy.clear()
+    query_stats.clear()
 
     app = create_app()
     app.dependency_overrides[get_session] = override_get_session
@@ -36,3 +60,86 @@ def client() -> Generator[TestClient, None, None]:
         yield test_client
 
 
+@pytest.fixture()
+def query_budget(client: TestClient) -> Callable[..., Response]:
+    # Sends a request and fails if the endpoint ran more SQL statements than allowed.
+    def request(method: str, url: str, max_queries: int, **kwargs) -> Response:
+        response = client.request(method, url, **kwargs)
+        assert response.status_code < 400, response.text
+        queries = int(response.headers[QUERIES_HEADER])
+        assert queries <= max_queries, f"{method} {url} ran {queries} queries, budget is {max_queries}"
+        return response
+
+    return request
+
+
+@pytest.fixture()
+def create_operator(client: TestClient) -> Callable[..., int]:
+    def create(load_limit: int = 10, name: str = "Operator", active: bool = True) -> int:
+        response = client.post("/operators/", json={"name": name, "load_limit": load_limit, "active": active})
+        assert response.status_code == 201, response.text
+        return response.json()["id"]
+
+    return create
+
+
+@pytest.fixture()
+def create_source(client: TestClient) -> Callable[..., int]:
+    # Weight 1 per operator unless weights are given; other fields go into the payload as they are.
+    def create(
+        operator_ids: Sequence[int] = (), weights: Optional[Sequence[int]] = None, name: str = "Source", **fields
+    ) -> int:
+        weights = weights or [1] * len(operator_ids)
+        assignments = [
+            {"operator_id": operator_id, "weight": weight} for operator_id, weight in zip(operator_ids, weights)
+        ]
+        response = client.post("/sources/", json={"name": name, "assignments": assignments, **fields})
+        assert response.status_code == 201, response.text
+        return response.json()["id"]
+
+    return create
+
+
+@pytest.fixture()
+def operator_loads(client: TestClient) -> Callable[[], dict[int, int]]:
+    def loads() -> dict[int, int]:
+        return {operator["id"]: operator["current_load"] for operator in client.get("/operators/").json()}
+
+    return loads
+
+
+@pytest.fixture()
+def metric_sample(client: TestClient) -> Callable[[str], float]:
+    # Current value of one series from GET /metrics, 0 when it has not been reported yet.
+    def sample(series: str) -> float:
+        for line in client.get("/metrics").text.splitlines():
+            if line.startswith(series + " "):
+                return float(line.rsplit(" ", 1)[1])
+        return 0.0
+
+    return sample
+
+
+class CapturedStatement(NamedTuple):
+    statement: str
+    parameters: Any
+    executemany: bool
+
+
+@pytest.fixture()
+def capture_statements() -> Callable[..., ContextManager[list[CapturedStatement]]]:
+    # Records every SQL statement sent through the engine inside the with block.
+    @contextmanager
+    def capture(bind: Engine = engine) -> Iterator[list[CapturedStatement]]:
+        statements: list[CapturedStatement] = []
+
+        def listener(conn, cursor, statement, parameters, context, executemany) -> None:
+            statements.append(CapturedStatement(statement, parameters, executemany))
+
+        event.listen(bind, "before_cursor_execute", listener)
+        try:
+            yield statements
+        finally:
+            event.remove(bind, "before_cursor_execute", listener)
+
+    return capture
@@ -0,0 +1,75 @@
+from collections.abc import Callable
+
+from fastapi.testclient import TestClient
+
+from app.query_stats import QUERIES_HEADER
+from app.services.admission import AdmissionController
+from app.services.routing import build_routing
+
+
+def test_sources_over_their_rate_are_throttled(client: TestClient, metric_sample: Callable[[str], float]) -> None:
+    limited = client.post("/sources/", json={"name": "Flood", "admission_rate": 0.5, "admission_burst": 2}).json()
+    other = client.post("/sources/", json={"name": "Quiet"}).json()["id"]
+    assert (limited["admission_rate"], limited["admission_burst"]) == (0.5, 2)
+    source_id = limited["id"]
+    admitted = f'crm_admission_contacts_total{{source_id="{source_id}",decision="admitted"}}'
+    throttled = f'crm_admission_contacts_total{{source_id="{source_id}",decision="throttled"}}'
+    before = {series: metric_sample(series) for series in (admitted, throttled)}
+
+    # The first request loads the source's snapshot; from then on the bucket meters it.
+    messages = [
+        {"lead_external_id": f"lead-{index}", "source_id": source_id, "external_message_id": f"message-{index}"}
+        for index in range(3)
+    ]
+    statuses = [client.post("/contacts/", json=message).status_code for message in messages]
+    assert statuses == [201, 201, 201]
+    response = client.post("/contacts/", json={"lead_external_id": "lead-3", "source_id": source_id})
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "2"
+    assert response.headers[QUERIES_HEADER] == "0"
+
+    # Retries of accepted messages are replayed without spending the source's budget.
+    retry = client.post("/contacts/", json=messages[2])
+    assert retry.status_code == 201 and retry.headers["Idempotent-Replayed"] == "true"
+    assert client.post("/contacts/bulk", json={"items": messages[:2]}).json()["replayed"] == 2
+
+    # A batch is admitted or throttled as a whole, and other sources keep their own budget.
+    items = [
+        {"lead_external_id": "lead-4", "source_id": source_id},
+        {"lead_external_id": "lead-5", "source_id": other},
+    ]
+    assert client.post("/contacts/bulk", json={"items": items}).status_code == 429
+    assert client.post("/contacts/bulk", json={"items": items[1:]}).status_code == 200
+    assert len(client.get("/contacts/").json()) == 4
+
+    assert metric_sample(admitted) - before[admitted] == 2
+    assert metric_sample(throttled) - before[throttled] == 2
+
+    client.patch(f"/sources/{source_id}", json={"admission_rate": None})
+    for index in range(3):
+        response = client.post("/contacts/", json={"lead_external_id": f"lead-{index}", "source_id": source_id})
+        assert response.status_code == 201
+    assert client.get("/sources/").json()[0]["admission_rate"] is None
+
+
+def test_token_bucket_refills_and_follows_the_configuration() -> None:
+    now = [0.0]
+    controller = AdmissionController(clock=lambda: now[0])
+    limited = build_routing(1, (), 0.0, admission_rate=2.0)
+    unlimited = build_routing(2, (), 0.0)
+
+    assert [controller.admit([(limited, 1)]) for _ in range(3)] == [0.0, 0.0, 0.5]
+    assert controller.admit([(unlimited, 100)]) == 0.0
+    now[0] = 0.5
+    assert controller.admit([(limited, 1)]) == 0.0
+
+    # A batch larger than the bucket waits for a full bucket and leaves it in debt.
+    now[0] = 1.5
+    assert controller.admit([(limited, 5)]) == 0.0
+    assert controller.admit([(limited, 1)]) == 2.0
+
+    # A larger bucket keeps the tokens earned so far instead of starting full.
+    now[0] = 4.0
+    larger = build_routing(1, (), 0.0, admission_rate=2.0, admission_burst=10)
+    assert controller.admit([(larger, 2)]) == 0.0
+    assert controller.admit([(larger, 1)]) == 0.5
@@ -0,0 +1,51 @@
+import random
+from collections import Counter
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.database import SessionLocal
+from app.services.allocation import ALL_OPERATORS_FULL, choose_operator_for_source
+from app.services.routing import routing_cache
+from app.services.sampling import AliasSampler
+
+
+def test_alias_sampler_matches_weights_and_is_reproducible() -> None:
+    weights = [1, 2, 3, 4, 10]
+    sampler = AliasSampler(weights)
+
+    draws = [sampler.sample(random.Random(7)) for _ in range(3)]
+    assert draws == [sampler.sample(random.Random(7)) for _ in range(3)]
+
+    rng = random.Random(42)
+    counts = Counter(sampler.sample(rng) for _ in range(100_000))
+    for index, weight in enumerate(weights):
+        assert counts[index] / 100_000 == pytest.approx(weight / sum(weights), abs=0.01)
+
+
+def test_alias_sampler_rejects_empty_weights() -> None:
+    with pytest.raises(ValueError):
+        AliasSampler([])
+
+
+def test_saturated_operators_fall_back_to_remaining_capacity(client: TestClient) -> None:
+    operator_ids = [
+        client.post("/operators/", json={"name": f"Operator {index}", "load_limit": 1}).json()["id"]
+        for index in range(6)
+    ]
+    assignments = [{"operator_id": operator_id, "weight": 100} for operator_id in operator_ids]
+    source_id = client.post("/sources/", json={"name": "Skewed", "assignments": assignments}).json()["id"]
+
+    rng = random.Random(3)
+    assigned = []
+    with SessionLocal() as session:
+        routing = routing_cache.get(session, source_id)
+        for _ in range(len(operator_ids)):
+            result = choose_operator_for_source(session, routing, rng)
+            assert result.operator is not None
+            assigned.append(result.operator.id)
+        result = choose_operator_for_source(session, routing, rng)
+        session.commit()
+
+    assert sorted(assigned) == operator_ids
+    assert result.operator is None and result.reason == ALL_OPERATORS_FULL
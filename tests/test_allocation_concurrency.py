@@ -0,0 +1,85 @@
+from collections import Counter
+from collections.abc import Generator
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.database import get_session
+from app.main import create_app
+from app.schema import migrate
+from app.services.loads import reconcile_operator_loads
+from app.services.leads import lead_cache
+from app.services.routing import routing_cache
+
+REQUESTS = 300
+WORKERS = 48
+
+
+@pytest.fixture()
+def file_client(tmp_path: Path) -> Generator[tuple[TestClient, sessionmaker], None, None]:
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'crm.db'}",
+        connect_args={"check_same_thread": False, "timeout": 60},
+    )
+    migrate(engine)
+    routing_cache.clear()
+    lead_cache.clear()
+    session_factory = sessionmaker(bind=engine, autocommit=False, autoflush=False, expire_on_commit=False)
+
+    def override_get_session() -> Generator:
+        session = session_factory()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app = create_app(schema_bind=engine)
+    app.dependency_overrides[get_session] = override_get_session
+    with TestClient(app) as test_client:
+        yield test_client, session_factory
+    engine.dispose()
+
+
+def test_parallel_allocation_never_exceeds_load_limit(file_client: tuple[TestClient, sessionmaker]) -> None:
+    client, session_factory = file_client
+    limits = [3, 7, 20]
+    operator_ids = []
+    for index, limit in enumerate(limits):
+        response = client.post("/operators/", json={"name": f"Operator {index}", "load_limit": limit})
+        operator_ids.append(response.json()["id"])
+
+    response = client.post(
+        "/sources/",
+        json={
+            "name": "Burst source",
+            "assignments": [{"operator_id": operator_id, "weight": 10} for operator_id in operator_ids],
+        },
+    )
+    source_id = response.json()["id"]
+
+    def send(index: int) -> int | None:
+        response = client.post("/contacts/", json={"lead_external_id": f"lead-{index}", "source_id": source_id})
+        assert response.status_code == 201
+        return response.json()["operator_id"]
+
+    with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+        assigned = Counter(pool.map(send, range(REQUESTS)))
+
+    assert assigned[None] == REQUESTS - sum(limits)
+    assert {operator_id: assigned[operator_id] for operator_id in operator_ids} == dict(zip(operator_ids, limits))
+
+    with session_factory() as session:
+        actual = dict(
+            session.execute(
+                select(models.Contact.operator_id, func.count(models.Contact.id))
+                .where(models.Contact.operator_id.is_not(None))
+                .group_by(models.Contact.operator_id)
+            ).all()
+        )
+        assert actual == dict(zip(operator_ids, limits))
+        assert reconcile_operator_loads(session, fix=False) == []
@@ -0,0 +1,159 @@
+import random
+from collections import Counter
+from collections.abc import Callable
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.database import SessionLocal
+from app.services.allocation import choose_operator_for_source
+from app.services.heap import IndexedHeap
+from app.services.loads import load_index
+from app.services.routing import OperatorRoute, build_routing, routing_cache
+
+
+@pytest.fixture()
+def strategy_source(
+    create_operator: Callable[..., int], create_source: Callable[..., int]
+) -> Callable[..., tuple[int, list[int]]]:
+    def create(strategy: str, limits: list[int], weights: list[int]) -> tuple[int, list[int]]:
+        operator_ids = [create_operator(limit, name=f"Operator {index}") for index, limit in enumerate(limits)]
+        return create_source(operator_ids, weights, name=strategy, allocation_strategy=strategy), operator_ids
+
+    return create
+
+
+def _create(client: TestClient, source_id: int, count: int, prefix: str = "lead") -> list[dict]:
+    return [
+        client.post("/contacts/", json={"lead_external_id": f"{prefix}-{index}", "source_id": source_id}).json()
+        for index in range(count)
+    ]
+
+
+def test_indexed_heap_matches_sorted_reference() -> None:
+    rng = random.Random(5)
+    heap: IndexedHeap[int] = IndexedHeap()
+    reference: dict[int, float] = {}
+    for _ in range(5_000):
+        key = rng.randrange(50)
+        if key in reference and rng.random() < 0.2:
+            heap.remove(key)
+            del reference[key]
+        else:
+            reference[key] = rng.random()
+            heap.set(key, reference[key])
+        if reference:
+            key, priority = heap.peek()
+            assert priority == reference[key] == min(reference.values())
+    assert sorted(heap.pop()[1] for _ in range(len(heap))) == sorted(reference.values())
+
+
+def test_least_loaded_balances_utilization_relative_to_limits(
+    client: TestClient,
+    strategy_source: Callable[..., tuple[int, list[int]]],
+    operator_loads: Callable[[], dict[int, int]],
+) -> None:
+    source_id, operator_ids = strategy_source("least_loaded", limits=[2, 4, 8], weights=[100, 1, 1])
+
+    contacts = _create(client, source_id, 7)
+    assert operator_loads() == dict(zip(operator_ids, [1, 2, 4]))
+
+    # Freeing a slot makes that operator the least utilized one again.
+    closed = next(contact for contact in contacts if contact["operator_id"] == operator_ids[2])
+    client.patch(f"/contacts/{closed['id']}", json={"status": "closed"})
+    assert _create(client, source_id, 1, prefix="next")[0]["operator_id"] == operator_ids[2]
+
+    _create(client, source_id, 7, prefix="fill")
+    assert operator_loads() == dict(zip(operator_ids, [2, 4, 8]))
+    assert _create(client, source_id, 1, prefix="over")[0]["operator_id"] is None
+
+
+def test_least_loaded_index_reverts_changes_of_rolled_back_transactions(
+    client: TestClient, strategy_source: Callable[..., tuple[int, list[int]]]
+) -> None:
+    source_id, operator_ids = strategy_source("least_loaded", limits=[1, 1], weights=[1, 1])
+    _create(client, source_id, 1)
+
+    with SessionLocal() as session:
+        routing = routing_cache.get(session, source_id)
+        result = choose_operator_for_source(session, routing)
+        assert result.operator is not None
+        assert load_index.best(session, routing) is None
+        session.rollback()
+        assert load_index.best(session, routing).id == result.operator.id
+
+
+def test_weighted_round_robin_follows_weights_exactly(
+    client: TestClient, strategy_source: Callable[..., tuple[int, list[int]]]
+) -> None:
+    source_id, operator_ids = strategy_source("weighted_round_robin", limits=[0, 0, 0], weights=[1, 2, 3])
+
+    picks = [contact["operator_id"] for contact in _create(client, source_id, 60)]
+    assert Counter(picks) == dict(zip(operator_ids, [10, 20, 30]))
+    # Smooth rotation: within every cycle of six each operator appears exactly its weight.
+    for start in range(0, 60, 6):
+        assert Counter(picks[start : start + 6]) == dict(zip(operator_ids, [1, 2, 3]))
+
+
+def test_weighted_round_robin_skips_saturated_operators(
+    client: TestClient, strategy_source: Callable[..., tuple[int, list[int]]]
+) -> None:
+    source_id, operator_ids = strategy_source("weighted_round_robin", limits=[1, 0], weights=[5, 1])
+
+    picks = Counter(contact["operator_id"] for contact in _create(client, source_id, 10))
+    assert picks == {operator_ids[0]: 1, operator_ids[1]: 9}
+
+
+def test_bulk_ingestion_rotates_weighted_round_robin(
+    client: TestClient, strategy_source: Callable[..., tuple[int, list[int]]]
+) -> None:
+    source_id, operator_ids = strategy_source("weighted_round_robin", limits=[0, 0, 0], weights=[1, 2, 3])
+
+    items = [{"lead_external_id": f"lead-{index}", "source_id": source_id} for index in range(60)]
+    results = client.post("/contacts/bulk", json={"items": items}).json()["items"]
+    assert Counter(result["contact"]["operator_id"] for result in results) == dict(zip(operator_ids, [10, 20, 30]))
+
+
+def test_bulk_ingestion_balances_least_loaded_and_updates_the_index(
+    client: TestClient,
+    strategy_source: Callable[..., tuple[int, list[int]]],
+    operator_loads: Callable[[], dict[int, int]],
+) -> None:
+    source_id, operator_ids = strategy_source("least_loaded", limits=[10, 20, 30], weights=[1, 1, 1])
+    assert _create(client, source_id, 1)[0]["operator_id"] == operator_ids[0]
+
+    items = [{"lead_external_id": f"bulk-{index}", "source_id": source_id} for index in range(29)]
+    client.post("/contacts/bulk", json={"items": items})
+    assert operator_loads() == dict(zip(operator_ids, [5, 10, 15]))
+    # Half utilization everywhere; the index saw the bulk reservations, so the lowest raw load wins.
+    assert _create(client, source_id, 1, prefix="single")[0]["operator_id"] == operator_ids[0]
+
+
+def test_strategy_is_updatable_and_validated(
+    client: TestClient, strategy_source: Callable[..., tuple[int, list[int]]]
+) -> None:
+    source_id, operator_ids = strategy_source("weighted_random", limits=[0, 0], weights=[1, 1])
+    assert client.get("/sources/").json()[0]["allocation_strategy"] == "weighted_random"
+
+    assert client.patch(f"/sources/{source_id}", json={"allocation_strategy": "fastest"}).status_code == 422
+    for field in ("name", "allocation_strategy", "pending_order"):
+        assert client.patch(f"/sources/{source_id}", json={field: None}).status_code == 422
+    response = client.patch(f"/sources/{source_id}", json={"allocation_strategy": "least_loaded"})
+    assert response.json()["allocation_strategy"] == "least_loaded"
+
+    picks = Counter(contact["operator_id"] for contact in _create(client, source_id, 10))
+    assert picks == dict.fromkeys(operator_ids, 5)
+
+
+def test_least_loaded_index_tracks_incremental_changes() -> None:
+    routes = [OperatorRoute(id=index, name=str(index), weight=1, active=True, load_limit=10) for index in range(1, 6)]
+    routing = build_routing(99, routes, expires_at=float("inf"), strategy="least_loaded")
+    load_index.load(routing, {1: 9, 2: 3, 3: 3, 4: 10, 5: 7})
+    try:
+        assert load_index.best(None, routing).id == 2
+        load_index.apply([(2, 1)])
+        assert load_index.best(None, routing).id == 3
+        load_index.apply([(2, 6), (3, 7), (5, 3), (1, 1)])
+        assert load_index.best(None, routing) is None
+    finally:
+        load_index.clear()
@@ -0,0 +1,97 @@
+import asyncio
+from collections import Counter
+from collections.abc import AsyncGenerator, Generator
+from pathlib import Path
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.api.deps import AsyncRunner, get_db
+from app.main import create_app
+from app.schema import migrate
+from app.services.leads import lead_cache
+from app.services.loads import reconcile_operator_loads
+from app.services.routing import routing_cache
+
+
+@pytest.fixture()
+def async_app(tmp_path: Path) -> Generator[tuple[FastAPI, sessionmaker], None, None]:
+    database_path = tmp_path / "crm.db"
+    sync_engine = create_engine(f"sqlite:///{database_path}")
+    migrate(sync_engine)
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{database_path}", connect_args={"timeout": 60})
+    session_factory = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+    routing_cache.clear()
+    lead_cache.clear()
+
+    async def override_get_db() -> AsyncGenerator:
+        async with session_factory() as session:
+            yield AsyncRunner(session)
+
+    app = create_app(db_mode="async", schema_bind=sync_engine)
+    app.dependency_overrides[get_db] = override_get_db
+    yield app, sessionmaker(bind=sync_engine)
+    asyncio.run(async_engine.dispose())
+    sync_engine.dispose()
+
+
+def test_create_app_uses_async_sessions_in_async_mode() -> None:
+    assert get_db in create_app(db_mode="async").dependency_overrides
+    assert get_db not in create_app(db_mode="sync").dependency_overrides
+
+
+def test_async_mode_serves_main_flows(async_app: tuple[FastAPI, sessionmaker]) -> None:
+    app, session_factory = async_app
+    limits = [2, 3]
+
+    async def scenario() -> None:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            operator_ids = [
+                (await client.post("/operators/", json={"name": f"Operator {index}", "load_limit": limit})).json()["id"]
+                for index, limit in enumerate(limits)
+            ]
+            response = await client.post(
+                "/sources/",
+                json={"name": "Async", "assignments": [{"operator_id": item, "weight": 1} for item in operator_ids]},
+            )
+            source_id = response.json()["id"]
+
+            responses = await asyncio.gather(
+                *(
+                    client.post("/contacts/", json={"lead_external_id": f"lead-{index}", "source_id": source_id})
+                    for index in range(10)
+                )
+            )
+            assert {response.status_code for response in responses} == {201}
+            assigned = Counter(response.json()["operator_id"] for response in responses)
+            assert assigned == {operator_ids[0]: 2, operator_ids[1]: 3, None: 5}
+
+            operators = (await client.get("/operators/")).json()
+            assert [operator["current_load"] for operator in operators] == limits
+
+            response = await client.get("/contacts/", params={"limit": 4})
+            assert len(response.json()) == 4
+            assert "X-Next-Cursor" in response.headers
+            assert response.headers["X-DB-Queries"] == "1"
+
+            leads = (await client.get("/leads/", params={"limit": 20})).json()
+            assert len(leads) == 10 and all(len(lead["contacts"]) == 1 for lead in leads)
+
+            # Exports stream through the request's async session, not a separate sync one.
+            response = await client.get("/leads/export")
+            assert len(response.text.splitlines()) == 10
+            response = await client.get("/contacts/export", params={"format": "csv", "source_id": source_id})
+            assert len(response.text.splitlines()) == 11
+
+            response = await client.post("/contacts/", json={"lead_external_id": "lead-x", "source_id": 999})
+            assert response.status_code == 404
+
+    asyncio.run(scenario())
+
+    with session_factory() as session:
+        assert reconcile_operator_loads(session, fix=False) == []
@@ -0,0 +1,106 @@
+from collections.abc import Callable
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.database import SessionLocal
+from app.query_stats import QUERIES_HEADER
+from app.services.loads import reconcile_operator_loads
+
+
+def _assert_no_drift() -> None:
+    with SessionLocal() as session:
+        assert reconcile_operator_loads(session, fix=False) == []
+
+
+@pytest.fixture()
+def contacts_source(
+    create_operator: Callable[..., int], create_source: Callable[..., int]
+) -> Callable[..., tuple[list[int], int]]:
+    # Operators with the given limits; the source routes to the first one only.
+    def create(limits: list[int]) -> tuple[list[int], int]:
+        operator_ids = [create_operator(limit, name=f"Operator {index}") for index, limit in enumerate(limits)]
+        return operator_ids, create_source(operator_ids[:1])
+
+    return create
+
+
+def test_patch_closes_reopens_and_reassigns_contact(
+    client: TestClient,
+    contacts_source: Callable[..., tuple[list[int], int]],
+    operator_loads: Callable[[], dict[int, int]],
+) -> None:
+    (first, second), source_id = contacts_source([1, 1])
+    contact = client.post("/contacts/", json={"lead_external_id": "lead-1", "source_id": source_id}).json()
+    assert contact["operator_id"] == first and operator_loads() == {first: 1, second: 0}
+
+    response = client.patch(f"/contacts/{contact['id']}", json={"status": "closed"})
+    assert response.status_code == 200 and response.json()["status"] == "closed"
+    assert operator_loads() == {first: 0, second: 0}
+
+    response = client.patch(f"/contacts/{contact['id']}", json={"status": "active", "operator_id": second})
+    assert response.json()["operator_name"] == "Operator 1"
+    assert operator_loads() == {first: 0, second: 1}
+
+    other = client.post("/contacts/", json={"lead_external_id": "lead-2", "source_id": source_id}).json()
+    response = client.patch(f"/contacts/{other['id']}", json={"operator_id": second})
+    assert response.status_code == 409
+    assert operator_loads() == {first: 1, second: 1}
+
+    response = client.patch(f"/contacts/{other['id']}", json={"operator_id": None})
+    assert response.json()["operator_id"] is None
+    assert operator_loads() == {first: 0, second: 1}
+
+    assert client.patch("/contacts/9999", json={"status": "closed"}).status_code == 404
+    assert client.patch(f"/contacts/{other['id']}", json={"status": "archived"}).status_code == 422
+    _assert_no_drift()
+
+
+def test_bulk_close_by_ids_and_filters(
+    client: TestClient,
+    contacts_source: Callable[..., tuple[list[int], int]],
+    operator_loads: Callable[[], dict[int, int]],
+) -> None:
+    (operator_id,), source_id = contacts_source([0])
+    contacts = [
+        client.post("/contacts/", json={"lead_external_id": f"lead-{index}", "source_id": source_id}).json()
+        for index in range(6)
+    ]
+    assert operator_loads() == {operator_id: 6}
+
+    ids = [contact["id"] for contact in contacts[:2]]
+    response = client.post("/contacts/close", json={"ids": ids + ids + [9999]})
+    assert response.json() == {"closed": 2}
+    assert operator_loads() == {operator_id: 4}
+
+    response = client.post("/contacts/close", json={"ids": ids})
+    assert response.json() == {"closed": 0}
+
+    response = client.post("/contacts/close", json={"source_id": source_id, "created_before": "2000-01-01T00:00:00"})
+    assert response.json() == {"closed": 0}
+
+    response = client.post("/contacts/close", json={"operator_id": operator_id, "source_id": source_id})
+    assert response.json() == {"closed": 4}
+    assert operator_loads() == {operator_id: 0}
+    assert {contact["status"] for contact in client.get("/contacts/").json()} == {"closed"}
+
+    assert client.post("/contacts/close", json={}).status_code == 422
+    _assert_no_drift()
+
+
+def test_bulk_close_runs_one_update_for_large_id_lists(
+    client: TestClient,
+    contacts_source: Callable[..., tuple[list[int], int]],
+    operator_loads: Callable[[], dict[int, int]],
+) -> None:
+    (operator_id,), source_id = contacts_source([0])
+    items = [{"lead_external_id": f"lead-{index}", "source_id": source_id} for index in range(1200)]
+    ids = [item["contact"]["id"] for item in client.post("/contacts/bulk", json={"items": items}).json()["items"]]
+
+    small = client.post("/contacts/close", json={"ids": ids[:2]})
+    large = client.post("/contacts/close", json={"ids": ids[2:]})
+    assert large.json() == {"closed": 1198}
+    # The statement count does not grow with the number of ids.
+    assert large.headers[QUERIES_HEADER] == small.headers[QUERIES_HEADER]
+    assert operator_loads() == {operator_id: 0}
+    _assert_no_drift()
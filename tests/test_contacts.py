@@ -1,3 +1,5 @@
+from datetime import datetime, timedelta, timezone
+
 from fastapi.testclient import TestClient
 
 
@@ -66,3 +68,50 @@ def test_inactive_operator_is_skipped(client: TestClient) -> None:
     assert response.json()["operator_id"] == active_id
 
 
+def test_list_contacts_keyset_pagination_and_filters(client: TestClient) -> None:
+    operator_id = client.post("/operators/", json={"name": "Operator", "load_limit": 3}).json()["id"]
+    source_id = client.post(
+        "/sources/", json={"name": "Source C", "assignments": [{"operator_id": operator_id, "weight": 1}]}
+    ).json()["id"]
+    other_source_id = client.post("/sources/", json={"name": "Source D"}).json()["id"]
+
+    created = [
+        client.post("/contacts/", json={"lead_external_id": f"lead-{index}", "source_id": source_id}).json()["id"]
+        for index in range(5)
+    ]
+    client.post("/contacts/", json={"lead_external_id": "lead-other", "source_id": other_source_id})
+
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 2, "source_id": source_id}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/contacts/", params=params)
+        assert response.status_code == 200
+        seen.extend(contact["id"] for contact in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+    assert seen == sorted(created, reverse=True)
+
+    response = client.get("/contacts/", params={"operator_id": operator_id, "limit": 2})
+    assert [contact["id"] for contact in response.json()] == sorted(created[:3], reverse=True)[:2]
+    response = client.get(
+        "/contacts/", params={"operator_id": operator_id, "limit": 2, "cursor": response.headers["X-Next-Cursor"]}
+    )
+    assert [contact["id"] for contact in response.json()] == [min(created[:3])]
+    assert "X-Next-Cursor" not in response.headers
+
+    response = client.get("/contacts/", params={"source_id": source_id, "status": "closed"})
+    assert response.json() == []
+
+    an_hour_ago = (datetime.now(timezone.utc) - timedelta(hours=1)).astimezone(timezone(timedelta(hours=5)))
+    response = client.get("/contacts/", params={"source_id": source_id, "created_from": an_hour_ago.isoformat()})
+    assert len(response.json()) == 5
+
+    response = client.get("/contacts/", params={"created_to": "2000-01-01T00:00:00"})
+    assert response.json() == []
+
+    response = client.get("/contacts/", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
@@ -0,0 +1,60 @@
+from fastapi.testclient import TestClient
+
+
+def test_bulk_contacts_respect_load_limits_and_report_reasons(client: TestClient) -> None:
+    first = client.post("/operators/", json={"name": "First", "load_limit": 2}).json()["id"]
+    second = client.post("/operators/", json={"name": "Second", "load_limit": 1}).json()["id"]
+    source_id = client.post(
+        "/sources/",
+        json={
+            "name": "Bulk source",
+            "assignments": [{"operator_id": first, "weight": 1}, {"operator_id": second, "weight": 1}],
+        },
+    ).json()["id"]
+    empty_source_id = client.post("/sources/", json={"name": "Empty source"}).json()["id"]
+
+    items = [{"lead_external_id": f"lead-{index}", "source_id": source_id} for index in range(5)]
+    items.append({"lead_external_id": "lead-0", "lead_name": "Zero", "source_id": empty_source_id})
+    items.append({"lead_external_id": "lead-x", "source_id": 999})
+
+    response = client.post("/contacts/bulk", json={"items": items})
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["created"], body["unassigned"], body["rejected"]) == (6, 3, 1)
+
+    results = body["items"]
+    assigned = [item["contact"]["operator_id"] for item in results[:5] if item["contact"]["operator_id"]]
+    assert sorted(assigned) == sorted([first, first, second])
+    assert [item["reason"] for item in results[:5] if item["reason"]] == ["All operators reached their load limit"] * 2
+    assert results[5]["reason"] == "No active operators configured for this source"
+    assert results[6] == {"index": 6, "contact": None, "reason": "Source not found", "replayed": False}
+    assert results[0]["contact"]["lead_id"] == results[5]["contact"]["lead_id"]
+
+    operators = {operator["id"]: operator["current_load"] for operator in client.get("/operators/").json()}
+    assert operators == {first: 2, second: 1}
+
+    leads = {lead["external_id"]: lead["name"] for lead in client.get("/leads/").json()}
+    assert len(leads) == 5
+    assert leads["lead-0"] == "Zero"
+
+
+def test_bulk_contacts_tolerate_leads_inserted_concurrently(client: TestClient, monkeypatch) -> None:
+    from app.services import ingestion
+
+    source_id = client.post("/sources/", json={"name": "Race source"}).json()["id"]
+    client.post("/contacts/", json={"lead_external_id": "lead-race", "source_id": source_id})
+
+    lookup = ingestion._lookup_leads
+    calls = []
+
+    def stale_lookup(session, external_ids):
+        calls.append(list(external_ids))
+        return {} if len(calls) == 1 else lookup(session, external_ids)
+
+    monkeypatch.setattr(ingestion, "_lookup_leads", stale_lookup)
+    response = client.post(
+        "/contacts/bulk", json={"items": [{"lead_external_id": "lead-race", "lead_name": "Racer", "source_id": source_id}]}
+    )
+    assert response.status_code == 200
+    assert response.json()["items"][0]["contact"]["lead_id"] == 1
+    assert client.get("/leads/").json()[0]["name"] == "Racer"
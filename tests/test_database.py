@@ -0,0 +1,36 @@
+from pathlib import Path
+
+from sqlalchemy import text
+
+from app.database import EngineSettings, create_db_engine, engine_options
+
+
+def _pragma(connection, name: str):
+    return connection.execute(text(f"PRAGMA {name}")).scalar()
+
+
+def test_file_sqlite_engine_applies_pragmas(tmp_path: Path) -> None:
+    settings = EngineSettings(sqlite_busy_timeout_ms=1234, sqlite_cache_size=-2000, sqlite_mmap_size=1 << 20)
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'crm.db'}", settings)
+    with engine.connect() as connection:
+        assert _pragma(connection, "journal_mode") == "wal"
+        assert _pragma(connection, "synchronous") == 1
+        assert _pragma(connection, "busy_timeout") == 1234
+        assert _pragma(connection, "cache_size") == -2000
+        assert _pragma(connection, "mmap_size") == 1 << 20
+    engine.dispose()
+
+
+def test_server_engine_options_come_from_env(monkeypatch) -> None:
+    monkeypatch.setenv("DB_POOL_SIZE", "20")
+    monkeypatch.setenv("DB_MAX_OVERFLOW", "0")
+    monkeypatch.setenv("DB_POOL_PRE_PING", "false")
+    options = engine_options("postgresql://crm@localhost/crm", EngineSettings.from_env())
+    assert options == {
+        "pool_size": 20,
+        "max_overflow": 0,
+        "pool_timeout": 30.0,
+        "pool_recycle": 1800,
+        "pool_pre_ping": False,
+    }
+    assert "pool_size" not in engine_options("sqlite:///crm.db", EngineSettings())
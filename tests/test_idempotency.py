@@ -0,0 +1,93 @@
+from collections.abc import Callable
+
+from fastapi.testclient import TestClient
+
+from app import schemas
+from app.query_stats import QUERIES_HEADER
+from app.services.idempotency import IdempotencyCache, idempotency_cache
+
+
+def test_retries_return_the_first_contact(
+    client: TestClient,
+    create_operator: Callable[..., int],
+    create_source: Callable[..., int],
+    operator_loads: Callable[[], dict[int, int]],
+) -> None:
+    operator_id = create_operator(load_limit=5)
+    source_id = create_source([operator_id], name="Bot")
+    payload = {"lead_external_id": "lead-1", "source_id": source_id}
+
+    first = client.post("/contacts/", json=payload, headers={"Idempotency-Key": "message-1"})
+    retry = client.post("/contacts/", json=payload, headers={"Idempotency-Key": "message-1"})
+    assert first.status_code == retry.status_code == 201
+    assert retry.json() == first.json()
+    assert retry.headers["Idempotent-Replayed"] == "true" and "Idempotent-Replayed" not in first.headers
+    assert retry.headers[QUERIES_HEADER] == "0"
+
+    # A retry this worker has not cached is resolved by the unique index, without a second reservation.
+    idempotency_cache.clear()
+    retry = client.post("/contacts/", json={**payload, "external_message_id": "message-1"})
+    assert retry.json()["id"] == first.json()["id"] and retry.headers["Idempotent-Replayed"] == "true"
+    assert operator_loads() == {operator_id: 1}
+    assert len(client.get("/contacts/").json()) == 1
+
+    # Keys are scoped to the source, and a contact without a key is never deduplicated.
+    other_source = create_source(name="Other")
+    other = client.post("/contacts/", json={**payload, "source_id": other_source, "external_message_id": "message-1"})
+    assert other.json()["id"] != first.json()["id"]
+    assert client.post("/contacts/", json=payload).json()["id"] != client.post("/contacts/", json=payload).json()["id"]
+
+    response = client.post(
+        "/contacts/", json={**payload, "external_message_id": "message-2"}, headers={"Idempotency-Key": "message-3"}
+    )
+    assert response.status_code == 400
+
+
+def test_bulk_items_reuse_stored_and_repeated_keys(
+    client: TestClient,
+    create_operator: Callable[..., int],
+    create_source: Callable[..., int],
+    operator_loads: Callable[[], dict[int, int]],
+) -> None:
+    operator_id = create_operator(load_limit=5)
+    source_id = create_source([operator_id], name="Bot")
+    stored = client.post(
+        "/contacts/", json={"lead_external_id": "lead-1", "source_id": source_id, "external_message_id": "m-1"}
+    ).json()
+    items = [
+        {"lead_external_id": "lead-1", "source_id": source_id, "external_message_id": "m-1"},
+        {"lead_external_id": "lead-2", "source_id": source_id, "external_message_id": "m-2"},
+        {"lead_external_id": "lead-2", "source_id": source_id, "external_message_id": "m-2"},
+        {"lead_external_id": "lead-3", "source_id": source_id},
+    ]
+    idempotency_cache.clear()
+    body = client.post("/contacts/bulk", json={"items": items}).json()
+
+    assert (body["created"], body["replayed"], body["rejected"]) == (2, 2, 0)
+    results = body["items"]
+    assert [item["replayed"] for item in results] == [True, False, True, False]
+    assert results[0]["contact"] == stored
+    assert results[2]["contact"] == results[1]["contact"]
+    assert operator_loads() == {operator_id: 3}
+
+    # Every key is now cached: the whole batch is answered again without allocating.
+    body = client.post("/contacts/bulk", json={"items": items[:3]}).json()
+    assert (body["created"], body["replayed"]) == (0, 3)
+    assert operator_loads() == {operator_id: 3}
+
+
+def test_cache_is_bounded_and_expires() -> None:
+    now = [0.0]
+    cache = IdempotencyCache(max_size=2, ttl_seconds=10, clock=lambda: now[0])
+    contact = schemas.ContactRead(
+        id=1, lead_id=1, source_id=1, operator_id=None, operator_name=None, status="active", message=None,
+        created_at="2024-01-01T00:00:00",
+    )
+    for key in ("a", "b", "c"):
+        cache.put((1, key), contact)
+    assert cache.get((1, "a")) is None and len(cache) == 2
+
+    now[0] = 9.9
+    assert cache.get((1, "b")) == contact
+    now[0] = 10.0
+    assert cache.get((1, "c")) is None and len(cache) == 1
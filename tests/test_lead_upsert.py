@@ -0,0 +1,62 @@
+from collections.abc import Callable
+from typing import ContextManager
+
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from app import models
+from app.database import SessionLocal
+from app.services.leads import LeadCache, LeadRef, lead_cache, resolve_lead
+
+
+def test_upsert_fills_name_only_when_empty(
+    client: TestClient, create_operator: Callable[..., int], create_source: Callable[..., int]
+) -> None:
+    source_id = create_source([create_operator(load_limit=0)])
+    client.post("/contacts/", json={"lead_external_id": "lead-1", "source_id": source_id})
+    client.post("/contacts/", json={"lead_external_id": "lead-1", "lead_name": "First", "source_id": source_id})
+    client.post("/contacts/", json={"lead_external_id": "lead-1", "lead_name": "Second", "source_id": source_id})
+
+    leads = client.get("/leads/").json()
+    assert [(lead["external_id"], lead["name"], len(lead["contacts"])) for lead in leads] == [("lead-1", "First", 3)]
+
+
+def test_lead_created_elsewhere_is_resolved_without_conflict(client: TestClient) -> None:
+    with SessionLocal() as session:
+        session.add(models.Lead(external_id="lead-race", name=None))
+        session.commit()
+        existing_id = session.execute(select(models.Lead.id)).scalar_one()
+
+    with SessionLocal() as session:
+        assert resolve_lead(session, "lead-race", "Late name") == LeadRef(id=existing_id, has_name=True)
+        session.commit()
+        assert session.execute(select(models.Lead.name)).scalar_one() == "Late name"
+
+
+def test_repeat_contacts_skip_lead_queries(
+    client: TestClient,
+    create_operator: Callable[..., int],
+    create_source: Callable[..., int],
+    capture_statements: Callable[..., ContextManager[list]],
+) -> None:
+    source_id = create_source([create_operator(load_limit=0)])
+    client.post("/contacts/", json={"lead_external_id": "lead-hot", "lead_name": "Hot", "source_id": source_id})
+
+    with capture_statements() as captured:
+        response = client.post("/contacts/", json={"lead_external_id": "lead-hot", "source_id": source_id})
+
+    assert response.status_code == 201
+    assert not [item.statement for item in captured if "leads" in item.statement]
+    assert lead_cache.hits == 1
+
+
+def test_lead_cache_evicts_least_recently_used() -> None:
+    cache = LeadCache(max_size=2)
+    cache.put("a", LeadRef(id=1, has_name=False))
+    cache.put("b", LeadRef(id=2, has_name=False))
+    assert cache.get("a") is not None
+    cache.put("c", LeadRef(id=3, has_name=False))
+
+    assert cache.get("b") is None
+    assert [cache.get(key).id for key in ("a", "c")] == [1, 3]
+    assert len(cache) == 2
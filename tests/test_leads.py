@@ -0,0 +1,62 @@
+import csv
+import io
+import json
+
+from fastapi.testclient import TestClient
+
+
+def test_list_leads_paginates_and_limits_contacts_per_lead(client: TestClient) -> None:
+    operator_id = client.post("/operators/", json={"name": "Operator", "load_limit": 0}).json()["id"]
+    source_id = client.post(
+        "/sources/", json={"name": "Source L", "assignments": [{"operator_id": operator_id, "weight": 1}]}
+    ).json()["id"]
+
+    contact_ids: dict[str, list[int]] = {}
+    for index in range(3):
+        for _ in range(index + 1):
+            response = client.post("/contacts/", json={"lead_external_id": f"lead-{index}", "source_id": source_id})
+            contact_ids.setdefault(f"lead-{index}", []).append(response.json()["id"])
+
+    response = client.get("/leads/", params={"limit": 2, "contacts_limit": 2})
+    assert response.status_code == 200
+    page = response.json()
+    assert [lead["external_id"] for lead in page] == ["lead-2", "lead-1"]
+    assert [contact["id"] for contact in page[0]["contacts"]] == sorted(contact_ids["lead-2"], reverse=True)[:2]
+    assert page[0]["contacts"][0]["operator_name"] == "Operator"
+
+    response = client.get("/leads/", params={"limit": 2, "cursor": response.headers["X-Next-Cursor"]})
+    assert [lead["external_id"] for lead in response.json()] == ["lead-0"]
+    assert "X-Next-Cursor" not in response.headers
+
+    response = client.get("/leads/summary")
+    assert [(lead["external_id"], lead["contacts_count"]) for lead in response.json()] == [
+        ("lead-2", 3),
+        ("lead-1", 2),
+        ("lead-0", 1),
+    ]
+
+
+def test_export_contacts_and_leads_stream_ndjson_and_csv(client: TestClient) -> None:
+    first = client.post("/sources/", json={"name": "Export A"}).json()["id"]
+    second = client.post("/sources/", json={"name": "Export B"}).json()["id"]
+    for index, source_id in enumerate([first, first, second]):
+        client.post("/contacts/", json={"lead_external_id": f"lead-{index}", "lead_name": "Имя", "source_id": source_id})
+
+    response = client.get("/contacts/export", params={"source_id": first})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["lead_external_id"] for row in rows] == ["lead-1", "lead-0"]
+    assert rows[0]["source_name"] == "Export A" and rows[0]["operator_id"] is None
+
+    response = client.get("/contacts/export", params={"format": "csv", "status": "closed"})
+    assert response.text.splitlines() == [
+        "id,lead_id,lead_external_id,lead_name,source_id,source_name,operator_id,operator_name,status,message,created_at"
+    ]
+
+    response = client.get("/leads/export", params={"format": "csv"})
+    assert response.headers["content-type"].startswith("text/csv")
+    lines = list(csv.reader(io.StringIO(response.text)))
+    assert lines[0] == ["id", "external_id", "name", "created_at"]
+    assert [line[1] for line in lines[1:]] == ["lead-2", "lead-1", "lead-0"]
+    assert lines[1][2] == "Имя"
@@ -0,0 +1,50 @@
+from datetime import datetime
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.testclient import TestClient
+
+from app import schemas
+from app.api.responses import dump_json
+
+
+def _through_model(model, items: list[dict]) -> list[dict]:
+    # What the response_model path would have produced for the same data.
+    return [jsonable_encoder(model(**item)) for item in items]
+
+
+def test_list_endpoints_match_their_response_models(client: TestClient) -> None:
+    operators = [
+        client.post("/operators/", json={"name": f"Оператор {index}", "load_limit": index}).json()
+        for index in range(3)
+    ]
+    operators[2] = client.patch(f"/operators/{operators[2]['id']}", json={"active": False}).json()
+    assignments = [{"operator_id": operator["id"], "weight": index + 1} for index, operator in enumerate(operators)]
+    sources = [
+        client.post("/sources/", json={"name": "Empty", "description": "без назначений"}).json(),
+        client.post(
+            "/sources/", json={"name": "Weighted", "assignments": assignments, "pending_order": "priority"}
+        ).json(),
+    ]
+    for index in range(3):
+        client.post("/contacts/", json={"lead_external_id": f"lead-{index}", "source_id": sources[1]["id"]})
+
+    listed_operators = client.get("/operators/").json()
+    assert listed_operators == _through_model(schemas.OperatorRead, listed_operators)
+    assert [operator["id"] for operator in listed_operators] == [operator["id"] for operator in operators]
+    assert [operator["active"] for operator in listed_operators] == [True, True, False]
+    assert sum(operator["current_load"] for operator in listed_operators) == 3
+
+    assert client.get("/sources/").json() == sources
+
+    response = client.get("/contacts/", params={"limit": 2})
+    contacts = response.json()
+    assert response.headers["content-type"] == "application/json"
+    assert response.headers["X-Next-Cursor"]
+    assert contacts == _through_model(schemas.ContactWithLeadRead, contacts)
+    assert [contact["source_name"] for contact in contacts] == ["Weighted", "Weighted"]
+    assert {contact["operator_id"] for contact in contacts} <= {operators[0]["id"], operators[1]["id"]}
+
+
+def test_dump_json_encodes_naive_timestamps_like_isoformat() -> None:
+    moment = datetime(2024, 5, 1, 12, 30, 15, 250)
+    assert dump_json({"at": moment, "name": "Лид"}).decode() == f'{{"at":"{moment.isoformat()}","name":"Лид"}}'
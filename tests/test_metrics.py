@@ -0,0 +1,51 @@
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi.testclient import TestClient
+
+from app.metrics import Counter, Histogram
+
+
+def test_metrics_endpoint_reports_allocation_and_load(
+    client: TestClient,
+    create_operator: Callable[..., int],
+    create_source: Callable[..., int],
+    metric_sample: Callable[[str], float],
+) -> None:
+    operator_id = create_operator(load_limit=1)
+    source_id = create_source([operator_id])
+    assigned = f'crm_allocation_outcomes_total{{source_id="{source_id}",outcome="assigned"}}'
+    full = f'crm_allocation_outcomes_total{{source_id="{source_id}",outcome="all_operators_full"}}'
+    before = {series: metric_sample(series) for series in (assigned, full)}
+
+    for index in range(3):
+        client.post("/contacts/", json={"lead_external_id": f"lead-{index}", "source_id": source_id})
+
+    response = client.get("/metrics")
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert metric_sample(assigned) - before[assigned] == 1
+    assert metric_sample(full) - before[full] == 2
+    assert metric_sample(f'crm_operator_active_load{{operator_id="{operator_id}",operator_name="Operator"}}') == 1
+    assert metric_sample('crm_http_request_duration_seconds_count{method="POST",route="/contacts/"}') >= 3
+    assert "crm_allocation_duration_seconds_bucket" in response.text
+
+
+def test_sharded_metrics_aggregate_across_threads() -> None:
+    counter = Counter("test_total", "Test counter.", ("kind",))
+    histogram = Histogram("test_seconds", "Test histogram.", buckets=(0.1, 1.0))
+
+    def work(_: int) -> None:
+        for _ in range(10_000):
+            counter.inc("a")
+            histogram.observe(0.5)
+        histogram.observe(5.0)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(work, range(8)))
+
+    assert counter.values() == {("a",): 80_000}
+    lines = histogram.render().splitlines()
+    assert 'test_seconds_bucket{le="0.1"} 0' in lines
+    assert 'test_seconds_bucket{le="1"} 80000' in lines
+    assert 'test_seconds_bucket{le="+Inf"} 80008' in lines
+    assert "test_seconds_count 80008" in lines
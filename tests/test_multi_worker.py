@@ -0,0 +1,140 @@
+import multiprocessing
+import os
+import time
+import uuid
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app import models
+from app.database import SessionLocal, create_db_engine
+from app.main import create_app
+from app.schema import migrate
+from app.services.load_store import InMemoryLoadStore, SharedMemoryLoadStore, get_load_store, set_load_store
+from app.services.loads import LoadStoreReconciler, count_active_contacts
+from app.services.routing import RoutingCache
+
+WORKERS = 4
+CONTACTS_PER_WORKER = 40
+LOAD_LIMITS = (5, 10, 20, 40)
+# Aggregate POST /contacts/ rate over all workers; SQLite serializes the writes, so this is a floor.
+MIN_CONTACTS_PER_SECOND = 20
+
+
+def _run_worker(source_id: int, start: multiprocessing.Barrier, results: multiprocessing.Queue) -> None:
+    # A spawned process stands for one uvicorn worker: its own app, engine and caches, configured
+    # from the environment with the shared database file and shared memory load store.
+    with TestClient(create_app()) as client:
+        start.wait(timeout=60)
+        started = time.time()
+        assigned = 0
+        for index in range(CONTACTS_PER_WORKER):
+            response = client.post(
+                "/contacts/", json={"lead_external_id": f"{os.getpid()}-{index}", "source_id": source_id}
+            )
+            response.raise_for_status()
+            assigned += response.json()["operator_id"] is not None
+        results.put((started, time.time(), assigned))
+
+
+@pytest.mark.parametrize("strategy", ["weighted_random", "least_loaded"])
+def test_workers_share_loads_and_respect_limits(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, strategy: str
+) -> None:
+    database_url = f"sqlite:///{tmp_path / 'crm.db'}"
+    engine = create_db_engine(database_url)
+    migrate(engine)
+    with Session(engine) as session:
+        operators = [models.Operator(name=f"Operator {limit}", load_limit=limit) for limit in LOAD_LIMITS]
+        source = models.Source(name="Shared", allocation_strategy=strategy)
+        session.add_all([*operators, source])
+        session.flush()
+        session.add_all(
+            models.SourceOperatorAssignment(source_id=source.id, operator_id=operator.id, weight=1)
+            for operator in operators
+        )
+        session.commit()
+        source_id, limits = source.id, {operator.id: operator.load_limit for operator in operators}
+
+    store_name = f"crm-test-{uuid.uuid4().hex[:12]}"
+    monkeypatch.setenv("DATABASE_URL", database_url)
+    monkeypatch.setenv("LOAD_STORE", "shm")
+    monkeypatch.setenv("LOAD_STORE_NAME", store_name)
+    monkeypatch.setenv("LOAD_STORE_RECONCILE_SECONDS", "0.2")
+    context = multiprocessing.get_context("spawn")
+    start = context.Barrier(WORKERS)
+    results = context.Queue()
+    workers = [context.Process(target=_run_worker, args=(source_id, start, results)) for _ in range(WORKERS)]
+    store = SharedMemoryLoadStore(store_name)
+    try:
+        for worker in workers:
+            worker.start()
+        reports = [results.get(timeout=120) for _ in workers]
+        for worker in workers:
+            worker.join(timeout=30)
+            assert worker.exitcode == 0
+
+        total = WORKERS * CONTACTS_PER_WORKER
+        elapsed = max(report[1] for report in reports) - min(report[0] for report in reports)
+        assert total / elapsed >= MIN_CONTACTS_PER_SECOND, f"{total / elapsed:.0f} contacts/s"
+
+        with Session(engine) as session:
+            actual = count_active_contacts(session)
+            stored = dict(session.execute(select(models.Operator.id, models.Operator.active_load)).all())
+            pending = session.scalar(select(func.count()).select_from(models.PendingContact))
+        # Every operator is filled up to its limit and no further; the rest waits in the queue.
+        assert actual == limits
+        assert stored == limits
+        assert sum(report[2] for report in reports) == sum(limits.values())
+        assert pending == total - sum(limits.values())
+        assert store.loads(limits) == limits
+    finally:
+        for worker in workers:
+            if worker.is_alive():
+                worker.terminate()
+        store.unlink()
+        engine.dispose()
+
+
+@pytest.fixture()
+def shared_store() -> InMemoryLoadStore:
+    previous = get_load_store()
+    store = InMemoryLoadStore()
+    set_load_store(store)
+    yield store
+    set_load_store(previous)
+
+
+def test_reconciler_and_routing_follow_the_shared_store(
+    client: TestClient, shared_store: InMemoryLoadStore
+) -> None:
+    operator_id = client.post("/operators/", json={"name": "Operator", "load_limit": 2}).json()["id"]
+    assignments = [{"operator_id": operator_id, "weight": 1}]
+    payload = {"name": "Shared", "assignments": assignments, "allocation_strategy": "least_loaded"}
+    source_id = client.post("/sources/", json=payload).json()["id"]
+    # The least-loaded pick reads the operator's load once and seeds the store with it.
+    client.post("/contacts/", json={"lead_external_id": "lead-1", "source_id": source_id})
+    assert shared_store.loads([operator_id]) == {operator_id: 1}
+
+    # Another worker's routing cache drops its snapshot once this worker changes the source.
+    other_worker = RoutingCache()
+    with SessionLocal() as session:
+        assert other_worker.get(session, source_id).strategy == "least_loaded"
+        client.patch(f"/sources/{source_id}", json={"allocation_strategy": "weighted_random"})
+        assert other_worker.get(session, source_id).strategy == "weighted_random"
+
+        # A lost update leaves the store off; the second pass that sees the same drift corrects it.
+        shared_store.add([(operator_id, 1)])
+        reconciler = LoadStoreReconciler()
+        assert reconciler.run_once(session) == 0
+        assert reconciler.run_once(session) == 1
+        assert shared_store.loads([operator_id]) == {operator_id: 1}
+
+    response = client.post("/contacts/", json={"lead_external_id": "lead-2", "source_id": source_id})
+    assert response.json()["operator_id"] == operator_id
+    response = client.post("/contacts/", json={"lead_external_id": "lead-3", "source_id": source_id})
+    assert response.json()["operator_id"] is None
+    assert shared_store.loads([operator_id]) == {operator_id: 2}
@@ -0,0 +1,47 @@
+from collections.abc import Callable
+
+from fastapi.testclient import TestClient
+from sqlalchemy import update
+
+from app import models
+from app.database import SessionLocal
+from app.services.loads import reconcile_operator_loads
+
+
+def test_operator_load_counter_tracks_new_contacts(client: TestClient, create_source: Callable[..., int]) -> None:
+    response = client.post("/operators/", json={"name": "Operator", "active": True, "load_limit": 5})
+    assert response.status_code == 201
+    assert response.json()["current_load"] == 0
+    operator_id = response.json()["id"]
+
+    source_id = create_source([operator_id], name="Source Loads")
+    for index in range(3):
+        response = client.post("/contacts/", json={"lead_external_id": f"lead-{index}", "source_id": source_id})
+        assert response.status_code == 201
+
+    response = client.get("/operators/")
+    assert response.status_code == 200
+    assert response.json()[0]["current_load"] == 3
+
+
+def test_reconcile_operator_loads_fixes_drift(client: TestClient, create_source: Callable[..., int]) -> None:
+    response = client.post("/operators/", json={"name": "Operator", "active": True, "load_limit": 5})
+    operator_id = response.json()["id"]
+    source_id = create_source([operator_id], name="Source Drift")
+    client.post("/contacts/", json={"lead_external_id": "lead-a", "source_id": source_id})
+    client.post("/contacts/", json={"lead_external_id": "lead-b", "source_id": source_id})
+
+    with SessionLocal() as session:
+        session.execute(update(models.Contact).where(models.Contact.lead_id == 1).values(status="closed"))
+        session.commit()
+
+    with SessionLocal() as session:
+        drift = reconcile_operator_loads(session, fix=False)
+        assert [(item.operator_id, item.stored, item.actual) for item in drift] == [(operator_id, 2, 1)]
+
+        reconcile_operator_loads(session)
+        session.commit()
+        assert reconcile_operator_loads(session, fix=False) == []
+
+    response = client.get("/operators/")
+    assert response.json()[0]["current_load"] == 1
@@ -0,0 +1,110 @@
+from collections.abc import Callable
+
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from app.database import SessionLocal
+from app.models import PendingContact
+
+
+def _create(client: TestClient, source_id: int, index: int, priority: int = 0) -> dict:
+    payload = {"lead_external_id": f"lead-{index}", "source_id": source_id, "priority": priority}
+    return client.post("/contacts/", json=payload).json()
+
+
+def _operators_of(client: TestClient, contact_ids: list[int]) -> list:
+    contacts = {contact["id"]: contact for contact in client.get("/contacts/", params={"limit": 100}).json()}
+    return [contacts[contact_id]["operator_id"] for contact_id in contact_ids]
+
+
+def _queued() -> list[int]:
+    with SessionLocal() as session:
+        return list(session.execute(select(PendingContact.contact_id).order_by(PendingContact.id)).scalars())
+
+
+def test_closing_contacts_backfills_in_fifo_order(
+    client: TestClient, create_operator: Callable[..., int], create_source: Callable[..., int]
+) -> None:
+    operator_id = create_operator(load_limit=1)
+    source_id = create_source([operator_id])
+    contacts = [_create(client, source_id, index)["id"] for index in range(4)]
+    assert _operators_of(client, contacts) == [operator_id, None, None, None]
+    assert _queued() == contacts[1:]
+
+    client.patch(f"/contacts/{contacts[0]}", json={"status": "closed"})
+    assert _operators_of(client, contacts) == [operator_id, operator_id, None, None]
+
+    assert client.post("/contacts/close", json={"ids": [contacts[1]]}).json() == {"closed": 1}
+    assert _operators_of(client, contacts) == [operator_id, operator_id, operator_id, None]
+    assert _queued() == contacts[3:]
+    assert client.get("/operators/").json()[0]["current_load"] == 1
+
+
+def test_priority_queue_and_limit_raise(
+    client: TestClient, create_operator: Callable[..., int], create_source: Callable[..., int]
+) -> None:
+    operator_id = create_operator(load_limit=1)
+    source_id = create_source([operator_id], pending_order="priority")
+    _create(client, source_id, 0)
+    priorities = [1, 5, 3, 5]
+    waiting = [_create(client, source_id, index, priority)["id"] for index, priority in enumerate(priorities, 1)]
+
+    # The response reports the load after the backfill it triggered.
+    assert client.patch(f"/operators/{operator_id}", json={"load_limit": 3}).json()["current_load"] == 3
+    # Highest priority first, ties by arrival.
+    assert _operators_of(client, waiting) == [None, operator_id, None, operator_id]
+
+    client.patch(f"/operators/{operator_id}", json={"load_limit": 0})
+    assert _operators_of(client, waiting) == [operator_id] * 4
+    assert _queued() == []
+
+
+def test_reactivation_and_assignment_changes_backfill(
+    client: TestClient, create_operator: Callable[..., int], create_source: Callable[..., int]
+) -> None:
+    inactive_id = create_operator(load_limit=5, active=False)
+    source_id = create_source([inactive_id])
+    first = [_create(client, source_id, index)["id"] for index in range(2)]
+    assert _operators_of(client, first) == [None, None]
+
+    assert client.patch(f"/operators/{inactive_id}", json={"active": True}).json()["current_load"] == 2
+    assert _operators_of(client, first) == [inactive_id] * 2
+
+    orphan_source = create_source(name="Orphan")
+    second = [_create(client, orphan_source, index)["id"] for index in range(2, 4)]
+    client.patch(f"/sources/{orphan_source}", json={"assignments": [{"operator_id": inactive_id, "weight": 1}]})
+    assert _operators_of(client, second) == [inactive_id] * 2
+    assert client.get("/operators/").json()[0]["current_load"] == 4
+
+
+def test_bulk_contacts_wait_and_backfill_with_the_source_strategy(
+    client: TestClient,
+    create_operator: Callable[..., int],
+    create_source: Callable[..., int],
+    operator_loads: Callable[[], dict[int, int]],
+) -> None:
+    operator_ids = [create_operator(load_limit=2) for _ in range(2)]
+    source_id = create_source(operator_ids, allocation_strategy="least_loaded")
+    items = [{"lead_external_id": f"lead-{index}", "source_id": source_id} for index in range(10)]
+    result = client.post("/contacts/bulk", json={"items": items}).json()
+    assert result["unassigned"] == 6
+    assert len(_queued()) == 6
+
+    client.patch(f"/operators/{operator_ids[0]}", json={"load_limit": 5})
+    client.patch(f"/operators/{operator_ids[1]}", json={"load_limit": 5})
+    assert operator_loads() == dict.fromkeys(operator_ids, 5)
+    assert _queued() == []
+
+
+def test_closing_or_assigning_a_waiting_contact_removes_it_from_the_queue(
+    client: TestClient, create_operator: Callable[..., int], create_source: Callable[..., int]
+) -> None:
+    full_id = create_operator(load_limit=1)
+    spare_id = create_operator(load_limit=0)
+    source_id = create_source([full_id])
+    _create(client, source_id, 0)
+    waiting = [_create(client, source_id, index)["id"] for index in range(1, 3)]
+
+    client.patch(f"/contacts/{waiting[0]}", json={"status": "closed"})
+    client.patch(f"/contacts/{waiting[1]}", json={"operator_id": spare_id})
+    assert _queued() == []
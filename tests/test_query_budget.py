@@ -0,0 +1,47 @@
+from fastapi.testclient import TestClient
+
+OPERATORS = 5
+LEADS = 20
+
+
+def test_endpoints_stay_within_query_budget(client: TestClient, query_budget) -> None:
+    operator_ids = [
+        query_budget("POST", "/operators/", 1, json={"name": f"Operator {index}", "load_limit": 0}).json()["id"]
+        for index in range(OPERATORS)
+    ]
+    # Lifting the limit also probes the pending queue of the operator's sources.
+    query_budget("PATCH", f"/operators/{operator_ids[0]}", 3, json={"load_limit": 100})
+    query_budget("GET", "/operators/", 1)
+
+    assignments = [{"operator_id": operator_id, "weight": 1} for operator_id in operator_ids]
+    # Source row, operator check, one insert per assignment and the joined re-read.
+    source_id = query_budget(
+        "POST", "/sources/", 3 + OPERATORS, json={"name": "Source", "assignments": assignments}
+    ).json()["id"]
+    query_budget("POST", "/sources/", 3 + OPERATORS, json={"name": "Other", "assignments": assignments})
+    assignments[0]["weight"] = 5
+    # Plus one probe of the pending queue, which is empty, so nothing is dispatched.
+    query_budget("PATCH", f"/sources/{source_id}", 5, json={"assignments": assignments})
+    query_budget("GET", "/sources/", 1)
+
+    # Cold routing snapshot and new lead first, then the warm path: reserve, insert and the hourly rollup upsert.
+    query_budget("POST", "/contacts/", 6, json={"lead_external_id": "lead-0", "source_id": source_id})
+    query_budget("POST", "/contacts/", 3, json={"lead_external_id": "lead-0", "source_id": source_id})
+    items = [{"lead_external_id": f"lead-{index}", "source_id": source_id} for index in range(LEADS)]
+    # Lead lookup/insert/re-select, operator states, one guarded UPDATE per operator, one contacts INSERT,
+    # one rollup upsert.
+    query_budget("POST", "/contacts/bulk", 6 + OPERATORS, json={"items": items})
+
+    contact_id = query_budget("GET", "/contacts/", 1, params={"limit": 10}).json()[0]["id"]
+    query_budget("GET", "/contacts/", 1, params={"operator_id": operator_ids[0], "status": "active"})
+    query_budget("GET", "/leads/", 2)
+    query_budget("GET", "/leads/summary", 2)
+    query_budget("GET", "/stats/sources", 1, params={"granularity": "week"})
+    # Closing an assigned contact releases a slot, probes the queues of the operator's sources and
+    # bumps the hourly rollup.
+    query_budget("PATCH", f"/contacts/{contact_id}", 6, json={"status": "closed"})
+    query_budget("POST", "/contacts/close", 4, json={"source_id": source_id})
+
+    stats = {(item["method"], item["path"]): item for item in client.get("/diagnostics/queries").json()}
+    assert stats[("POST", "/contacts/")]["requests"] == 2
+    assert stats[("PATCH", "/contacts/{contact_id}")]["max_queries"] <= 6
@@ -0,0 +1,124 @@
+import re
+from collections.abc import Callable
+from typing import ContextManager
+
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app.database import SessionLocal, engine
+from app.services.idempotency import idempotency_cache
+from app.services.loads import reconcile_operator_loads
+
+# Tables that grow with traffic; configuration tables (operators, sources) are small and may be scanned.
+LARGE_TABLES = ("contacts", "leads", "source_operator_assignments", "allocation_rollups", "pending_contacts")
+FULL_SCAN = re.compile(rf"^SCAN ({'|'.join(LARGE_TABLES)})$")
+
+
+PLANNED = ("SELECT", "UPDATE", "DELETE", "WITH")
+
+
+def _plan(statement: str, parameters: object) -> list[str]:
+    with engine.connect() as connection:
+        rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+    return [row[-1] for row in rows]
+
+
+def _exercise_hot_paths(client: TestClient) -> None:
+    operator_id = client.post("/operators/", json={"name": "Operator", "load_limit": 0}).json()["id"]
+    source_id = client.post(
+        "/sources/", json={"name": "Plans", "assignments": [{"operator_id": operator_id, "weight": 1}]}
+    ).json()["id"]
+    client.patch(f"/sources/{source_id}", json={"assignments": [{"operator_id": operator_id, "weight": 2}]})
+    client.patch(f"/operators/{operator_id}", json={"load_limit": 100})
+
+    for index in range(3):
+        client.post("/contacts/", json={"lead_external_id": f"lead-{index}", "source_id": source_id})
+    client.post("/contacts/bulk", json={"items": [{"lead_external_id": "lead-0", "source_id": source_id}]})
+    # Retries that miss the idempotency cache look their keys up in contacts.
+    keyed = {"lead_external_id": "lead-0", "source_id": source_id, "external_message_id": "message-1"}
+    client.post("/contacts/", json=keyed)
+    idempotency_cache.clear()
+    client.post("/contacts/", json=keyed)
+    idempotency_cache.clear()
+    client.post("/contacts/bulk", json={"items": [keyed, {**keyed, "external_message_id": "message-2"}]})
+
+    cursor = client.get("/contacts/", params={"limit": 1}).headers["X-Next-Cursor"]
+    client.get("/contacts/", params={"limit": 1, "cursor": cursor})
+    client.get("/contacts/", params={"source_id": source_id, "limit": 1, "cursor": cursor})
+    client.get("/contacts/", params={"operator_id": operator_id, "limit": 1})
+    client.get("/contacts/", params={"status": "active", "limit": 1})
+    client.get("/contacts/", params={"created_from": "2000-01-01T00:00:00", "limit": 1})
+    client.get("/contacts/export", params={"source_id": source_id})
+    client.get("/operators/")
+    client.get("/sources/")
+
+    cursor = client.get("/leads/", params={"limit": 1}).headers["X-Next-Cursor"]
+    client.get("/leads/", params={"limit": 1, "cursor": cursor})
+    client.get("/leads/summary", params={"limit": 1})
+    client.get("/leads/export")
+
+    client.get("/stats/sources")
+    client.get("/stats/sources", params={"source_id": source_id, "granularity": "day"})
+    client.get("/stats/operators", params={"operator_id": operator_id, "granularity": "week"})
+
+    # Closes, reassignment and a limit raise dequeue and backfill contacts waiting for a full operator.
+    queued_operator = client.post("/operators/", json={"name": "Queued", "load_limit": 1}).json()["id"]
+    queued = []
+    for pending_order in ("fifo", "priority"):
+        payload = {
+            "name": f"Queued {pending_order}",
+            "assignments": [{"operator_id": queued_operator, "weight": 1}],
+            "pending_order": pending_order,
+        }
+        queued_source = client.post("/sources/", json=payload).json()["id"]
+        queued += [
+            client.post("/contacts/", json={"lead_external_id": f"queued-{index}", "source_id": queued_source}).json()
+            for index in range(3)
+        ]
+    client.patch(f"/contacts/{queued[0]['id']}", json={"status": "closed"})
+    client.post("/contacts/close", json={"ids": [queued[1]["id"], queued[4]["id"]]})
+    client.patch(f"/contacts/{queued[5]['id']}", json={"operator_id": operator_id})
+    client.patch(f"/operators/{queued_operator}", json={"load_limit": 5})
+    client.post("/contacts/close", json={"operator_id": operator_id, "source_id": source_id})
+    client.post("/contacts/close", json={"source_id": queued_source, "created_before": "2100-01-01T00:00:00"})
+
+    with SessionLocal() as session:
+        reconcile_operator_loads(session, fix=False)
+
+
+def test_hot_queries_use_indexes(client: TestClient, capture_statements: Callable[..., ContextManager[list]]) -> None:
+    with capture_statements() as captured:
+        _exercise_hot_paths(client)
+    # Every parameter set of an executemany shares one plan; the first one stands for all.
+    statements = [
+        (item.statement, item.parameters[0] if item.executemany else item.parameters)
+        for item in captured
+        if item.statement.lstrip().upper().startswith(PLANNED)
+    ]
+    assert len(statements) > 20
+
+    failures = []
+    for statement, parameters in statements:
+        plan = _plan(statement, parameters)
+        full_scans = [step for step in plan if FULL_SCAN.match(step)]
+        if full_scans:
+            failures.append((statement, plan))
+        elif " LIMIT " in statement and "USE TEMP B-TREE FOR ORDER BY" in plan:
+            failures.append((statement, plan))
+
+    assert not failures, "\n\n".join(f"{statement}\n{plan}" for statement, plan in failures)
+
+
+def test_declared_indexes_exist(client: TestClient) -> None:
+    with engine.connect() as connection:
+        names = set(connection.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'")).scalars())
+    assert {
+        "ix_contacts_created_at_id",
+        "ix_contacts_source_created_at_id",
+        "ix_contacts_operator_created_at_id",
+        "ix_contacts_status_created_at_id",
+        "ix_contacts_lead_created_at_id",
+        "ix_contacts_status_operator_id",
+        "ix_leads_created_at_id",
+        "ix_source_operator_assignments_operator_id",
+    } <= names
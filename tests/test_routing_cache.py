@@ -0,0 +1,67 @@
+from collections.abc import Callable
+from typing import ContextManager
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.database import SessionLocal
+from app.services.routing import RoutingCache
+
+
+@pytest.fixture()
+def cached_source(create_operator: Callable[..., int], create_source: Callable[..., int]) -> tuple[int, int]:
+    operator_id = create_operator(load_limit=1)
+    return operator_id, create_source([operator_id], name="Cached")
+
+
+def test_warm_routing_cache_skips_config_queries(
+    client: TestClient,
+    cached_source: tuple[int, int],
+    capture_statements: Callable[..., ContextManager[list]],
+) -> None:
+    _, source_id = cached_source
+    client.post("/contacts/", json={"lead_external_id": "lead-warmup", "source_id": source_id})
+
+    with capture_statements() as captured:
+        response = client.post("/contacts/", json={"lead_external_id": "lead-hot", "source_id": source_id})
+    statements = [item.statement for item in captured]
+
+    assert response.status_code == 201
+    assert not [statement for statement in statements if "FROM sources" in statement]
+    assert not [statement for statement in statements if "FROM source_operator_assignments" in statement]
+    assert client.get("/sources/routing-cache").json()["hits"] >= 1
+
+
+def test_source_and_operator_updates_invalidate_routing(client: TestClient, cached_source: tuple[int, int]) -> None:
+    operator_id, source_id = cached_source
+    response = client.post("/contacts/", json={"lead_external_id": "lead-1", "source_id": source_id})
+    assert response.json()["operator_id"] == operator_id
+
+    client.patch(f"/operators/{operator_id}", json={"active": False})
+    response = client.post("/contacts/", json={"lead_external_id": "lead-2", "source_id": source_id})
+    assert response.json()["operator_id"] is None
+
+    other_id = client.post("/operators/", json={"name": "Other", "load_limit": 0}).json()["id"]
+    client.patch(f"/sources/{source_id}", json={"assignments": [{"operator_id": other_id, "weight": 1}]})
+    response = client.post("/contacts/", json={"lead_external_id": "lead-3", "source_id": source_id})
+    assert response.json()["operator_id"] == other_id
+
+    stats = client.get("/sources/routing-cache").json()
+    assert stats["invalidations"] >= 3
+    assert stats["misses"] >= 3
+
+
+def test_routing_snapshots_expire_after_ttl(cached_source: tuple[int, int]) -> None:
+    _, source_id = cached_source
+    now = [0.0]
+    cache = RoutingCache(ttl_seconds=10, clock=lambda: now[0])
+
+    with SessionLocal() as session:
+        first = cache.get(session, source_id)
+        assert cache.get(session, source_id) is first
+        now[0] = 11.0
+        assert cache.get(session, source_id) is not first
+        assert cache.get(session, 999) is None
+
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.size) == (1, 3, 1)
@@ -0,0 +1,86 @@
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from app.database import Base
+from app.schema import SCHEMA_VERSION, SchemaVersionError, check_schema, migrate, schema_version
+
+
+def test_migrate_upgrades_an_unversioned_database(tmp_path: Path) -> None:
+    # A database created by create_all before migrations were versioned, missing later additions.
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        connection.execute(text("DROP TABLE schema_migrations"))
+        connection.execute(text("DROP TABLE allocation_rollups"))
+        connection.execute(text("ALTER TABLE operators DROP COLUMN active_load"))
+        connection.execute(text("ALTER TABLE sources DROP COLUMN allocation_strategy"))
+        connection.execute(text("ALTER TABLE sources DROP COLUMN pending_order"))
+        connection.execute(text("ALTER TABLE sources DROP COLUMN admission_rate"))
+        connection.execute(text("ALTER TABLE sources DROP COLUMN admission_burst"))
+        connection.execute(text("DROP TABLE pending_contacts"))
+        connection.execute(text("ALTER TABLE contacts DROP COLUMN closed_at"))
+        connection.execute(text("DROP INDEX uq_contacts_source_external_message_id"))
+        connection.execute(text("ALTER TABLE contacts DROP COLUMN external_message_id"))
+        connection.execute(text("INSERT INTO operators (id, name, active, load_limit) VALUES (1, 'Operator', 1, 5)"))
+        connection.execute(text("INSERT INTO sources (id, name) VALUES (1, 'Source')"))
+        connection.execute(text("INSERT INTO leads (id, external_id) VALUES (1, 'lead-1')"))
+        connection.execute(
+            text(
+                "INSERT INTO contacts (lead_id, source_id, operator_id, status) "
+                "VALUES (1, 1, 1, 'active'), (1, 1, 1, 'active'), (1, 1, 1, 'closed')"
+            )
+        )
+
+    assert schema_version(engine) is None
+    assert len(migrate(engine)) == SCHEMA_VERSION
+    assert migrate(engine) == []
+    assert check_schema(engine) == SCHEMA_VERSION
+
+    assert "active_load" in {column["name"] for column in inspect(engine).get_columns("operators")}
+    contact_columns = {column["name"] for column in inspect(engine).get_columns("contacts")}
+    assert {"closed_at", "external_message_id"} <= contact_columns
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT active_load FROM operators WHERE id = 1")).scalar() == 2
+        assert connection.execute(text("SELECT allocation_strategy FROM sources")).scalar() == "weighted_random"
+        assert connection.execute(text("SELECT pending_order FROM sources")).scalar() == "fifo"
+        assert connection.execute(text("SELECT admission_rate FROM sources")).scalar() is None
+    assert "ix_pending_contacts_source_priority_id" in {
+        index["name"] for index in inspect(engine).get_indexes("pending_contacts")
+    }
+    assert "ix_allocation_rollups_source_bucket" in {
+        index["name"] for index in inspect(engine).get_indexes("allocation_rollups")
+    }
+    assert "uq_contacts_source_external_message_id" in {
+        index["name"] for index in inspect(engine).get_indexes("contacts")
+    }
+    engine.dispose()
+
+
+def test_migrate_creates_missing_contact_indexes(tmp_path: Path) -> None:
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        connection.execute(text("DROP INDEX ix_contacts_created_at_id"))
+        connection.execute(text("DROP INDEX ix_contacts_source_created_at_id"))
+
+    migrate(engine)
+
+    indexes = {index["name"] for index in inspect(engine).get_indexes("contacts")}
+    assert {"ix_contacts_created_at_id", "ix_contacts_source_created_at_id"} <= indexes
+    engine.dispose()
+
+
+def test_check_schema_rejects_missing_or_older_versions(tmp_path: Path) -> None:
+    engine = create_engine(f"sqlite:///{tmp_path / 'crm.db'}")
+    with pytest.raises(SchemaVersionError, match="version 0"):
+        check_schema(engine)
+
+    migrate(engine)
+    with engine.begin() as connection:
+        connection.execute(text("DELETE FROM schema_migrations WHERE version = :version"), {"version": SCHEMA_VERSION})
+    with pytest.raises(SchemaVersionError, match=f"version {SCHEMA_VERSION - 1}"):
+        check_schema(engine)
+    assert [migration.version for migration in migrate(engine)] == [SCHEMA_VERSION]
+    engine.dispose()
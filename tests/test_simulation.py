@@ -0,0 +1,129 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+np = pytest.importorskip("numpy")
+
+from app.cli import main  # noqa: E402
+from app.services.routing import OperatorRoute, build_routing  # noqa: E402
+from app.services.simulation import ContactStream, SimulationConfig, poisson_stream, simulate  # noqa: E402
+
+
+def _route(operator_id: int, weight: int, load_limit: int, active: bool = True) -> OperatorRoute:
+    return OperatorRoute(
+        id=operator_id, name=f"Operator {operator_id}", weight=weight, active=active, load_limit=load_limit
+    )
+
+
+def _replay_loads(stream, result, routes: dict[int, list[int]], limits: dict[int, int]) -> None:
+    # Event-by-event reference check: no operator goes over its limit and nothing is left
+    # unassigned while one of the source's operators still had capacity.
+    arrivals = stream.arrival_times
+    closes = arrivals + stream.handle_times
+    events = sorted(
+        [(arrivals[index], 0, index) for index in range(len(arrivals))]
+        + [(closes[index], 1, index) for index in range(len(arrivals)) if closes[index] <= arrivals.max()]
+    )
+    loads = dict.fromkeys(limits, 0)
+    for _, kind, index in events:
+        operator_id = int(result.assignments[index])
+        if kind:
+            if operator_id >= 0:
+                loads[operator_id] -= 1
+            continue
+        if operator_id >= 0:
+            loads[operator_id] += 1
+            assert not limits[operator_id] or loads[operator_id] <= limits[operator_id]
+        else:
+            candidates = routes.get(int(stream.source_ids[index]), [])
+            assert all(limits[candidate] and loads[candidate] >= limits[candidate] for candidate in candidates)
+    assert loads == {operator.operator_id: operator.final_load for operator in result.operators}
+
+
+def test_simulation_respects_limits_and_falls_back_to_free_operators() -> None:
+    routings = {
+        1: build_routing(1, [_route(1, 5, 3), _route(2, 1, 0), _route(3, 2, 4, active=False)], 0),
+        2: build_routing(2, [_route(1, 5, 3), _route(4, 3, 2)], 0),
+        3: build_routing(3, [], 0),
+    }
+    stream = poisson_stream({1: 120, 2: 200, 3: 10}, hours=5, mean_handle_minutes=2, seed=3)
+    result = simulate(SimulationConfig(routings=routings), stream, seed=4, chunk_size=512)
+
+    _replay_loads(stream, result, {1: [1, 2], 2: [1, 4]}, {1: 3, 2: 0, 4: 2})
+    operators = {operator.operator_id: operator for operator in result.operators}
+    assert set(operators) == {1, 2, 4}
+    assert operators[1].peak_load == 3 and operators[1].saturated_at is not None
+    assert operators[2].saturated_at is None
+    assert result.unassigned["all_operators_full"] > 0
+    sources = {source.source_id: source for source in result.sources}
+    assert sources[3].unassigned == sources[3].arrivals == result.unassigned["no_active_operators"]
+    assert sources[1].unassigned == 0
+
+
+def test_simulation_without_limits_follows_weights() -> None:
+    routings = {1: build_routing(1, [_route(1, 1, 0), _route(2, 3, 0)], 0)}
+    stream = poisson_stream({1: 100_000}, hours=1, seed=1)
+    result = simulate(SimulationConfig(routings=routings), stream, seed=2)
+
+    shares = {operator.operator_id: operator.assigned / result.arrivals for operator in result.operators}
+    assert shares[2] == pytest.approx(0.75, abs=0.01)
+    assert result.unassigned_rate == 0
+    assert result.events == result.arrivals
+
+
+def _ordered_stream(source_ids: list[int]) -> ContactStream:
+    count = len(source_ids)
+    return ContactStream(np.arange(count, dtype=float), np.array(source_ids), np.full(count, np.inf))
+
+
+def test_simulation_applies_least_loaded_and_round_robin() -> None:
+    least_loaded = build_routing(1, [_route(1, 1, 2), _route(2, 1, 4)], 0, strategy="least_loaded")
+    result = simulate(SimulationConfig(routings={1: least_loaded}), _ordered_stream([1] * 7), seed=1)
+    # Lowest load relative to the limit first, ties by load and then operator id.
+    assert result.assignments.tolist() == [1, 2, 2, 1, 2, 2, -1]
+    assert result.unassigned["all_operators_full"] == 1
+
+    round_robin = build_routing(1, [_route(1, 1, 0), _route(2, 3, 0)], 0, strategy="weighted_round_robin")
+    result = simulate(SimulationConfig(routings={1: round_robin}), _ordered_stream([1] * 8), seed=1)
+    assert result.assignments.tolist() == [2, 1, 2, 2] * 2
+
+    # Sequential sources share operators with a weighted_random one and still respect every limit.
+    routings = {
+        1: build_routing(1, [_route(1, 5, 3), _route(2, 1, 2)], 0, strategy="least_loaded"),
+        2: build_routing(2, [_route(1, 5, 3), _route(4, 3, 2)], 0, strategy="weighted_round_robin"),
+        3: build_routing(3, [_route(2, 1, 2), _route(4, 1, 2)], 0),
+    }
+    stream = poisson_stream({1: 100, 2: 150, 3: 100}, hours=4, mean_handle_minutes=2, seed=3)
+    result = simulate(SimulationConfig(routings=routings), stream, seed=4, chunk_size=512)
+    _replay_loads(stream, result, {1: [1, 2], 2: [1, 4], 3: [2, 4]}, {1: 3, 2: 2, 4: 2})
+
+
+def test_overrides_change_limits_and_weights() -> None:
+    config = SimulationConfig(routings={1: build_routing(1, [_route(1, 1, 1), _route(2, 1, 1)], 0)})
+    changed = config.with_overrides(load_limits={1: 0}, weights={(1, 2): 4}, strategies={1: "least_loaded"})
+
+    routes = {route.id: route for route in changed.routings[1].active_routes}
+    assert routes[1].load_limit == 0 and routes[2].weight == 4
+    assert changed.routings[1].strategy == "least_loaded" and config.routings[1].strategy == "weighted_random"
+    assert config.routings[1].active_routes[1].weight == 1
+
+
+def test_simulate_command_replays_history(client: TestClient, capsys) -> None:
+    operator_ids = [
+        client.post("/operators/", json={"name": f"Operator {index}", "load_limit": 2}).json()["id"]
+        for index in range(2)
+    ]
+    assignments = [{"operator_id": operator_id, "weight": 1} for operator_id in operator_ids]
+    source_id = client.post("/sources/", json={"name": "Source", "assignments": assignments}).json()["id"]
+    for index in range(6):
+        client.post("/contacts/", json={"lead_external_id": f"lead-{index}", "source_id": source_id})
+
+    assert main(["simulate", "--replay-days", "1", "--handle-minutes", "0", "--json", "--seed", "1"]) == 0
+    report = json.loads(capsys.readouterr().out)
+    assert report["arrivals"] == 6
+    assert report["unassigned"] == {"no_active_operators": 0, "all_operators_full": 2}
+
+    limit = f"{operator_ids[0]}=0"
+    assert main(["simulate", "--replay-days", "1", "--handle-minutes", "0", "--set-limit", limit, "--json"]) == 0
+    assert json.loads(capsys.readouterr().out)["unassigned"]["all_operators_full"] == 0
@@ -0,0 +1,64 @@
+import os
+import subprocess
+import sys
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import ContextManager
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.cli import main
+from app.database import create_db_engine
+from app.main import create_app
+from app.schema import SCHEMA_VERSION, SchemaVersionError, migrate
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+# Ceilings with room for a busy CI machine; they catch schema work creeping back into startup.
+IMPORT_BUDGET_SECONDS = 5.0
+STARTUP_BUDGET_SECONDS = 0.5
+
+
+def test_importing_the_app_does_no_io(tmp_path: Path) -> None:
+    database = tmp_path / "crm.db"
+    code = "import time; started = time.perf_counter(); import app.main; print(time.perf_counter() - started)"
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=PROJECT_ROOT,
+        env={**os.environ, "DATABASE_URL": f"sqlite:///{database}", "LOAD_STORE": "shm"},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    # SQLite creates the file on first connect, so no file means no connection was opened.
+    assert not database.exists()
+    assert float(result.stdout) < IMPORT_BUDGET_SECONDS
+
+
+def test_startup_only_checks_the_schema_version(
+    tmp_path: Path, capture_statements: Callable[..., ContextManager[list]]
+) -> None:
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'crm.db'}")
+    app = create_app(schema_bind=engine)
+    with pytest.raises(SchemaVersionError):
+        with TestClient(app):
+            pass
+
+    migrate(engine)
+    try:
+        with capture_statements(engine) as statements:
+            started = time.perf_counter()
+            with TestClient(app):
+                elapsed = time.perf_counter() - started
+    finally:
+        engine.dispose()
+
+    assert len(statements) == 1 and "schema_migrations" in statements[0].statement
+    assert elapsed < STARTUP_BUDGET_SECONDS
+
+
+def test_migrate_command_reports_status(client: TestClient, capsys) -> None:
+    assert main(["migrate", "--status"]) == 0
+    assert main(["migrate"]) == 0
+    assert capsys.readouterr().out.splitlines()[-1] == f"schema version {SCHEMA_VERSION}"
@@ -0,0 +1,111 @@
+from collections.abc import Callable
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+
+from app import models
+from app.cli import main
+from app.database import SessionLocal
+
+
+def _counts(items: list[dict], key: str) -> dict:
+    return {item[key]: (item["created"], item["unassigned"], item["closed"]) for item in items}
+
+
+def test_counters_follow_creates_and_closes(
+    client: TestClient, create_operator: Callable[..., int], create_source: Callable[..., int]
+) -> None:
+    operator_id = create_operator(load_limit=1)
+    source_id = create_source([operator_id])
+    contacts = [
+        client.post("/contacts/", json={"lead_external_id": f"lead-{index}", "source_id": source_id}).json()["id"]
+        for index in range(3)
+    ]
+    # The first close backfills the next queued contact, which is then closed in bulk.
+    client.patch(f"/contacts/{contacts[0]}", json={"status": "closed"})
+    client.post("/contacts/close", json={"ids": [contacts[1]]})
+
+    sources = client.get("/stats/sources").json()
+    assert len(sources) == 1 and sources[0]["bucket"].endswith(":00:00")
+    assert _counts(sources, "source_id") == {source_id: (3, 2, 2)}
+    operators = client.get("/stats/operators", params={"source_id": source_id}).json()
+    assert _counts(operators, "operator_id") == {operator_id: (1, 0, 2), None: (2, 2, 0)}
+    assert client.get("/stats/operators", params={"operator_id": operator_id}).json()[0]["closed"] == 2
+
+    # The operator is busy with the backfilled contact, so the whole batch stays unassigned.
+    items = [{"lead_external_id": f"bulk-{index}", "source_id": source_id} for index in range(4)]
+    client.post("/contacts/bulk", json={"items": items})
+    assert _counts(client.get("/stats/sources").json(), "source_id") == {source_id: (7, 6, 2)}
+
+
+def test_backfill_rebuilds_history_and_coarser_buckets(
+    client: TestClient, create_operator: Callable[..., int], create_source: Callable[..., int], capsys
+) -> None:
+    operator_id = create_operator(load_limit=0)
+    source_id = create_source([operator_id])
+    monday = datetime(2024, 3, 4, 9, 15)
+    history = [
+        (monday, operator_id, "closed", monday + timedelta(hours=1)),
+        (monday + timedelta(minutes=30), None, "active", None),
+        (monday + timedelta(days=1), operator_id, "active", None),
+        # Closed before closed_at was recorded: counted in its creation hour.
+        (monday + timedelta(days=7), operator_id, "closed", None),
+    ]
+    with SessionLocal() as session:
+        lead = models.Lead(external_id="history")
+        session.add(lead)
+        session.flush()
+        session.execute(
+            insert(models.Contact),
+            [
+                {
+                    "lead_id": lead.id,
+                    "source_id": source_id,
+                    "created_at": created_at,
+                    "operator_id": operator,
+                    "status": contact_status,
+                    "closed_at": closed_at,
+                }
+                for created_at, operator, contact_status, closed_at in history
+            ],
+        )
+        session.commit()
+
+    assert main(["backfill-stats"]) == 0
+    assert "rebuilt for all contacts" in capsys.readouterr().out
+
+    window = {"start": "2024-03-01T00:00:00", "end": "2024-03-20T00:00:00"}
+    hourly = client.get("/stats/sources", params=window).json()
+    assert [(item["bucket"], item["created"], item["unassigned"], item["closed"]) for item in hourly] == [
+        ("2024-03-04T09:00:00", 2, 1, 0),
+        ("2024-03-04T10:00:00", 0, 0, 1),
+        ("2024-03-05T09:00:00", 1, 0, 0),
+        ("2024-03-11T09:00:00", 1, 0, 1),
+    ]
+    daily = client.get("/stats/sources", params={**window, "granularity": "day"}).json()
+    assert [(item["bucket"], item["created"]) for item in daily] == [
+        ("2024-03-04T00:00:00", 2),
+        ("2024-03-05T00:00:00", 1),
+        ("2024-03-11T00:00:00", 1),
+    ]
+    weekly = client.get("/stats/operators", params={**window, "granularity": "week"}).json()
+    # Contacts without an operator sort first within a bucket.
+    assert [(item["bucket"], item["operator_id"], item["created"], item["closed"]) for item in weekly] == [
+        ("2024-03-04T00:00:00", None, 1, 0),
+        ("2024-03-04T00:00:00", operator_id, 2, 1),
+        ("2024-03-11T00:00:00", operator_id, 1, 1),
+    ]
+
+    # Partial rebuild keeps older buckets and does not double count.
+    assert main(["backfill-stats", "--since", "2024-03-05"]) == 0
+    assert client.get("/stats/sources", params=window).json() == hourly
+
+
+def test_stats_range_is_validated(client: TestClient) -> None:
+    assert client.get("/stats/sources", params={"granularity": "month"}).status_code == 422
+    params = {"start": "2024-03-02T00:00:00", "end": "2024-03-01T00:00:00"}
+    assert client.get("/stats/sources", params=params).status_code == 400
+    params = {"start": "2020-01-01T00:00:00", "end": "2024-01-01T00:00:00"}
+    assert client.get("/stats/sources", params=params).status_code == 400
+    assert client.get("/stats/sources", params={**params, "granularity": "week"}).status_code == 200